@@ -11,6 +11,8 @@ from app.models.practice import Practice
 from app.models.admin import Admin
 from app.models.recall_group import RecallGroup
 from app.models.recall_patient import RecallPatient
+from app.models.sync_run import SyncRun
+from app.models.email_outbox import EmailOutbox
 # from app.models.staff import Staff
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,33 @@
+"""add email outbox tool call id
+
+Revision ID: 0d5b8e3c7a24
+Revises: c47e2a9d1f83
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0d5b8e3c7a24"
+down_revision: Union[str, None] = "c47e2a9d1f83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "email_outbox",
+        sa.Column("tool_call_id", sa.String(length=128), nullable=True),
+    )
+    op.create_unique_constraint(
+        "email_outbox_tool_call_id_key", "email_outbox", ["tool_call_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("email_outbox_tool_call_id_key", "email_outbox", type_="unique")
+    op.drop_column("email_outbox", "tool_call_id")
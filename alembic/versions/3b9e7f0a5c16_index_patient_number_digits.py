@@ -0,0 +1,43 @@
+"""index the digits of patient numbers for search
+
+Phone search matches the digits of the stored number, so that formatted
+numbers ("07700 900123") match digit queries. The expression must match
+NUMBER_DIGITS in app.utils.search. It replaces the trigram index on the raw
+number, which search no longer uses.
+
+Revision ID: 3b9e7f0a5c16
+Revises: 8f1c6d2b9e57
+Create Date: 2026-10-20 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9e7f0a5c16"
+down_revision: Union[str, None] = "8f1c6d2b9e57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recall_patients_number_digits_trgm "
+            "ON recall_patients USING gin "
+            "(regexp_replace(number, '\\D', '', 'g') gin_trgm_ops)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_recall_patients_number_trgm")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recall_patients_number_trgm "
+            "ON recall_patients USING gin (number gin_trgm_ops)"
+        )
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_recall_patients_number_digits_trgm"
+        )
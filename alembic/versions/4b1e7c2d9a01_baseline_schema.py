@@ -0,0 +1,93 @@
+"""baseline schema
+
+Mirrors the tables that ``Base.metadata.create_all`` produced before the
+project started tracking migrations. Databases that already have these
+tables should be stamped rather than upgraded::
+
+    alembic stamp 4b1e7c2d9a01
+
+Revision ID: 4b1e7c2d9a01
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4b1e7c2d9a01"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "admin",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("first_name", sa.String(length=128), nullable=False),
+        sa.Column("last_name", sa.String(length=128), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="admin_pkey"),
+    )
+    op.create_table(
+        "practices",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("practice_name", sa.String(length=128), nullable=False),
+        sa.Column("practice_email", sa.String(length=128), nullable=False),
+        sa.Column("practice_phone_number", sa.String(length=128), nullable=False),
+        sa.Column("practice_address", sa.String(length=128), nullable=False),
+        sa.Column("admin_id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["admin_id"], ["admin.id"], name="practices_admin_id_fkey"
+        ),
+        sa.PrimaryKeyConstraint("id", name="practices_pkey"),
+        sa.UniqueConstraint("id", name="practices_id_key"),
+    )
+    op.create_table(
+        "recall_groups",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("name", sa.String(length=128), nullable=False),
+        sa.Column("description", sa.String(length=256), nullable=True),
+        sa.Column("practice_id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["practice_id"], ["practices.id"], name="recall_groups_practice_id_fkey"
+        ),
+        sa.PrimaryKeyConstraint("id", name="recall_groups_pkey"),
+        sa.UniqueConstraint("id", name="recall_groups_id_key"),
+    )
+    op.create_table(
+        "recall_patients",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("first_name", sa.String(length=128), nullable=False),
+        sa.Column("last_name", sa.String(length=128), nullable=False),
+        sa.Column("email", sa.String(length=128), nullable=False),
+        sa.Column("number", sa.String(length=128), nullable=False),
+        sa.Column("dob", sa.String(length=128), nullable=False),
+        sa.Column("notes", sa.String(length=256), nullable=True),
+        sa.Column("recall_group_id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["recall_group_id"],
+            ["recall_groups.id"],
+            name="recall_patients_recall_group_id_fkey",
+        ),
+        sa.PrimaryKeyConstraint("id", name="recall_patients_pkey"),
+        sa.UniqueConstraint("id", name="recall_patients_id_key"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("recall_patients")
+    op.drop_table("recall_groups")
+    op.drop_table("practices")
+    op.drop_table("admin")
@@ -0,0 +1,47 @@
+"""cascade recall group deletes to recall_patients
+
+The new constraint is added NOT VALID, which only holds the exclusive
+lock briefly, and that transaction is committed before the constraint is
+validated. VALIDATE CONSTRAINT checks existing rows under a SHARE UPDATE
+EXCLUSIVE lock, so reads and writes continue during the scan.
+
+Revision ID: 5e0b9d7a1f62
+Revises: d2a86f41c3e7
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e0b9d7a1f62"
+down_revision: Union[str, None] = "d2a86f41c3e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _replace_group_fk(on_delete: str) -> None:
+    op.execute(
+        "ALTER TABLE recall_patients "
+        "DROP CONSTRAINT recall_patients_recall_group_id_fkey, "
+        "ADD CONSTRAINT recall_patients_recall_group_id_fkey "
+        "FOREIGN KEY (recall_group_id) REFERENCES recall_groups (id) "
+        f"{on_delete} NOT VALID"
+    )
+    # Commits the ALTER above, releasing its ACCESS EXCLUSIVE lock, before
+    # the scan
+    with op.get_context().autocommit_block():
+        op.execute(
+            "ALTER TABLE recall_patients "
+            "VALIDATE CONSTRAINT recall_patients_recall_group_id_fkey"
+        )
+
+
+def upgrade() -> None:
+    _replace_group_fk("ON DELETE CASCADE")
+
+
+def downgrade() -> None:
+    _replace_group_fk("")
@@ -0,0 +1,34 @@
+"""index the digits of patient numbers for caller lookups
+
+Caller lookups that miss the in-memory index match the digits of the
+stored number exactly, which the trigram index cannot serve as an IN list.
+The expression must match NUMBER_DIGITS in app.utils.search.
+
+Revision ID: 6d2f8b4a1e93
+Revises: 3b9e7f0a5c16
+Create Date: 2026-10-20 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6d2f8b4a1e93"
+down_revision: Union[str, None] = "3b9e7f0a5c16"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recall_patients_number_digits "
+            "ON recall_patients (regexp_replace(number, '\\D', '', 'g'))"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_recall_patients_number_digits")
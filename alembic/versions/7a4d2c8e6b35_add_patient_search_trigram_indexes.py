@@ -0,0 +1,47 @@
+"""add trigram indexes for patient search
+
+The expressions must match the ones used by app.utils.search, otherwise
+the planner cannot use the indexes. They are created here rather than on
+the model because they need the pg_trgm extension, which
+Base.metadata.create_all does not install.
+
+Revision ID: 7a4d2c8e6b35
+Revises: 5e0b9d7a1f62
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a4d2c8e6b35"
+down_revision: Union[str, None] = "5e0b9d7a1f62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = {
+    "ix_recall_patients_full_name_trgm": (
+        "lower(first_name || ' ' || last_name) gin_trgm_ops"
+    ),
+    "ix_recall_patients_email_trgm": "lower(email) gin_trgm_ops",
+    "ix_recall_patients_number_trgm": "number gin_trgm_ops",
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, expression in INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON recall_patients USING gin ({expression})"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
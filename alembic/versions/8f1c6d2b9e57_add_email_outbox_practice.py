@@ -0,0 +1,38 @@
+"""add email outbox practice
+
+Revision ID: 8f1c6d2b9e57
+Revises: 0d5b8e3c7a24
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8f1c6d2b9e57"
+down_revision: Union[str, None] = "0d5b8e3c7a24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "email_outbox",
+        sa.Column("practice_id", sa.String(length=36), nullable=True),
+    )
+    op.create_foreign_key(
+        "email_outbox_practice_id_fkey",
+        "email_outbox",
+        "practices",
+        ["practice_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("email_outbox_practice_id_fkey", "email_outbox", type_="foreignkey")
+    op.drop_column("email_outbox", "practice_id")
@@ -0,0 +1,57 @@
+"""add indexes for hot lookups
+
+The indexes are built with CREATE INDEX CONCURRENTLY so the migration can
+run against a live database without blocking writes. Postgres refuses to
+build indexes concurrently inside a transaction, hence the autocommit
+block.
+
+Revision ID: 9c3f5a7e2b14
+Revises: 4b1e7c2d9a01
+Create Date: 2026-10-19 09:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c3f5a7e2b14"
+down_revision: Union[str, None] = "4b1e7c2d9a01"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_practices_admin_id", "practices", ["admin_id"]),
+    ("ix_practices_practice_email", "practices", ["practice_email"]),
+    ("ix_recall_groups_practice_id", "recall_groups", ["practice_id"]),
+    (
+        "ix_recall_patients_recall_group_id_created_at",
+        "recall_patients",
+        ["recall_group_id", "created_at"],
+    ),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,60 @@
+"""add call campaigns
+
+Revision ID: a6d3e9f1b752
+Revises: f3a7c1d95e40
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6d3e9f1b752"
+down_revision: Union[str, None] = "f3a7c1d95e40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "call_campaigns",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("recall_group_id", sa.String(length=36), nullable=False),
+        sa.Column("call_context", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("dialed", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("resumed", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(length=512), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["recall_group_id"],
+            ["recall_groups.id"],
+            name="call_campaigns_recall_group_id_fkey",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name="call_campaigns_pkey"),
+        sa.UniqueConstraint("id", name="call_campaigns_id_key"),
+    )
+    op.create_index(
+        "ix_call_campaigns_recall_group_id", "call_campaigns", ["recall_group_id"]
+    )
+    op.create_index(
+        "ix_call_campaigns_lease_expires_at",
+        "call_campaigns",
+        ["lease_expires_at"],
+        postgresql_where=sa.text("status = 'running'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_call_campaigns_lease_expires_at", table_name="call_campaigns")
+    op.drop_index("ix_call_campaigns_recall_group_id", table_name="call_campaigns")
+    op.drop_table("call_campaigns")
@@ -0,0 +1,68 @@
+"""add due patients sync tables and external ids
+
+Revision ID: b81f3e5c0d29
+Revises: 7a4d2c8e6b35
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b81f3e5c0d29"
+down_revision: Union[str, None] = "7a4d2c8e6b35"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sync_runs",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("source", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("watermark", sa.String(length=64), nullable=True),
+        sa.Column("fetched", sa.Integer(), nullable=False),
+        sa.Column("inserted", sa.Integer(), nullable=False),
+        sa.Column("updated", sa.Integer(), nullable=False),
+        sa.Column("skipped", sa.Integer(), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(length=512), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name="sync_runs_pkey"),
+        sa.UniqueConstraint("id", name="sync_runs_id_key"),
+    )
+    op.create_index(
+        "ix_sync_runs_source_started_at", "sync_runs", ["source", "started_at"]
+    )
+    op.add_column(
+        "recall_patients", sa.Column("external_id", sa.String(length=64), nullable=True)
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ux_recall_patients_recall_group_id_external_id",
+            "recall_patients",
+            ["recall_group_id", "external_id"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ux_recall_patients_recall_group_id_external_id",
+            table_name="recall_patients",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("recall_patients", "external_id")
+    op.drop_index("ix_sync_runs_source_started_at", table_name="sync_runs")
+    op.drop_table("sync_runs")
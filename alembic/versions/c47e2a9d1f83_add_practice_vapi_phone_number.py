@@ -0,0 +1,35 @@
+"""add practice vapi phone number
+
+Revision ID: c47e2a9d1f83
+Revises: a6d3e9f1b752
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c47e2a9d1f83"
+down_revision: Union[str, None] = "a6d3e9f1b752"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "practices",
+        sa.Column("vapi_phone_number_id", sa.String(length=128), nullable=True),
+    )
+    op.create_unique_constraint(
+        "practices_vapi_phone_number_id_key", "practices", ["vapi_phone_number_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "practices_vapi_phone_number_id_key", "practices", type_="unique"
+    )
+    op.drop_column("practices", "vapi_phone_number_id")
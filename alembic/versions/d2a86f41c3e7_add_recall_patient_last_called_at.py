@@ -0,0 +1,28 @@
+"""add last_called_at to recall_patients
+
+Revision ID: d2a86f41c3e7
+Revises: 9c3f5a7e2b14
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2a86f41c3e7"
+down_revision: Union[str, None] = "9c3f5a7e2b14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "recall_patients", sa.Column("last_called_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("recall_patients", "last_called_at")
@@ -0,0 +1,59 @@
+"""add typed recall schedule columns to recall_patients
+
+Existing rows are backfilled separately with
+`python -m scripts.backfill_recall_dates`, in batches, so this migration
+only takes brief locks.
+
+Revision ID: e6c94b2a7f18
+Revises: b81f3e5c0d29
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6c94b2a7f18"
+down_revision: Union[str, None] = "b81f3e5c0d29"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("recall_patients", sa.Column("dob_date", sa.Date(), nullable=True))
+    op.add_column(
+        "recall_patients", sa.Column("last_recall_at", sa.Date(), nullable=True)
+    )
+    op.add_column(
+        "recall_patients",
+        sa.Column("recall_interval_days", sa.Integer(), nullable=True),
+    )
+    op.add_column(
+        "recall_patients", sa.Column("next_due_at", sa.Date(), nullable=True)
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_recall_patients_recall_group_id_next_due_at",
+            "recall_patients",
+            ["recall_group_id", "next_due_at"],
+            postgresql_where=sa.text("next_due_at IS NOT NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_recall_patients_recall_group_id_next_due_at",
+            table_name="recall_patients",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("recall_patients", "next_due_at")
+    op.drop_column("recall_patients", "recall_interval_days")
+    op.drop_column("recall_patients", "last_recall_at")
+    op.drop_column("recall_patients", "dob_date")
@@ -2,8 +2,8 @@
 """sets environment variable using pydantic BaseSettings"""
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import EmailStr
-from typing import List
+from pydantic import EmailStr, Field
+from typing import List, Literal, Optional
 
 from dotenv import load_dotenv
 
@@ -15,23 +15,29 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file="../../.env", env_file_encoding="utf-8")
 
+    # Credentials are optional here so the app can be imported (by tests,
+    # scripts and tooling) without them; startup fails if any is missing,
+    # see missing_settings()
+
     # email settings
-    SENDGRID_API_KEY: str
-    SENDER_EMAIL: EmailStr
-    PHONE_NUMBER_ID: str
-    ASSISTANT_ID: str
-    VAPI_API_KEY: str
-    POSTMAN_API_KEY: str
-    POSTMAN_BASE_URL: str
+    SENDGRID_API_KEY: Optional[str] = None
+    SENDER_EMAIL: Optional[EmailStr] = None
+    PHONE_NUMBER_ID: Optional[str] = None
+    ASSISTANT_ID: Optional[str] = None
+    VAPI_API_KEY: Optional[str] = None
+    POSTMAN_API_KEY: Optional[str] = None
+    POSTMAN_BASE_URL: Optional[str] = None
 
     project_name: str = "WA Health"
 
     #  database settings
-    DB_USER: str
-    DB_PASSWORD: str
-    DB_NAME: str
-    DB_HOST: str
-    DB_PORT: str
+    DB_USER: Optional[str] = None
+    DB_PASSWORD: Optional[str] = None
+    DB_NAME: Optional[str] = None
+    DB_HOST: Optional[str] = None
+    DB_PORT: Optional[str] = None
+    # Seconds to wait for a new database connection
+    DB_CONNECT_TIMEOUT_SECONDS: int = 5
     
     # CORS settings
     CORS_ORIGINS: List[str] = [
@@ -53,6 +59,99 @@ class Settings(BaseSettings):
     
     # VAPI settings
     VAPI_BASE_URL: str = "https://api.vapi.ai/"
+    # Limit on each Vapi request; must stay below CAMPAIGN_LEASE_SECONDS so
+    # a hung dial cannot outlive its campaign's lease
+    VAPI_TIMEOUT_SECONDS: float = 60
+    # Shared secret Vapi sends in the X-Vapi-Secret header of tool calls;
+    # tool calls that need it are refused while it is unset
+    VAPI_SERVER_SECRET: Optional[str] = None
+
+    # SendGrid API host, overridden to point at a stand-in for load tests
+    SENDGRID_HOST: str = "https://api.sendgrid.com"
+
+    # Due patients API settings
+    # "upstream" proxies the due patients API, "local" computes due patients
+    # from the recall schedule stored with each patient
+    DUE_PATIENTS_SOURCE: Literal["upstream", "local"] = "upstream"
+    DUE_PATIENTS_CACHE_TTL_SECONDS: int = 60
+    DUE_PATIENTS_MAX_STALE_SECONDS: int = 600
+    # Recall group that due patients are synced into; sync is off when unset
+    DUE_PATIENTS_SYNC_GROUP_ID: Optional[str] = None
+    DUE_PATIENTS_SYNC_INTERVAL_SECONDS: int = 900
+
+    # Email outbox settings
+    OUTBOX_POLL_INTERVAL_SECONDS: int = 5
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE_SECONDS: int = 30
+    # How long, and for how many tool calls, repeated webhooks are deduplicated
+    TOOL_CALL_DEDUPE_TTL_SECONDS: int = 3600
+    TOOL_CALL_DEDUPE_MAX_ENTRIES: int = 10000
+    # Compiled email templates; defaults to a directory in the temp dir
+    TEMPLATE_CACHE_DIR: Optional[str] = None
+
+    # Serve Prometheus metrics from /metrics
+    METRICS_ENABLED: bool = True
+    # Share of requests traced; 0 turns tracing off. Requests with a
+    # traceparent header follow the caller's sampling decision.
+    TRACE_SAMPLE_RATE: float = Field(default=0.0, ge=0, le=1)
+    # "file" appends JSON lines to TRACE_FILE, "collector" posts OTLP/HTTP
+    # JSON to TRACE_COLLECTOR_URL
+    TRACE_EXPORTER: Literal["file", "collector"] = "file"
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_COLLECTOR_URL: str = "http://localhost:4318/v1/traces"
+    # Per-request SQL statistics and N+1 detection
+    QUERY_STATS_ENABLED: bool = True
+    # Add X-DB-Query-Count/-Time-Ms/-Repeated-Queries headers (debugging)
+    QUERY_STATS_HEADERS: bool = False
+    QUERY_N_PLUS_ONE_THRESHOLD: int = 5
+    # Log queries slower than this, with their plan if SLOW_QUERY_EXPLAIN
+    # is set; 0 turns slow query logging off
+    SLOW_QUERY_MS: int = 0
+    SLOW_QUERY_EXPLAIN: bool = False
+    # "warn" logs endpoints over their query budget, "enforce" fails them
+    # (for test runs)
+    QUERY_BUDGET_MODE: Literal["off", "warn", "enforce"] = "warn"
+    # Logging: "json" lines for production, "text" for local development
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    # Replace patient and credential fields in log records
+    LOG_REDACT: bool = True
+    # Records waiting to be written; further records are dropped
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Caller lookup settings
+    CALLER_INDEX_REFRESH_SECONDS: int = 300
+
+    # Graceful shutdown: how long readiness fails before the server stops
+    # accepting connections, and how long running campaigns get to stop
+    SHUTDOWN_READINESS_DELAY_SECONDS: float = 5
+    SHUTDOWN_DRAIN_TIMEOUT_SECONDS: float = 20
+    # A campaign whose worker stopped renewing its lease for this long is
+    # resumed by another worker; must exceed the duration of one Vapi call
+    CAMPAIGN_LEASE_SECONDS: int = 120
+    CAMPAIGN_RESUME_INTERVAL_SECONDS: int = 30
+
+    # Health probes: /readyz serves results refreshed every interval;
+    # only failures of the critical probes fail readiness
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 5
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 2
+    HEALTH_CRITICAL_PROBES: List[Literal["db", "auth", "vapi"]] = ["db"]
+
+    # CSV exports: rows fetched from the database and written per chunk
+    EXPORT_CHUNK_ROWS: int = 2000
+
+    def missing_settings(self) -> List[str]:
+        """Required settings that are not set"""
+        return [key for key in REQUIRED_SETTINGS if not getattr(self, key)]
+
+
+# Checked when the app starts
+REQUIRED_SETTINGS = (
+    "SENDGRID_API_KEY", "SENDER_EMAIL", "PHONE_NUMBER_ID", "ASSISTANT_ID",
+    "VAPI_API_KEY", "POSTMAN_API_KEY", "POSTMAN_BASE_URL",
+    "DB_USER", "DB_PASSWORD", "DB_NAME", "DB_HOST", "DB_PORT",
+)
 
 
 settings = Settings()
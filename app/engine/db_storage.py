@@ -5,8 +5,12 @@ Class for sqlAlchemy that handles __session connections
 contains:
     - instance:
         - all: query objects from db
+        - project: read-only column projections returning rows
         - new: add objects to db
+        - bulk_insert/bulk_update: executemany writes from dictionaries
+        - execute: run a Core statement (e.g. INSERT ... ON CONFLICT)
         - commit: commit __session
+        - rollback: roll back __session
         - delete: remove __session from db
         - reload: reload the current __session
         - close: end __session
@@ -16,11 +20,27 @@ contains:
         - __session
         - dic
 """
+import logging
+import threading
+from typing import Optional
+
 from app.config.config import settings      
 from app.models.base_model import Base
 from sqlalchemy import create_engine, exc
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
 from app.models import Admin, Practice 
+from app.utils.metrics import track_engine
+from app.utils.query_stats import describe_db_error, untracked_queries
+# Registers the mapper events that maintain recall due dates on every write
+import app.utils.recall_due  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock = threading.Lock()
 
 
 def db_credentials_are_set():
@@ -28,9 +48,50 @@ def db_credentials_are_set():
     return all(getattr(settings, key) for key in required_keys)
 
 
-if not db_credentials_are_set():
-    """checks if DB credentials are set in the .env file"""
-    print("DB credentials are not set")
+def get_engine() -> Engine:
+    """
+    Returns the process-wide engine, created on first use. Every DBStorage
+    shares it, and so shares one connection pool.
+    """
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                DB_URL = (
+                    f"postgresql+psycopg2://{settings.DB_USER}:{settings.DB_PASSWORD}"
+                    f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+                )
+                engine = create_engine(
+                    DB_URL,
+                    pool_pre_ping=True,
+                    connect_args={"connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS},
+                )
+                track_engine(engine)
+                _session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+                _engine = engine
+    return _engine
+
+
+def create_schema():
+    """
+    Creates missing tables. Runs once at startup; connecting also verifies
+    the database is reachable.
+    """
+    try:
+        with untracked_queries():
+            Base.metadata.create_all(get_engine())
+    except exc.SQLAlchemyError as e:
+        logger.error("Failed to connect to the database: %s", describe_db_error(e))
+        raise
+
+
+def dispose_engine():
+    """Closes the pooled connections of the engine"""
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = _session_factory = None
 
 
 class DBStorage:
@@ -43,24 +104,8 @@ class DBStorage:
     __session = None
 
     def __init__(self):
-        """Initializes a database engine connection using environment variables"""
-        DB_USER = settings.DB_USER
-        DB_PASSOWRD = settings.DB_PASSWORD
-        DB_HOST = settings.DB_HOST
-        DB_NAME = settings.DB_NAME
-        DB_PORT = settings.DB_PORT
-        DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSOWRD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-
-        try:
-            self.engine = create_engine(DB_URL, pool_pre_ping=True)
-            # Attempt to connect to the database to verify that the engine is working.
-            with self.engine.connect() as conn:
-                pass
-        except exc.SQLAlchemyError as e:
-            print(f"Failed to connect to the database: {e}")
-            # manage the error appropriately
-            raise
-
+        """Uses the shared engine; no connection is made until a query runs"""
+        self.engine = get_engine()
         self.__session = None
 
     def all(self, cls=None):
@@ -89,17 +134,36 @@ class DBStorage:
                     dic[key] = elem
         return dic
 
-    def query_eng(self, cls=None):
+    def query_eng(self, cls=None, *entities):
         """
         Creates and returns a SQLAlchemy Query object for a specified model class.
 
         Parameters:
             cls (Base, optional): The model class to query in the database. Must be a subclass of SQLAlchemy's Base.
+            entities: Additional model classes or columns to select alongside cls.
 
         Returns:
             Query: A SQLAlchemy Query object configured for the specified model class.
         """
-        return self.__session.query(cls)
+        return self.__session.query(cls, *entities)
+
+    def project(self, cls, *fields):
+        """
+        Creates a read-only query selecting only the named columns of a model.
+
+        Results are immutable rows with attribute access (`row.first_name`)
+        instead of ORM instances: no identity map entries, instance state or
+        per-object __dict__, so large reads take a fraction of the CPU and
+        memory. Rows cannot be modified or flushed; write with query_eng.
+
+        Parameters:
+            cls (Base): The model class to read.
+            fields (str): Names of the mapped columns to select.
+
+        Returns:
+            Query: A SQLAlchemy Query returning Row objects.
+        """
+        return self.__session.query(*(getattr(cls, name) for name in fields))
 
     def add(self, obj):
         """
@@ -116,7 +180,7 @@ class DBStorage:
             self.__session.commit()
         except exc.SQLAlchemyError as e:
             self.__session.rollback()
-            print(f"Failed to add object to database: {e}")
+            logger.error("Failed to add object to database: %s", describe_db_error(e))
             raise
 
     def delete(self, obj):
@@ -134,7 +198,7 @@ class DBStorage:
             self.__session.commit()
         except exc.SQLAlchemyError as e:
             self.__session.rollback()
-            print(f"Failed to delete object from database: {e}")
+            logger.error("Failed to delete object from database: %s", describe_db_error(e))
             raise
 
     def update(self, obj):
@@ -152,9 +216,44 @@ class DBStorage:
             self.__session.commit()
         except exc.SQLAlchemyError as e:
             self.__session.rollback()
-            print(f"Failed to update object in database: {e}")
+            logger.error("Failed to update object in database: %s", describe_db_error(e))
             raise
 
+    def bulk_insert(self, cls, mappings):
+        """
+        Inserts rows from a list of dictionaries using executemany, without
+        creating ORM instances. Changes are not committed; call commit().
+
+        Parameters:
+            cls (Base): The model class of the rows.
+            mappings (list[dict]): Column values of each row, including the primary key.
+        """
+        self.__session.bulk_insert_mappings(cls, mappings)
+
+    def bulk_update(self, cls, mappings):
+        """
+        Updates rows from a list of dictionaries using executemany, without
+        loading ORM instances. Changes are not committed; call commit().
+
+        Parameters:
+            cls (Base): The model class of the rows.
+            mappings (list[dict]): Primary key and changed column values of each row.
+        """
+        self.__session.bulk_update_mappings(cls, mappings)
+
+    def execute(self, statement):
+        """
+        Executes a Core statement in the session, for writes the ORM cannot
+        express. Changes are not committed; call commit().
+
+        Parameters:
+            statement (Executable): The statement to execute.
+
+        Returns:
+            Result: The result of the statement.
+        """
+        return self.__session.execute(statement)
+
     def find_by_id(self, cls, id):
         """
         Retrieves an object by its ID.
@@ -171,12 +270,11 @@ class DBStorage:
     def setup_db(self):
         """
         Desc:
-             init/load connection
+             opens a session on the shared engine. Tables are created
+             once at startup by create_schema()
         """
-        Base.metadata.create_all(self.engine)
-        sec = sessionmaker(bind=self.engine, expire_on_commit=False)
-        Session = scoped_session(sec)
-        self.__session = Session()
+        get_engine()
+        self.__session = _session_factory()
 
     def commit(self):
         """
@@ -185,6 +283,13 @@ class DBStorage:
         """
         self.__session.commit()
 
+    def rollback(self):
+        """
+        Desc:
+            rolls back the current transaction
+        """
+        self.__session.rollback()
+
     def refresh(self, obj):
         self.__session.refresh(obj)
 
@@ -1,5 +1,11 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 import fastapi
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.routers import patient
 from app.routers import mail
 from app.routers import admin
@@ -8,8 +14,62 @@ from app.routers import recall
 from slowapi.errors import RateLimitExceeded
 from app.utils.limiter import limiter, custom_rate_limit_exceeded_handler
 from app.config.config import settings
+from app.engine.db_storage import create_schema, dispose_engine
+from app.utils.log import RequestIdMiddleware, configure_logging, stop_logging
+from app.utils.caller_index import keep_caller_index_fresh
+from app.utils.campaigns import resume_campaigns_periodically, wait_for_campaigns
+from app.utils.drain import begin_drain, install_signal_handlers
+from app.utils.health import close_probe_client, health
+from app.utils.auth import close_auth_client
+from app.utils.patient import close_http_client
+from app.utils.sync import sync_due_patients_periodically
+from app.utils.mail import run_outbox_sender, warm_templates
+from app.utils.metrics import MetricsMiddleware
+from app.utils.query_stats import enable_query_stats
+from app.utils.tracing import enable_tracing, exporter
+from app.utils.vapi_client import close_vapi_client
+from starlette.concurrency import run_in_threadpool
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: fastapi.FastAPI):
+    """
+    Owns the process-wide resources: checks settings and creates the schema
+    before serving, runs the background jobs, and closes the upstream
+    clients and database pool on shutdown. Clients are otherwise created on
+    first use, so importing the app needs no credentials or connections.
+    """
+    missing = settings.missing_settings()
+    if missing:
+        raise RuntimeError(f"Missing required settings: {', '.join(missing)}")
+    if settings.VAPI_TIMEOUT_SECONDS >= settings.CAMPAIGN_LEASE_SECONDS:
+        raise RuntimeError("VAPI_TIMEOUT_SECONDS must be less than CAMPAIGN_LEASE_SECONDS")
+    await run_in_threadpool(create_schema)
+    warm_templates()
+    # Ready as soon as the server starts, if the dependencies are up
+    await health.refresh()
+    install_signal_handlers(asyncio.get_running_loop())
+    start_background_jobs()
+    try:
+        yield
+    finally:
+        begin_drain()
+        if not await wait_for_campaigns(settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS):
+            logger.warning("Campaigns still running at the drain deadline; they resume elsewhere")
+        await stop_background_jobs()
+        await close_http_client()
+        await close_auth_client()
+        await close_probe_client()
+        close_vapi_client()
+        dispose_engine()
+        exporter.flush()
+        stop_logging()
 
-app = fastapi.FastAPI(title=settings.project_name)
+
+app = fastapi.FastAPI(title=settings.project_name, lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, custom_rate_limit_exceeded_handler)
 
@@ -20,12 +80,67 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if settings.QUERY_STATS_ENABLED:
+    enable_query_stats(app)
+if settings.TRACE_SAMPLE_RATE > 0:
+    enable_tracing(app)
+# Outermost, so every log line of the request carries its id
+app.add_middleware(RequestIdMiddleware)
+
+
+def start_background_jobs():
+    app.state.background_tasks = [
+        asyncio.create_task(
+            keep_caller_index_fresh(settings.CALLER_INDEX_REFRESH_SECONDS)
+        ),
+        asyncio.create_task(run_outbox_sender(settings.OUTBOX_POLL_INTERVAL_SECONDS)),
+        asyncio.create_task(
+            resume_campaigns_periodically(settings.CAMPAIGN_RESUME_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(health.run(settings.HEALTH_PROBE_INTERVAL_SECONDS)),
+    ]
+    if settings.DUE_PATIENTS_SYNC_GROUP_ID:
+        app.state.background_tasks.append(
+            asyncio.create_task(
+                sync_due_patients_periodically(
+                    settings.DUE_PATIENTS_SYNC_GROUP_ID,
+                    settings.DUE_PATIENTS_SYNC_INTERVAL_SECONDS,
+                )
+            )
+        )
+
+
+async def stop_background_jobs():
+    for task in app.state.background_tasks:
+        task.cancel()
+    await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
 
 
 @app.get("/")
 def read_root():
     return {"message": "Hello, World!"}
 
+
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    """Liveness: the worker is serving requests. Dependencies are not checked"""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    """Readiness from the cached probe results; 503 when traffic should go elsewhere"""
+    report = health.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+def metrics():
+    return fastapi.Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+if settings.METRICS_ENABLED:
+    app.add_api_route("/metrics", metrics, include_in_schema=False)
+
 @app.get("/test-rate-limit")
 @limiter.limit("1/hour")
 async def test_rate_limit(request: fastapi.Request):
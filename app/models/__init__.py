@@ -3,6 +3,9 @@ from app.models.admin import Admin
 from app.models.practice import Practice
 from app.models.recall_group import RecallGroup
 from app.models.recall_patient import RecallPatient
+from app.models.sync_run import SyncRun
+from app.models.email_outbox import EmailOutbox
+from app.models.call_campaign import CallCampaign
 
 # This ensures all models are known to SQLAlchemy
-__all__ = ['Base', 'Admin', 'Practice', 'RecallGroup', 'RecallPatient'] 
\ No newline at end of file
+__all__ = ['Base', 'Admin', 'Practice', 'RecallGroup', 'RecallPatient', 'SyncRun', 'EmailOutbox', 'CallCampaign'] 
\ No newline at end of file
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base_model import BaseModel, Base
+
+
+class CallCampaign(BaseModel, Base):
+    """CallCampaign table recording the dialing of a recall group, so it can be resumed"""
+
+    __tablename__ = "call_campaigns"
+    __table_args__ = (
+        # Workers only ever scan unfinished campaigns
+        Index(
+            "ix_call_campaigns_lease_expires_at",
+            "lease_expires_at",
+            postgresql_where=text("status = 'running'"),
+            sqlite_where=text("status = 'running'"),
+        ),
+    )
+
+    recall_group_id: Mapped[str] = mapped_column(
+        ForeignKey("recall_groups.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    call_context: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # running -> completed. A running campaign belongs to the worker holding
+    # its lease; once the lease expires any worker resumes it
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="running")
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    lease_expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    dialed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Times the campaign was stopped by a shutdown and resumed
+    resumed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base_model import BaseModel, Base
+
+
+class EmailOutbox(BaseModel, Base):
+    """EmailOutbox table queuing emails until the background sender delivers them"""
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The sender only ever scans undelivered messages
+        Index(
+            "ix_email_outbox_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status IN ('pending', 'sending')"),
+            sqlite_where=text("status IN ('pending', 'sending')"),
+        ),
+    )
+
+    template: Mapped[str] = mapped_column(String(64), nullable=False)
+    to_email: Mapped[str] = mapped_column(String(128), nullable=False)
+    # JSON encoded template context
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    # pending -> sending -> sent, or failed once attempts are exhausted
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+    provider_status: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    provider_message_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    # Vapi tool call that queued the email; a retried tool call finds the
+    # email of the first one instead of queueing another
+    tool_call_id: Mapped[Optional[str]] = mapped_column(
+        String(128), nullable=True, unique=True
+    )
+    # Practice whose admin may read the delivery status
+    practice_id: Mapped[Optional[str]] = mapped_column(
+        ForeignKey("practices.id", ondelete="SET NULL"), nullable=True
+    )
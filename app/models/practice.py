@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy import String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -9,10 +11,16 @@ class Practice(BaseModel, Base):
 
     __tablename__ = "practices"
     practice_name: Mapped[str] = mapped_column(String(128), nullable=False)
-    practice_email: Mapped[str] = mapped_column(String(128), nullable=False)
+    practice_email: Mapped[str] = mapped_column(String(128), nullable=False, index=True)
     practice_phone_number: Mapped[str] = mapped_column(String(128), nullable=False)
     practice_address: Mapped[str] = mapped_column(String(128), nullable=False)
-    admin_id: Mapped[str] = mapped_column(ForeignKey("admin.id"), nullable=False)
+    admin_id: Mapped[str] = mapped_column(
+        ForeignKey("admin.id"), nullable=False, index=True
+    )
+    # Vapi phone number whose calls may look up this practice's patients
+    vapi_phone_number_id: Mapped[Optional[str]] = mapped_column(
+        String(128), nullable=True, unique=True
+    )
 
     admin = relationship("Admin", back_populates="practice")
     recall_groups = relationship("RecallGroup", back_populates="practice")
@@ -10,8 +10,17 @@ class RecallGroup(BaseModel, Base):
     __tablename__ = "recall_groups"
     name: Mapped[str] = mapped_column(String(128), nullable=False)
     description: Mapped[str] = mapped_column(String(256), nullable=True)
-    practice_id: Mapped[str] = mapped_column(ForeignKey("practices.id"), nullable=False)
+    practice_id: Mapped[str] = mapped_column(
+        ForeignKey("practices.id"), nullable=False, index=True
+    )
     
     # Relationships
     practice = relationship("Practice", back_populates="recall_groups")
-    patients = relationship("RecallPatient", back_populates="recall_group", cascade="all, delete-orphan") 
\ No newline at end of file
+    # The database cascades group deletes to patients (ON DELETE CASCADE), so
+    # passive_deletes stops the ORM from loading the patients to delete them
+    patients = relationship(
+        "RecallPatient",
+        back_populates="recall_group",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    ) 
\ No newline at end of file
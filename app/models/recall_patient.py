@@ -1,4 +1,5 @@
-from sqlalchemy import String, ForeignKey
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, Integer, String, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
 
@@ -9,13 +10,48 @@ class RecallPatient(BaseModel, Base):
     """RecallPatient table to store patient details for recall groups"""
 
     __tablename__ = "recall_patients"
+    __table_args__ = (
+        # Serves both plain group lookups and listings ordered by created_at
+        Index(
+            "ix_recall_patients_recall_group_id_created_at",
+            "recall_group_id",
+            "created_at",
+        ),
+        # Records synced from the due patients API are matched on their
+        # upstream id; manually added patients have none
+        Index(
+            "ux_recall_patients_recall_group_id_external_id",
+            "recall_group_id",
+            "external_id",
+            unique=True,
+        ),
+        # Due-patient range queries; patients without a schedule are left out
+        Index(
+            "ix_recall_patients_recall_group_id_next_due_at",
+            "recall_group_id",
+            "next_due_at",
+            postgresql_where=text("next_due_at IS NOT NULL"),
+            sqlite_where=text("next_due_at IS NOT NULL"),
+        ),
+    )
+
     first_name: Mapped[str] = mapped_column(String(128), nullable=False)
     last_name: Mapped[str] = mapped_column(String(128), nullable=False)
     email: Mapped[str] = mapped_column(String(128), nullable=False)
     number: Mapped[str] = mapped_column(String(128), nullable=False)
     dob: Mapped[str] = mapped_column(String(128), nullable=False)
     notes: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
-    recall_group_id: Mapped[str] = mapped_column(ForeignKey("recall_groups.id"), nullable=False)
+    last_called_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    external_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    # Typed recall schedule; dob_date and next_due_at are maintained by
+    # app.utils.recall_due on every write
+    dob_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    last_recall_at: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    recall_interval_days: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    next_due_at: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    recall_group_id: Mapped[str] = mapped_column(
+        ForeignKey("recall_groups.id", ondelete="CASCADE"), nullable=False
+    )
     
     # Relationships
     recall_group = relationship("RecallGroup", back_populates="patients") 
\ No newline at end of file
@@ -9,7 +9,8 @@ from app.engine.load import load
 from app.models.admin import Admin
 from app.models.practice import Practice
 from app.schema.admin import CreateAdmin
-from app.utils.auth import verify_admin, verify_token
+from app.utils.auth import get_auth_client, verify_admin, verify_token
+from app.utils.query_stats import query_budget
 
 
 router = APIRouter(prefix="/admin", tags=["Admin Management"])
@@ -43,17 +44,16 @@ async def register(
     }
 
     try:
-        async with httpx.AsyncClient() as client:
-            auth_response = await client.post(
-                f"{settings.AUTH_SERVICE_URL}{settings.AUTH_REGISTER_URL}", json=auth_payload
-            )
-            auth_response.raise_for_status()
-            auth_data = auth_response.json()
-            user_id = auth_data["id"]
-            
-            # Forward the cookie from auth service if it exists
-            if "set-cookie" in auth_response.headers:
-                response.headers["set-cookie"] = auth_response.headers["set-cookie"]
+        auth_response = await get_auth_client().post(
+            f"{settings.AUTH_SERVICE_URL}{settings.AUTH_REGISTER_URL}", json=auth_payload
+        )
+        auth_response.raise_for_status()
+        auth_data = auth_response.json()
+        user_id = auth_data["id"]
+
+        # Forward the cookie from auth service if it exists
+        if "set-cookie" in auth_response.headers:
+            response.headers["set-cookie"] = auth_response.headers["set-cookie"]
     except httpx.HTTPError as e:
         raise HTTPException(
             status_code=e.response.status_code if hasattr(e, "response") else 500,
@@ -93,6 +93,7 @@ async def protected_endpoint(user: dict = Depends(verify_admin)):
 
 
 @router.get("/me")
+@query_budget(2)
 def me(
     user: dict = Depends(verify_admin),
     db: Session = Depends(load)
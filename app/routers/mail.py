@@ -1,67 +1,149 @@
-from fastapi import APIRouter, Request, status, HTTPException
-from jinja2 import Environment, select_autoescape, PackageLoader
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import logging
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, Request, Response, status, HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.config.config import settings
-from app.schema.mail import AppointmentData
+from app.engine.load import load
+from app.models import EmailOutbox, Practice
+from app.schema.mail import AppointmentData, OutboxEmailStatus
+from app.utils.auth import verify_admin
+from app.utils.cache import IdempotencyStore
+from app.utils.caller_index import caller_index, practice_for_line_in_db
+from app.utils.mail import enqueue_confirmation_email, outbox_wakeup
 
-router = APIRouter(prefix="/mail", tags=["Mail management"])
+logger = logging.getLogger(__name__)
 
+router = APIRouter(prefix="/mail", tags=["Mail management"])
 
-jinja2_env = Environment(
-    loader=PackageLoader("app"), autoescape=select_autoescape(["html", "xml"])
+# Answers already given to Vapi tool calls, by tool call id. A fast path for
+# retries reaching the same worker; the outbox itself is keyed on the tool
+# call id, which deduplicates across workers and restarts.
+tool_call_results = IdempotencyStore(
+    ttl=settings.TOOL_CALL_DEDUPE_TTL_SECONDS,
+    max_entries=settings.TOOL_CALL_DEDUPE_MAX_ENTRIES,
 )
-sg_client = SendGridAPIClient(settings.SENDGRID_API_KEY)
 
 
 @router.post(
     "/confirmation_email",
-    status_code=status.HTTP_201_CREATED,
+    status_code=status.HTTP_202_ACCEPTED,
     summary="Send appointment confirmation email",
-    description="Sends an email confirmation for a scheduled appointment",
+    description="Queues an email confirmation for a scheduled appointment",
 )
-async def send_confirmation_email(request: Request):
+async def send_confirmation_email(
+    request: Request, response: Response, db: Session = Depends(load)
+):
+    """
+    Validates the appointment and stores the confirmation email in the outbox.
+
+    The email is delivered by the background outbox sender, so the voice
+    assistant gets its answer without waiting on SendGrid. Delivery status is
+    available from `GET /mail/outbox/{email_id}`.
+
+    Vapi retries tool calls that answer slowly. Requests are keyed on the
+    tool call id, and a retry gets the answer of the original request
+    instead of queueing a second email, whichever worker it reaches.
+    """
     try:
         data = await request.json()
-        print(data)
+        logger.debug("Tool call received", extra={"payload": data})
 
-        appointment_raw = data["message"]["toolCalls"][0]["function"]["arguments"][
-            "appointment_data"
-        ]
+        message = data["message"]
+        tool_call = message["toolCalls"][0]
+        appointment_raw = tool_call["function"]["arguments"]["appointment_data"]
+        call = message.get("call") or {}
+        line = call.get("phoneNumberId") or (message.get("phoneNumber") or {}).get("id")
+    except (KeyError, IndexError) as e:
+        logger.warning("Missing required field in request structure: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing required field in request structure: {str(e)}",
+        )
 
-        appointment = AppointmentData(**appointment_raw)
+    tool_call_id = tool_call.get("id")
 
-        template = jinja2_env.get_template("mail.html")
-        html = template.render(
-            patient_name=appointment.patient_name,
-            appointment_date=appointment.appointment_date,
-            appointment_time=appointment.appointment_time,
-            gp_name=appointment.gp_name,
-            appointment_details=appointment.model_dump(),
+    async def queue_email():
+        result, created = await run_in_threadpool(
+            _queue_confirmation_email, db, appointment_raw, tool_call_id, line
         )
+        if created:
+            outbox_wakeup.set()
+        return result, created
 
-        mail = Mail(
-            from_email=settings.SENDER_EMAIL,
-            to_emails=appointment.patient_email,
-            subject=f"Appointment Confirmation for {appointment.patient_name}",
-            html_content=html,
-        )
+    if not tool_call_id:
+        result, _ = await queue_email()
+        return result
 
-        response = sg_client.send(mail)
-        return {
-            "status": "success",
-            "message": "Email sent successfully",
-            "status_code": response.status_code,
-        }
-    except KeyError as e:
-        print(f"Missing required field in request structure: {str(e)}")
+    (result, created), replayed = await tool_call_results.run(tool_call_id, queue_email)
+    if replayed or not created:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+def _queue_confirmation_email(
+    db: Session, appointment_raw: dict, tool_call_id: Optional[str], line: Optional[str]
+) -> Tuple[dict, bool]:
+    try:
+        appointment = AppointmentData(**appointment_raw)
+    except ValidationError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Missing required field in request structure: {str(e)}",
+            detail=f"Invalid appointment data: {str(e)}",
+        )
+
+    # The practice assigned the Vapi phone number of the call
+    practice_id = line and (
+        caller_index.practice_for_line(line) or practice_for_line_in_db(db, line)
+    )
+
+    try:
+        email_id, created = enqueue_confirmation_email(
+            db, appointment, tool_call_id, practice_id or None
         )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error sending mail: {str(e)}",
         )
+
+    return {
+        "status": "success",
+        "message": "Email queued for delivery",
+        "email_id": email_id,
+    }, created
+
+
+@router.get(
+    "/outbox/{email_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=OutboxEmailStatus,
+    summary="Get email delivery status",
+    description="Returns the delivery status of a queued email",
+)
+async def get_outbox_email(
+    email_id: str,
+    admin_data: dict = Depends(verify_admin),
+    db: Session = Depends(load),
+):
+    """
+    Returns the delivery status of an email queued for the admin's practice.
+
+    Raises:
+    - 404 Not Found: If the email does not exist or belongs to another practice
+    """
+    email = (
+        db.query_eng(EmailOutbox)
+        .join(Practice, EmailOutbox.practice_id == Practice.id)
+        .filter(EmailOutbox.id == email_id, Practice.admin_id == admin_data["user_id"])
+        .first()
+    )
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Email not found",
+        )
+    return email
@@ -1,26 +1,38 @@
-from datetime import datetime
-from fastapi import APIRouter, status, HTTPException, Depends, Request
-from app.utils.patient import get_due_patients_util
-from vapi import Vapi
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, status, HTTPException, Depends, Query, Request, Response
+from app.utils.patient import get_due_patients_util, get_local_due_patients
 from vapi.core.api_error import ApiError
 import json
+import logging
 from app.utils.limiter import limiter
 from pydantic import BaseModel
 from typing import List, Optional
 from sqlalchemy.orm import Session
 
-from app.schema.patient import CallHistory, Customer, Patient, DemoPatient
+from app.schema.patient import CallHistory, Customer, Patient, DemoPatient, SyncRunResponse
 from app.config.config import settings
 from app.engine.load import load
 from app.models.recall_group import RecallGroup
 from app.models.recall_patient import RecallPatient
 from app.models.practice import Practice
-from app.utils.auth import verify_admin
+from app.utils.auth import oauth2_scheme, verify_admin, verify_vapi_secret
+from app.utils.calls import call_history
+from app.utils.campaigns import create_campaign, run_campaign
+from app.utils.caller_index import (
+    caller_index,
+    caller_lookup_result,
+    lookup_in_db,
+    practice_for_line_in_db,
+)
+from app.utils.drain import reject_when_draining
+from app.utils.export import CSVResponse, call_history_export
+from app.utils.responses import models_response
+from app.utils.sync import sync_due_patients
+from app.utils.vapi_client import get_vapi_client
+from starlette.concurrency import run_in_threadpool
 
 
-vapi_client = Vapi(
-    token=settings.VAPI_API_KEY,
-)
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
@@ -28,14 +40,88 @@ router = APIRouter(prefix="/patients", tags=["Patients"])
 
 
 
+async def due_patients_admin(request: Request) -> Optional[dict]:
+    """Requires an admin only when due patients are computed locally"""
+    if settings.DUE_PATIENTS_SOURCE != "local":
+        return None
+    return await verify_admin(await oauth2_scheme(request))
+
+
 @router.get(
     "/due_patients",
     status_code=status.HTTP_200_OK,
     summary="Get due patients",
     description="Get due patients",
 )
-async def get_due_patients():
-    return await get_due_patients_util()
+async def get_due_patients(
+    response: Response,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    admin_data: Optional[dict] = Depends(due_patients_admin),
+):
+    """
+    With `DUE_PATIENTS_SOURCE=local`, returns the admin's patients due by
+    `end` (default a week from `start`, or from today) from the local recall
+    schedule, overdue patients included unless `start` is given. Otherwise
+    proxies the upstream due patients API.
+    """
+    if admin_data is not None:
+        end = end or (start or date.today()) + timedelta(days=7)
+        return await run_in_threadpool(
+            get_local_due_patients, admin_data["user_id"], start, end, limit
+        )
+
+    due_patients = await get_due_patients_util()
+    response.headers["X-Cache"] = due_patients.status
+    response.headers["Age"] = str(int(due_patients.age))
+    if due_patients.error is not None:
+        # The upstream API is down: this is the last good snapshot
+        response.headers["Warning"] = '111 - "Revalidation Failed"'
+    return due_patients.value
+
+
+@router.post(
+    "/due_patients/sync",
+    status_code=status.HTTP_200_OK,
+    response_model=SyncRunResponse,
+    summary="Sync due patients",
+    description="Pull due patients changed since the last sync into the designated recall group",
+)
+async def sync_due_patients_now(
+    admin_data: dict = Depends(verify_admin),
+    _: None = Depends(reject_when_draining),
+    db: Session = Depends(load),
+):
+    if not settings.DUE_PATIENTS_SYNC_GROUP_ID:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Due patients sync is not configured (DUE_PATIENTS_SYNC_GROUP_ID)",
+        )
+
+    # Only the admin of the practice owning the sync group may run it
+    group = (
+        db.query_eng(RecallGroup)
+        .join(Practice, RecallGroup.practice_id == Practice.id)
+        .filter(
+            RecallGroup.id == settings.DUE_PATIENTS_SYNC_GROUP_ID,
+            Practice.admin_id == admin_data["user_id"],
+        )
+        .first()
+    )
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The sync group does not belong to your practice",
+        )
+
+    run = await sync_due_patients(settings.DUE_PATIENTS_SYNC_GROUP_ID)
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A due patients sync is already running",
+        )
+    return run
 
 
 @router.post(
@@ -48,10 +134,9 @@ async def call_due_patients(
     group_id: str,
     call_context: Optional[str] = None,
     admin_data: dict = Depends(verify_admin),
-    db: Session = Depends(load)
+    db: Session = Depends(load),
+    _: None = Depends(reject_when_draining),
 ):
-    current_datetime = datetime.now()
-    
     # Get the practice for this admin
     practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
     
@@ -73,61 +158,27 @@ async def call_due_patients(
             detail="Recall group not found or you don't have permission to access it"
         )
     
-    # Fetch patients from the database based on the group_id
-    patients = db.query_eng(RecallPatient).filter(
+    if not db.query_eng(RecallPatient.id).filter(
         RecallPatient.recall_group_id == group_id
-    ).all()
-    
-    if not patients:
+    ).first():
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No patients found in group with ID: {group_id}",
         )
-    
-    call_results = []
-    failed_calls = []
-    
-    for patient in patients:
-        customer = Customer(
-            number=patient.number,
-        )
-        try:
-            call = vapi_client.calls.create(
-                assistant_id=settings.ASSISTANT_ID,
-                customer=customer,
-                phone_number_id=settings.PHONE_NUMBER_ID,
-                assistant_overrides={
-                "variable_values": {
-                    "first_name": patient.first_name,
-                    "last_name": patient.last_name,
-                    "dob": patient.dob,
-                    "email": patient.email,
-                    "current_date": current_datetime.strftime("%Y-%m-%d"),
-                    "current_day": current_datetime.strftime("%A"),
-                    "notes": patient.notes,
-                    "call_context": call_context
-                }
-            },
-        )
-            call_results.append({
-                "patient": f"{patient.first_name} {patient.last_name}",
-                "call_id": call.id,
-                "status": call.status,
-                "created_at": call.created_at
-            })
-        except ApiError as e:
-            error_detail = str(e.body) if hasattr(e, "body") else str(e)
-            failed_calls.append({
-                "patient": f"{patient.first_name} {patient.last_name}",
-                "error": error_detail
-            })
-    
+
+    # Recorded so that a shutdown midway through the group can be resumed
+    campaign = create_campaign(db, group_id, call_context)
+    progress = await run_campaign(db, campaign)
+
     return {
-        "success": len(call_results),
-        "failed": len(failed_calls),
-        "calls": call_results,
-        "errors": failed_calls,
-        "group": group.name
+        "success": len(progress.calls),
+        "failed": len(progress.errors),
+        "calls": progress.calls,
+        "errors": progress.errors,
+        "group": group.name,
+        "campaign_id": campaign.id,
+        # The remaining patients are called by another worker
+        "interrupted": progress.interrupted,
     }
 
 
@@ -144,7 +195,7 @@ async def call_patient(patient: Patient):
             number=patient.number,
         )
 
-        call = vapi_client.calls.create(
+        call = get_vapi_client().calls.create(
             assistant_id=settings.ASSISTANT_ID,
             customer=customer,
             phone_number_id=settings.PHONE_NUMBER_ID,
@@ -176,6 +227,85 @@ async def call_patient(patient: Patient):
         )
 
 
+@router.post(
+    "/lookup_caller",
+    status_code=status.HTTP_200_OK,
+    summary="Identify a caller by phone number",
+    description="Tool-call endpoint for the voice assistant that resolves a phone number to recall patients",
+)
+async def lookup_caller(
+    request: Request,
+    _: None = Depends(verify_vapi_secret),
+    db: Session = Depends(load),
+):
+    """
+    Resolves the caller's phone number to recall patients, with their group
+    and practice, while the call is live.
+
+    The number is taken from the tool-call `phone_number` argument, or from
+    the call's customer number if the argument is missing. Only patients of
+    the practice assigned the Vapi phone number the call came in on are
+    returned. Lookups are served from the in-memory caller index and fall
+    back to the database on a miss.
+
+    Raises:
+    - 400 Bad Request: If the request has no tool call, phone number or line
+    - 401 Unauthorized: If the X-Vapi-Secret header is wrong
+    - 403 Forbidden: If the line is not assigned to a practice
+    """
+    try:
+        data = await request.json()
+        message = data["message"]
+        tool_call = message["toolCalls"][0]
+        arguments = tool_call["function"].get("arguments") or {}
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments)
+        call = message.get("call") or {}
+        number = arguments.get("phone_number") or (
+            call.get("customer", {}).get("number")
+        )
+        line = call.get("phoneNumberId") or (message.get("phoneNumber") or {}).get("id")
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Missing required field in request structure: {str(e)}",
+        )
+
+    if not number:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No phone number to look up",
+        )
+
+    if not line:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No Vapi phone number to identify the practice",
+        )
+
+    practice_id = caller_index.practice_for_line(line) or await run_in_threadpool(
+        practice_for_line_in_db, db, line
+    )
+    if practice_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The Vapi phone number is not assigned to a practice",
+        )
+
+    records = caller_index.lookup(number, practice_id)
+    if not records:
+        records = await run_in_threadpool(lookup_in_db, db, number, practice_id)
+
+    return {
+        "results": [
+            {
+                "toolCallId": tool_call.get("id"),
+                "result": json.dumps(caller_lookup_result(records)),
+            }
+        ]
+    }
+
+
 @router.get(
     "/calls",
     status_code=status.HTTP_200_OK,
@@ -184,7 +314,6 @@ async def call_patient(patient: Patient):
 )
 async def get_calls(limit: int = 1):
     try:
-        print(f"[DEBUG] Starting get_calls with limit: {limit}")
         if limit <= 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -195,120 +324,57 @@ async def get_calls(limit: int = 1):
         total_fetched = 0
 
         while total_fetched < limit:
-            print(f"[DEBUG] Fetching batch, total_fetched: {total_fetched}, limit: {limit}")
-            current_batch = vapi_client.calls.list(limit=BATCH_SIZE)
-            print(f"[DEBUG] Received batch with {len(current_batch) if current_batch else 0} calls")
+            current_batch = get_vapi_client().calls.list(limit=BATCH_SIZE)
+            logger.debug(
+                "Fetched batch of %d calls", len(current_batch) if current_batch else 0,
+                extra={"total_fetched": total_fetched, "limit": limit},
+            )
             if not current_batch:
-                print("[DEBUG] Empty batch received, breaking loop")
                 break
 
             for call in current_batch:
                 if total_fetched >= limit:
-                    print("[DEBUG] Reached limit, breaking loop")
                     break
 
                 call_dict = call.model_dump()
-                print(f"[DEBUG] Processing call with ID: {call_dict.get('id')}")
-
                 if call_dict is None:
-                    print("[DEBUG] ERROR: call.model_dump() returned None")
                     raise ValueError("call.model_dump() returned None")
 
-                assistant_overrides = call_dict.get("assistant_overrides", {})
-
-                if assistant_overrides is None:
-                    print("assistant_overrides is None in call_dict")
+                if call_dict.get("assistant_overrides", {}) is None:
+                    logger.debug("Skipping call %s without assistant overrides", call_dict.get("id"))
                     continue
-                    # raise ValueError("assistant_overrides is None in call_dict")
-
-                variable_values = assistant_overrides.get("variable_values", {})
-                minutes = 0
-                costs = call_dict.get("costs")
-                if costs:
-                    for cost in costs:
-                        if cost["type"] == "vapi":
-                            minutes = cost["minutes"]
-                            break
-
-                messages = call_dict.get("messages")
-                arguments = None
-                status = "Incomplete"
-                stereo_recording_url = None
-                if messages:
-                    for message in messages:
-                        if message.get("role") == "tool_calls" and "tool_calls" in message:
-                            for tool_call in message.get("tool_calls", []):
-                                if (
-                                    isinstance(tool_call, dict) 
-                                    and "function" in tool_call
-                                    and "name" in tool_call["function"]
-                                    and tool_call["function"]["name"] == "sendAppointmentEmail"
-                                    and "arguments" in tool_call["function"]
-                                ):
-                                    arguments = json.loads(
-                                        tool_call["function"]["arguments"]
-                                    )
-                        elif (
-                            message.get("type") == "function"
-                            and "function" in message
-                            and "name" in message["function"]
-                            and message["function"]["name"] == "sendAppointmentEmail"
-                            and "arguments" in message["function"]
-                        ):
-                            arguments = json.loads(message["function"]["arguments"])
-
-                        if (
-                            message.get("role") == "tool_call_result"
-                            and message.get("name") == "sendAppointmentEmail"
-                            and "result" in message
-                        ):
-                            status = message["result"]
-
-                if call_dict.get("stereoRecordingUrl"):
-                    stereo_recording_url = call_dict.get("stereoRecordingUrl")
-
-                if variable_values:
-                    call_info = CallHistory(
-                        id=call_dict.get("id"),
-                        first_name=variable_values.get("first_name"),
-                        last_name=variable_values.get("last_name"),
-                        phone=call_dict.get("customer", {}).get("number"),
-                        summary=call_dict.get("summary"),
-                        minutes=minutes,
-                        appointment_date=(
-                            arguments.get("appointment_data", {}).get(
-                                "appointment_date"
-                            )
-                            if arguments
-                            else None
-                        ),
-                        appointment_time=(
-                            arguments.get("appointment_data", {}).get(
-                                "appointment_time"
-                            )
-                            if arguments
-                            else None
-                        ),
-                        call_date=call_dict.get("created_at"),
-                        status=status,
-                        stereo_recording_url=stereo_recording_url,
-                    )
+
+                call_info = call_history(call_dict)
+                if call_info is not None:
                     processed_calls.append(call_info)
                     total_fetched += 1
-                    print(f"[DEBUG] Added call to processed_calls, total_fetched now: {total_fetched}")
                 else:
-                    print(f"[DEBUG] Skipping call {call_dict.get('id')} - no variable_values")
+                    logger.debug("Skipping call %s without variable values", call_dict.get("id"))
                     total_fetched += 1
 
-        print(f"[DEBUG] Returning {len(processed_calls)} processed calls")
-        return processed_calls
+        return models_response(processed_calls, CallHistory)
     except ApiError as e:
-        print(f"[DEBUG] ApiError: {str(e)}")
+        logger.warning("Vapi call list failed: %s", e)
         raise HTTPException(
             status_code=e.status_code or status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail={"message": "Failed to fetch calls", "error": str(e.body)},
         )
 
+@router.get(
+    "/calls/export.csv",
+    status_code=status.HTTP_200_OK,
+    summary="Export call history",
+    description="Download the history of the latest calls from Vapi as CSV, newest first",
+    response_class=CSVResponse,
+    responses={200: {"content": {"text/csv": {}}}},
+)
+async def export_calls(
+    limit: int = Query(1000, ge=1, le=100_000),
+    admin_data: dict = Depends(verify_admin),
+):
+    # Calls are fetched from Vapi a page at a time as the file is written
+    return CSVResponse(call_history_export(limit), "call-history.csv")
+
 @router.get(
     "/calls/{call_id}",
     status_code=status.HTTP_200_OK,
@@ -317,7 +383,7 @@ async def get_calls(limit: int = 1):
 )
 async def get_call(call_id: str):
     try:
-        call = vapi_client.calls.get(id=call_id)
+        call = get_vapi_client().calls.get(id=call_id)
         return call.model_dump()
     except ApiError as e:
         error_detail = str(e.body) if hasattr(e, "body") else str(e)
@@ -344,7 +410,7 @@ async def get_call(call_id: str):
 )
 async def delete_call(call_id: str):
     try:
-        return vapi_client.calls.delete(id=call_id)
+        return get_vapi_client().calls.delete(id=call_id)
     except ApiError as e:
         raise HTTPException(
             status_code=e.status_code or status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -366,7 +432,7 @@ async def demo_call_patient(patient: DemoPatient, request: Request):
             number=patient.number,
         )
 
-        call = vapi_client.calls.create(
+        call = get_vapi_client().calls.create(
             assistant_id=settings.ASSISTANT_ID,
             customer=customer,
             phone_number_id=settings.PHONE_NUMBER_ID,
@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
@@ -8,6 +10,8 @@ from app.models.admin import Admin
 from app.schema.practice import CreatePractice, ShowPractice
 from app.utils.auth import verify_admin, verify_unverified_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/practice", tags=["Practice Management"])
 
 
@@ -34,12 +38,13 @@ async def create_practice(
     - The newly created practice information
 
     Raises:
-    - 409 Conflict: If a practice with the provided email already exists
+    - 409 Conflict: If a practice with the provided email already exists, or
+      the Vapi phone number is assigned to another practice
     - 404 Not Found: If the admin user is not found in the database
     - 500 Internal Server Error: If there's an issue creating the practice
     """
     # Get admin from database using auth service user_id
-    print(user_data)
+    logger.debug("Creating practice", extra={"user_id": user_data.get("user_id")})
 
     # Check if practice with this email already exists
     existing_practice = (
@@ -53,6 +58,16 @@ async def create_practice(
             detail=f"Practice with email '{request.practice_email}' already exists",
         )
 
+    if request.vapi_phone_number_id and (
+        db.query_eng(Practice)
+        .filter(Practice.vapi_phone_number_id == request.vapi_phone_number_id)
+        .first()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The Vapi phone number is assigned to another practice",
+        )
+
     admin = db.query_eng(Admin).filter(Admin.id == user_data["user_id"]).first()
     if not admin:
         raise HTTPException(
@@ -64,6 +79,7 @@ async def create_practice(
         practice_email=request.practice_email,
         practice_phone_number=request.practice_phone_number,
         practice_address=request.practice_address,
+        vapi_phone_number_id=request.vapi_phone_number_id,
         admin_id=admin.id,
     )
 
@@ -1,8 +1,9 @@
-import csv
-import io
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional, Union
 
 from app.engine.load import load
 from app.models import RecallGroup, RecallPatient, Practice
@@ -13,13 +14,35 @@ from app.schema.recall import (
     RecallGroupResponse, 
     RecallPatientResponse,
     RecallGroupWithPatientsResponse,
+    RecallGroupSummaryResponse,
+    RecallGroupStatsResponse,
+    RecallPatientPage,
     CSVPatientImport,
-    BatchPatientCreateResponse
+    BatchPatientCreateResponse,
+    BulkDeletePatients,
+    PatientSearchResult,
+    PatientSearchResponse
 )
 from app.utils.auth import verify_admin
+from app.utils.caller_index import caller_index
+from app.utils.csv_import import parse_patient_csv
+from app.utils.drain import reject_when_draining
+from app.utils.export import CSVResponse, group_export
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.query_stats import query_budget
+from app.utils.responses import object_as_dict, rows_as_dicts
+from app.utils.search import search_patients
 
 router = APIRouter(prefix="/recall", tags=["Recall"])
 
+PATIENT_SORT_COLUMNS = {
+    "created_at": RecallPatient.created_at,
+    "first_name": RecallPatient.first_name,
+    "last_name": RecallPatient.last_name,
+}
+# Columns of a RecallPatientResponse, read as rows rather than ORM objects
+PATIENT_RESPONSE_FIELDS = tuple(RecallPatientResponse.model_fields)
+
 
 @router.post(
     "/groups", 
@@ -63,13 +86,21 @@ async def create_recall_group(
 @router.get(
     "/groups", 
     status_code=status.HTTP_200_OK, 
-    response_model=List[RecallGroupResponse]
+    response_model=List[Union[RecallGroupStatsResponse, RecallGroupResponse]]
 )
+@query_budget(2)
 async def get_recall_groups(
+    include_stats: bool = False,
     admin_data: dict = Depends(verify_admin),
     db: Session = Depends(load)
 ):
-    """Get all recall groups for the admin's practice"""
+    """
+    Get all recall groups for the admin's practice.
+
+    With `include_stats=true` each group also carries its patient count and the
+    last-called/last-updated timestamps, computed in a single aggregate query
+    regardless of the number of groups.
+    """
     # Get the practice for this admin
     practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
     
@@ -79,6 +110,31 @@ async def get_recall_groups(
             detail="Practice not found for this admin"
         )
     
+    if include_stats:
+        rows = db.query_eng(RecallGroup).outerjoin(
+            RecallPatient, RecallPatient.recall_group_id == RecallGroup.id
+        ).add_columns(
+            func.count(RecallPatient.id),
+            func.max(RecallPatient.last_called_at),
+            func.max(RecallPatient.updated_at),
+        ).filter(
+            RecallGroup.practice_id == practice.id
+        ).group_by(RecallGroup.id).all()
+        
+        return [
+            RecallGroupStatsResponse(
+                id=group.id,
+                name=group.name,
+                description=group.description,
+                created_at=group.created_at,
+                practice_id=group.practice_id,
+                patient_count=patient_count,
+                last_called_at=last_called_at,
+                last_updated_at=max(group.updated_at, patients_updated_at or group.updated_at),
+            )
+            for group, patient_count, last_called_at, patients_updated_at in rows
+        ]
+    
     # Get all recall groups for the practice
     groups = db.query_eng(RecallGroup).filter(
         RecallGroup.practice_id == practice.id
@@ -90,14 +146,27 @@ async def get_recall_groups(
 @router.get(
     "/groups/{group_id}", 
     status_code=status.HTTP_200_OK, 
-    response_model=RecallGroupWithPatientsResponse
+    response_model=Union[RecallGroupWithPatientsResponse, RecallGroupSummaryResponse]
 )
+@query_budget(3)
 async def get_recall_group(
     group_id: str,
+    include_patients: bool = True,
+    fast: bool = False,
     admin_data: dict = Depends(verify_admin),
     db: Session = Depends(load)
 ):
-    """Get a specific recall group with its patients"""
+    """
+    Get a specific recall group with its patients.
+
+    With `include_patients=false` only the group metadata and a patient count
+    are returned; use `GET /recall/groups/{group_id}/patients` to page through
+    the patients of large groups.
+
+    With `fast=true` the patients are encoded straight from their rows,
+    skipping ORM loading and response_model validation; the body is the
+    same, and large groups are returned several times faster.
+    """
     # Get the practice for this admin
     practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
     
@@ -119,7 +188,193 @@ async def get_recall_group(
             detail="Recall group not found or you don't have permission to access it"
         )
     
-    return group
+    if not include_patients:
+        patient_count = db.query_eng(func.count(RecallPatient.id)).filter(
+            RecallPatient.recall_group_id == group.id
+        ).scalar()
+        return RecallGroupSummaryResponse(
+            id=group.id,
+            name=group.name,
+            description=group.description,
+            created_at=group.created_at,
+            practice_id=group.practice_id,
+            patient_count=patient_count,
+        )
+
+    if not fast:
+        return group
+
+    patients = db.project(RecallPatient, *PATIENT_RESPONSE_FIELDS).filter(
+        RecallPatient.recall_group_id == group.id
+    ).all()
+    return ORJSONResponse({
+        **object_as_dict(group, RecallGroupResponse),
+        "patients": rows_as_dicts(patients),
+    })
+
+
+@router.get(
+    "/groups/{group_id}/patients",
+    status_code=status.HTTP_200_OK,
+    response_model=RecallPatientPage
+)
+@query_budget(3)
+async def list_group_patients(
+    group_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: Literal["created_at", "first_name", "last_name"] = "created_at",
+    order: Literal["asc", "desc"] = "asc",
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=128),
+    added_after: Optional[datetime.datetime] = None,
+    added_before: Optional[datetime.datetime] = None,
+    has_notes: Optional[bool] = None,
+    admin_data: dict = Depends(verify_admin),
+    db: Session = Depends(load)
+):
+    """
+    List the patients of a recall group one page at a time.
+
+    Pagination is keyset based: pass the `next_cursor` of a page as `cursor` to
+    get the following page, keeping the same sort and filters. Rows are ordered
+    by the sort column with the patient id as a tie-breaker, so pages stay
+    stable while patients are added.
+
+    Parameters:
+    - limit: Maximum number of patients per page
+    - cursor: Cursor returned by the previous page
+    - sort, order: Sort column and direction
+    - name_prefix: Case-insensitive prefix of the first or last name
+    - added_after, added_before: Bounds on the date the patient was added
+    - has_notes: Only patients with (true) or without (false) notes
+
+    Raises:
+    - 400 Bad Request: If the cursor is malformed
+    - 404 Not Found: If the practice or group is not found
+    """
+    # Get the practice for this admin
+    practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
+    
+    if not practice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Practice not found for this admin"
+        )
+    
+    # Get the group for the practice
+    group = db.query_eng(RecallGroup).filter(
+        RecallGroup.id == group_id,
+        RecallGroup.practice_id == practice.id
+    ).first()
+    
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recall group not found or you don't have permission to access it"
+        )
+    
+    sort_column = PATIENT_SORT_COLUMNS[sort]
+    query = db.project(RecallPatient, *PATIENT_RESPONSE_FIELDS).filter(
+        RecallPatient.recall_group_id == group_id
+    )
+    
+    if name_prefix:
+        prefix = name_prefix.lower()
+        query = query.filter(or_(
+            func.lower(RecallPatient.first_name).startswith(prefix, autoescape=True),
+            func.lower(RecallPatient.last_name).startswith(prefix, autoescape=True),
+        ))
+    if added_after:
+        query = query.filter(RecallPatient.created_at >= added_after)
+    if added_before:
+        query = query.filter(RecallPatient.created_at < added_before)
+    if has_notes is True:
+        query = query.filter(RecallPatient.notes.is_not(None), RecallPatient.notes != "")
+    elif has_notes is False:
+        query = query.filter(or_(RecallPatient.notes.is_(None), RecallPatient.notes == ""))
+    
+    position = decode_cursor(cursor)
+    if position:
+        last_value, last_id = position
+        # Name sorts compare with VARCHAR columns: anything but a string
+        # would fail in the database rather than here
+        expected_type = datetime.datetime if sort == "created_at" else str
+        if not isinstance(last_value, expected_type):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Pagination cursor does not match the requested sort"
+            )
+        if order == "asc":
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, RecallPatient.id > last_id),
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column < last_value,
+                and_(sort_column == last_value, RecallPatient.id < last_id),
+            ))
+    
+    if order == "asc":
+        query = query.order_by(sort_column.asc(), RecallPatient.id.asc())
+    else:
+        query = query.order_by(sort_column.desc(), RecallPatient.id.desc())
+    
+    # Fetch one extra row to find out whether there is a next page
+    patients = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(patients) > limit:
+        patients = patients[:limit]
+        last = patients[-1]
+        next_cursor = encode_cursor(getattr(last, sort), last.id)
+    
+    return RecallPatientPage(items=patients, next_cursor=next_cursor, limit=limit)
+
+
+@router.get(
+    "/groups/{group_id}/export.csv",
+    status_code=status.HTTP_200_OK,
+    response_class=CSVResponse,
+    responses={200: {"content": {"text/csv": {}}}}
+)
+@query_budget(2)
+async def export_group_patients(
+    group_id: str,
+    admin_data: dict = Depends(verify_admin),
+    db: Session = Depends(load)
+):
+    """
+    Download the patients of a recall group as CSV, oldest first.
+
+    The file is streamed while the patients are read, so downloads of any
+    size start at once and run in constant memory. Its first columns are
+    those of the CSV import.
+
+    Raises:
+    - 404 Not Found: If the practice or group is not found
+    """
+    # Get the practice for this admin
+    practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
+    
+    if not practice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Practice not found for this admin"
+        )
+    
+    # Get the group for the practice
+    group = db.query_eng(RecallGroup).filter(
+        RecallGroup.id == group_id,
+        RecallGroup.practice_id == practice.id
+    ).first()
+    
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recall group not found or you don't have permission to access it"
+        )
+    
+    return CSVResponse(group_export(group.id), f"recall-group-{group.id}.csv")
 
 
 @router.delete(
@@ -131,7 +386,12 @@ async def delete_recall_group(
     admin_data: dict = Depends(verify_admin),
     db: Session = Depends(load)
 ):
-    """Delete a recall group and all its patients"""
+    """
+    Delete a recall group and all its patients.
+
+    Patients are removed by the database through ON DELETE CASCADE, so this is
+    a single DELETE statement regardless of the size of the group.
+    """
     # Get the practice for this admin
     practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
     
@@ -210,6 +470,8 @@ async def add_patients_to_group(
                 number=patient_data.number,
                 dob=patient_data.dob,
                 notes=patient_data.notes,
+                last_recall_at=patient_data.last_recall_at,
+                recall_interval_days=patient_data.recall_interval_days,
                 recall_group_id=group_id
             )
             
@@ -277,6 +539,8 @@ async def add_single_patient_to_group(
         number=patient.number,
         dob=patient.dob,
         notes=patient.notes,
+        last_recall_at=patient.last_recall_at,
+        recall_interval_days=patient.recall_interval_days,
         recall_group_id=group_id
     )
     
@@ -301,7 +565,8 @@ async def import_patients_from_csv(
     group_id: str,
     request: CSVPatientImport,
     admin_data: dict = Depends(verify_admin),
-    db: Session = Depends(load)
+    db: Session = Depends(load),
+    _: None = Depends(reject_when_draining),
 ):
     """Import multiple patients from a CSV file"""
     # Get the practice for this admin
@@ -325,34 +590,12 @@ async def import_patients_from_csv(
             detail="Recall group not found or you don't have permission to access it"
         )
     
-    # Process CSV data
-    csv_file = io.StringIO(request.file_content)
-    csv_reader = csv.DictReader(csv_file)
-    
-    required_fields = ["first_name", "last_name", "email", "number", "dob"]
     added_patients = 0
-    errors = []
-    
+
     try:
-        for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 to account for header row
-            # Check if all required fields are present
-            missing_fields = [field for field in required_fields if field not in row or not row[field]]
-            if missing_fields:
-                errors.append(f"Row {row_num}: Missing required fields - {', '.join(missing_fields)}")
-                continue
-                
-            # Create the patient
-            new_patient = RecallPatient(
-                first_name=row["first_name"],
-                last_name=row["last_name"],
-                email=row["email"],
-                number=row["number"],
-                dob=row["dob"],
-                notes=row.get("notes"),  # Get notes if available
-                recall_group_id=group_id
-            )
-            
-            db.add(new_patient)
+        patients, errors = parse_patient_csv(request.file_content)
+        for patient in patients:
+            db.add(RecallPatient(**patient, recall_group_id=group_id))
             added_patients += 1
         
         # Commit all changes if no errors occurred
@@ -379,6 +622,69 @@ async def import_patients_from_csv(
         )
 
 
+@router.get(
+    "/patients/search",
+    status_code=status.HTTP_200_OK,
+    response_model=PatientSearchResponse
+)
+async def search_practice_patients(
+    q: str = Query(..., min_length=2, max_length=128),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    admin_data: dict = Depends(verify_admin),
+    db: Session = Depends(load)
+):
+    """
+    Search patients across all recall groups of the admin's practice.
+
+    Matches the patient name, email or phone number and returns results ranked
+    by relevance, best match first.
+
+    Parameters:
+    - q: Search text (name, email or phone number)
+    - limit, offset: Page of results to return
+    """
+    # Get the practice for this admin
+    practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
+    
+    if not practice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Practice not found for this admin"
+        )
+    
+    # Fetch one extra row to find out whether there are more results
+    rows = search_patients(db, practice.id, q, limit + 1, offset)
+    
+    items = [
+        PatientSearchResult(
+            id=patient.id,
+            first_name=patient.first_name,
+            last_name=patient.last_name,
+            email=patient.email,
+            number=patient.number,
+            dob=patient.dob,
+            notes=patient.notes,
+            created_at=patient.created_at,
+            last_called_at=patient.last_called_at,
+            last_recall_at=patient.last_recall_at,
+            recall_interval_days=patient.recall_interval_days,
+            next_due_at=patient.next_due_at,
+            recall_group_id=patient.recall_group_id,
+            recall_group_name=group_name,
+            rank=rank,
+        )
+        for patient, group_name, rank in rows[:limit]
+    ]
+    
+    return PatientSearchResponse(
+        items=items,
+        limit=limit,
+        offset=offset,
+        has_more=len(rows) > limit
+    )
+
+
 @router.delete(
     "/patients/{patient_id}", 
     status_code=status.HTTP_200_OK
@@ -421,4 +727,53 @@ async def delete_patient_from_group(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete patient: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+
+@router.post(
+    "/patients/bulk-delete", 
+    status_code=status.HTTP_200_OK
+)
+async def bulk_delete_patients(
+    request: BulkDeletePatients,
+    admin_data: dict = Depends(verify_admin),
+    db: Session = Depends(load)
+):
+    """
+    Delete several patients from the admin's recall groups in one statement.
+
+    Ids that do not exist or belong to another practice are ignored; the
+    response reports how many patients were actually deleted.
+    """
+    # Get the practice for this admin
+    practice = db.query_eng(Practice).filter(Practice.admin_id == admin_data["user_id"]).first()
+    
+    if not practice:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Practice not found for this admin"
+        )
+    
+    patient_ids = set(request.patient_ids)
+    practice_group_ids = select(RecallGroup.id).where(RecallGroup.practice_id == practice.id)
+    
+    try:
+        deleted_count = db.query_eng(RecallPatient).filter(
+            RecallPatient.id.in_(patient_ids),
+            RecallPatient.recall_group_id.in_(practice_group_ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        # Bulk deletes bypass the ORM events that keep the caller index fresh
+        caller_index.discard(patient_ids)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete patients: {str(e)}"
+        )
+    
+    return {
+        "message": f"Deleted {deleted_count} of {len(patient_ids)} patients",
+        "deleted_count": deleted_count,
+        "requested_count": len(patient_ids)
+    }
@@ -1,3 +1,4 @@
+import datetime
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 
@@ -22,3 +23,19 @@ class AppointmentData(BaseModel):
             }
         }
     }
+
+
+class OutboxEmailStatus(BaseModel):
+    id: str
+    template: str
+    to_email: str
+    status: str
+    attempts: int
+    next_attempt_at: datetime.datetime
+    last_error: Optional[str] = None
+    provider_status: Optional[int] = None
+    sent_at: Optional[datetime.datetime] = None
+    created_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
@@ -57,3 +57,21 @@ class CallHistory(BaseModel):
     stereo_recording_url: Optional[str] = None
     # booking_status: Optional[str] = None
     # summary: Optional[str] = None
+
+
+class SyncRunResponse(BaseModel):
+    id: str
+    source: str
+    status: str
+    started_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+    watermark: Optional[str] = None
+    fetched: int
+    inserted: int
+    updated: int
+    skipped: int
+    duration_ms: int
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr
 
 class CreatePractice(BaseModel):
@@ -5,6 +7,7 @@ class CreatePractice(BaseModel):
     practice_email: EmailStr
     practice_phone_number: str
     practice_address: str
+    vapi_phone_number_id: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -15,6 +18,7 @@ class ShowPractice(BaseModel):
     practice_email: str
     practice_phone_number: str
     practice_address: str
+    vapi_phone_number_id: Optional[str] = None
     admin_id: str
 
     class Config:
@@ -11,6 +11,8 @@ class PatientBase(BaseModel):
     number: str
     dob: str
     notes: Optional[str] = None
+    last_recall_at: Optional[datetime.date] = None
+    recall_interval_days: Optional[int] = Field(None, gt=0)
 
 
 class CreateRecallPatient(PatientBase):
@@ -22,6 +24,8 @@ class RecallPatientResponse(PatientBase):
     """Schema for responding with recall patient data"""
     id: str
     created_at: datetime.datetime
+    last_called_at: Optional[datetime.datetime] = None
+    next_due_at: Optional[datetime.date] = None
     
     class Config:
         from_attributes = True
@@ -61,6 +65,51 @@ class RecallGroupWithPatientsResponse(RecallGroupResponse):
         from_attributes = True
 
 
+class RecallGroupStatsResponse(RecallGroupResponse):
+    """Schema for responding with recall group data and aggregate patient stats"""
+    patient_count: int
+    last_called_at: Optional[datetime.datetime] = None
+    last_updated_at: datetime.datetime
+
+
+class RecallGroupSummaryResponse(RecallGroupResponse):
+    """Schema for responding with recall group metadata and its patient count"""
+    patient_count: int
+
+
+class RecallPatientPage(BaseModel):
+    """Schema for a page of patients from a keyset-paginated listing"""
+    items: List[RecallPatientResponse] = []
+    next_cursor: Optional[str] = None
+    limit: int
+
+
+class PatientSearchResult(RecallPatientResponse):
+    """Schema for a single ranked patient search result"""
+    recall_group_id: str
+    recall_group_name: str
+    rank: float
+
+
+class PatientSearchResponse(BaseModel):
+    """Schema for a page of patient search results"""
+    items: List[PatientSearchResult] = []
+    limit: int
+    offset: int
+    has_more: bool = False
+
+
+class DuePatientResponse(RecallPatientResponse):
+    """Schema for a patient due for recall, computed locally"""
+    recall_group_id: str
+    recall_group_name: str
+
+
+class BulkDeletePatients(BaseModel):
+    """Schema for deleting several recall patients at once"""
+    patient_ids: List[str] = Field(min_length=1, max_length=1000)
+
+
 class CSVPatientImport(BaseModel):
     """Schema for importing patients from CSV file"""
     file_content: str 
\ No newline at end of file
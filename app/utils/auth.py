@@ -1,36 +1,68 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from fastapi import Depends, Header, HTTPException, status
 import httpx
 from typing import Optional
 from app.utils.cookies import OAuth2PasswordBearerWithCookie
 from app.config.config import settings
+from app.utils.metrics import AsyncInstrumentedTransport
+from app.utils.tracing import traced
 
 oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl=f"{settings.AUTH_SERVICE_URL}{settings.AUTH_TOKEN_URL}")
 
+_auth_client: Optional[httpx.AsyncClient] = None
 
+
+def get_auth_client() -> httpx.AsyncClient:
+    """
+    Returns the pooled client used for the auth service, so token checks
+    reuse connections instead of opening one per request.
+    """
+    global _auth_client
+    if _auth_client is None or _auth_client.is_closed:
+        _auth_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0),
+            transport=AsyncInstrumentedTransport(
+                "auth",
+                httpx.AsyncHTTPTransport(
+                    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+                ),
+            ),
+            # The client is shared by every user: never keep their cookies
+            cookies=httpx.Cookies(CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))),
+        )
+    return _auth_client
+
+
+async def close_auth_client():
+    """Closes the pooled client and its connections"""
+    if _auth_client is not None:
+        await _auth_client.aclose()
+
+
+@traced("auth.verify_token")
 async def verify_token(token: str = Depends(oauth2_scheme)):
     """Verify token with auth service"""
     try:
-        async with httpx.AsyncClient() as client:
-            # Send token in the expected format
-            response = await client.post(
-                f"{settings.AUTH_SERVICE_URL}{settings.AUTH_VERIFY_TOKEN_URL}",
-                json={"token": token} 
+        # Send token in the expected format
+        response = await get_auth_client().post(
+            f"{settings.AUTH_SERVICE_URL}{settings.AUTH_VERIFY_TOKEN_URL}",
+            json={"token": token} 
+        )
+
+        if response.json().get("is_verified") == False:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User is not verified"
+            )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token"
             )
 
-            print(response.json())
-            if response.json().get("is_verified") == False:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="User is not verified"
-                )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid or expired token"
-                )
-
-            return response.json() 
+        return response.json() 
 
     except httpx.HTTPError as e:
         raise HTTPException(
@@ -39,6 +71,7 @@ async def verify_token(token: str = Depends(oauth2_scheme)):
         )
     
 
+@traced("auth.verify_unverified_user")
 async def verify_unverified_user(token: str = Depends(oauth2_scheme)):
     """
     Verify tokens from unverified users to grant limited access to specific endpoints.
@@ -64,20 +97,19 @@ async def verify_unverified_user(token: str = Depends(oauth2_scheme)):
     - 401 Unauthorized: If there's a communication error with the auth service
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # Send token in the expected format
-            response = await client.post(
-                f"{settings.AUTH_SERVICE_URL}{settings.AUTH_VERIFY_TOKEN_URL}",
-                json={"token": token} 
+        # Send token in the expected format
+        response = await get_auth_client().post(
+            f"{settings.AUTH_SERVICE_URL}{settings.AUTH_VERIFY_TOKEN_URL}",
+            json={"token": token} 
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid or expired token"
-                )
 
-            return response.json() 
+        return response.json() 
 
     except httpx.HTTPError as e:
         raise HTTPException(
@@ -85,6 +117,7 @@ async def verify_unverified_user(token: str = Depends(oauth2_scheme)):
             detail=f"Failed to verify token: {str(e)}"
         )
 
+@traced("auth.verify_admin")
 async def verify_admin(token: str = Depends(oauth2_scheme)):
     """Verify token and check if user is admin"""
     user_data = await verify_token(token)
@@ -96,3 +129,20 @@ async def verify_admin(token: str = Depends(oauth2_scheme)):
         )
     
     return user_data
+
+
+async def verify_vapi_secret(x_vapi_secret: Optional[str] = Header(None)):
+    """Verify the shared secret Vapi sends with tool calls"""
+    if not settings.VAPI_SERVER_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vapi server secret is not configured"
+        )
+
+    if x_vapi_secret is None or not hmac.compare_digest(
+        x_vapi_secret.encode(), settings.VAPI_SERVER_SECRET.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid Vapi secret"
+        )
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, NamedTuple, Optional, Tuple
+
+
+class CachedValue(NamedTuple):
+    """A value served from a cache and how fresh it is"""
+
+    value: Any
+    status: str  # HIT, MISS or STALE
+    age: float  # seconds since the value was fetched
+    error: Optional[Exception] = None  # set when the refresh failed
+
+
+class StaleWhileRevalidateCache:
+    """
+    Caches the result of an async fetch function.
+
+    - Within `ttl` seconds of a fetch the cached value is served as is.
+    - Up to `max_stale` seconds after that the cached value is still served
+      immediately, while a refresh runs in the background.
+    - Older than that, callers wait for a refresh.
+    - Concurrent callers share a single in-flight fetch.
+    - If a refresh fails and a previous value exists, the previous value is
+      served with the error attached instead of raising.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: float,
+        max_stale: float,
+    ):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value: Any = None
+        self._fetched_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self.last_error: Optional[Exception] = None
+
+    async def get(self) -> CachedValue:
+        """Returns the cached value, fetching or refreshing it as needed"""
+        if self._fetched_at is not None:
+            age = time.monotonic() - self._fetched_at
+            if age < self.ttl:
+                return CachedValue(self._value, "HIT", age)
+            if age < self.ttl + self.max_stale:
+                self._start_refresh()
+                return CachedValue(self._value, "STALE", age, self.last_error)
+
+        try:
+            # Shielded so a caller disconnecting does not cancel the fetch
+            # that other callers are waiting on
+            value = await asyncio.shield(self._start_refresh())
+        except Exception as e:
+            if self._fetched_at is None:
+                raise
+            age = time.monotonic() - self._fetched_at
+            return CachedValue(self._value, "STALE", age, e)
+        return CachedValue(value, "MISS", 0.0)
+
+    def invalidate(self):
+        """Forces the next call to fetch a new value"""
+        self._fetched_at = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._do_refresh())
+            # Background refreshes may fail with nobody awaiting them
+            self._refresh.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+        return self._refresh
+
+    async def _do_refresh(self) -> Any:
+        try:
+            value = await self._fetch()
+        except Exception as e:
+            self.last_error = e
+            raise
+        self._value = value
+        self._fetched_at = time.monotonic()
+        self.last_error = None
+        return value
+
+
+class IdempotencyStore:
+    """
+    Remembers the result of each keyed operation for `ttl` seconds, keeping
+    at most `max_entries` keys (oldest evicted first).
+
+    A repeated key gets the stored result without running the operation
+    again; a repeat that arrives while the first run is still in progress
+    waits for it. Failed runs are forgotten so they can be retried. Results
+    are kept in memory, so deduplication is per worker.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, asyncio.Future]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def run(self, key: str, operation: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Runs `operation` once per key.
+
+        Returns:
+        - (result, replayed) where `replayed` is True if the result was stored
+        """
+        now = time.monotonic()
+        self._evict(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            return await asyncio.shield(entry[1]), True
+
+        future = asyncio.get_running_loop().create_future()
+        # Retrieve failures so they are not reported when nobody is waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._entries[key] = (now + self.ttl, future)
+        try:
+            result = await operation()
+        except BaseException as e:
+            self._entries.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result, False
+
+    def _evict(self, now: float):
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
@@ -0,0 +1,399 @@
+"""
+In-memory index from normalized phone numbers to recall patients, used to
+identify callers during a live Vapi call without a database round trip.
+
+The index is built in full at startup and refreshed periodically. In
+between, committed ORM changes to patients, groups and practices are
+applied incrementally through session events, so writes made by this
+worker are visible immediately. Writes made by other workers, or by bulk
+statements that bypass the ORM, become visible at the next refresh; until
+then a lookup miss falls back to the database.
+
+Lookups are scoped to one practice: the one assigned the Vapi phone number
+the call came in on (Practice.vapi_phone_number_id).
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.engine.db_storage import DBStorage
+from app.models import Practice, RecallGroup, RecallPatient
+from app.utils.phone import normalize_phone, phone_digit_variants
+from app.utils.search import number_digits
+
+logger = logging.getLogger(__name__)
+
+
+class CallerRecord(NamedTuple):
+    """Patient details returned to the voice assistant for a caller"""
+
+    patient_id: str
+    first_name: str
+    last_name: str
+    dob: str
+    email: str
+    notes: Optional[str]
+    recall_group_id: str
+    recall_group_name: str
+    practice_id: str
+    practice_name: str
+
+
+class CallerIndex:
+    """
+    Maps normalized phone numbers to the recall patients registered with them.
+
+    Reads are lock-free: every value is an immutable tuple that writers
+    replace rather than mutate, and a full rebuild swaps in new dicts.
+    Writers serialize on a lock. Writes made while a rebuild reads the
+    database are journaled and replayed onto the rebuilt dicts before they
+    are swapped in, so the rebuild does not undo them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_phone: Dict[str, Tuple[CallerRecord, ...]] = {}
+        self._phone_by_patient: Dict[str, str] = {}
+        self._patients_by_group: Dict[str, Set[str]] = {}
+        self._groups: Dict[str, Tuple[str, str]] = {}
+        self._practices: Dict[str, str] = {}
+        self._practice_by_line: Dict[str, str] = {}
+        self._journal: Optional[List[Tuple[Callable, tuple]]] = None
+        self.loaded_at: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self._phone_by_patient)
+
+    def lookup(self, number: str, practice_id: str) -> Tuple[CallerRecord, ...]:
+        """Returns the patients of a practice registered with a phone number, if any"""
+        return tuple(
+            record
+            for record in self._by_phone.get(normalize_phone(number), ())
+            if record.practice_id == practice_id
+        )
+
+    def practice_for_line(self, phone_number_id: str) -> Optional[str]:
+        """Returns the practice assigned a Vapi phone number, if known"""
+        return self._practice_by_line.get(phone_number_id)
+
+    def load(
+        self,
+        rows: Iterable[tuple],
+        groups: Iterable[tuple] = (),
+        lines: Iterable[tuple] = (),
+    ):
+        """
+        Replaces the whole index.
+
+        Parameters:
+        - rows: (number, CallerRecord) pairs
+        - groups: (group id, group name, practice id, practice name) for every
+          group, so patients added later to empty groups can be indexed
+        - lines: (Vapi phone number id, practice id) for every practice
+          assigned a phone number
+        """
+        by_phone: Dict[str, Tuple[CallerRecord, ...]] = {}
+        phone_by_patient: Dict[str, str] = {}
+        patients_by_group: Dict[str, Set[str]] = {}
+        group_names: Dict[str, Tuple[str, str]] = {}
+        practices: Dict[str, str] = {}
+        practice_by_line = dict(lines)
+
+        for group_id, group_name, practice_id, practice_name in groups:
+            group_names[group_id] = (group_name, practice_id)
+            practices[practice_id] = practice_name
+
+        for number, record in rows:
+            phone = normalize_phone(number)
+            by_phone[phone] = by_phone.get(phone, ()) + (record,)
+            phone_by_patient[record.patient_id] = phone
+            patients_by_group.setdefault(record.recall_group_id, set()).add(
+                record.patient_id
+            )
+            group_names[record.recall_group_id] = (
+                record.recall_group_name,
+                record.practice_id,
+            )
+            practices[record.practice_id] = record.practice_name
+
+        with self._lock:
+            self._by_phone = by_phone
+            self._phone_by_patient = phone_by_patient
+            self._patients_by_group = patients_by_group
+            self._groups = group_names
+            self._practices = practices
+            self._practice_by_line = practice_by_line
+            for apply, args in self._journal or ():
+                apply(*args)
+            self._journal = None
+            self.loaded_at = datetime.now()
+
+    def rebuild(self, db):
+        """Reloads the index from the database"""
+        with self._lock:
+            self._journal = []
+        try:
+            rows = _caller_query(db).yield_per(5000)
+            groups = (
+                db.query_eng(
+                    RecallGroup.id, RecallGroup.name, Practice.id, Practice.practice_name
+                )
+                .join(Practice, RecallGroup.practice_id == Practice.id)
+                .all()
+            )
+            lines = (
+                db.query_eng(Practice.vapi_phone_number_id, Practice.id)
+                .filter(Practice.vapi_phone_number_id.is_not(None))
+                .all()
+            )
+            self.load(((row[0], CallerRecord(*row[1:])) for row in rows), groups, lines)
+        finally:
+            with self._lock:
+                self._journal = None
+
+    def _write_locked(self, apply: Callable, *args):
+        """Applies a write, journaling it if a rebuild is in progress"""
+        apply(*args)
+        if self._journal is not None:
+            self._journal.append((apply, args))
+
+    def upsert(self, number: str, record: CallerRecord):
+        """Adds a patient, or moves it to its current number"""
+        phone = normalize_phone(number)
+        with self._lock:
+            self._write_locked(self._upsert_locked, phone, record)
+
+    def discard(self, patient_ids: Iterable[str]):
+        """Removes patients from the index"""
+        with self._lock:
+            for patient_id in patient_ids:
+                self._write_locked(self._discard_locked, patient_id)
+
+    def discard_group(self, group_id: str):
+        """Removes a recall group and all of its patients from the index"""
+        with self._lock:
+            self._write_locked(self._discard_group_locked, group_id)
+
+    def _upsert_locked(self, phone: str, record: CallerRecord):
+        self._discard_locked(record.patient_id)
+        self._by_phone[phone] = self._by_phone.get(phone, ()) + (record,)
+        self._phone_by_patient[record.patient_id] = phone
+        self._patients_by_group.setdefault(record.recall_group_id, set()).add(
+            record.patient_id
+        )
+
+    def _discard_group_locked(self, group_id: str):
+        for patient_id in list(self._patients_by_group.get(group_id, ())):
+            self._discard_locked(patient_id)
+        self._patients_by_group.pop(group_id, None)
+        self._groups.pop(group_id, None)
+
+    def _set_group_locked(self, group_id: str, name: str, practice_id: str):
+        self._groups[group_id] = (name, practice_id)
+
+    def _set_practice_locked(self, practice_id: str, name: str, line: Optional[str]):
+        self._practices[practice_id] = name
+        for assigned_line, assigned_practice in list(self._practice_by_line.items()):
+            if assigned_practice == practice_id:
+                del self._practice_by_line[assigned_line]
+        if line:
+            self._practice_by_line[line] = practice_id
+
+    def _discard_locked(self, patient_id: str):
+        phone = self._phone_by_patient.pop(patient_id, None)
+        if phone is None:
+            return
+        remaining = []
+        for record in self._by_phone.get(phone, ()):
+            if record.patient_id == patient_id:
+                self._patients_by_group.get(record.recall_group_id, set()).discard(
+                    patient_id
+                )
+            else:
+                remaining.append(record)
+        if remaining:
+            self._by_phone[phone] = tuple(remaining)
+        else:
+            self._by_phone.pop(phone, None)
+
+    def record_for(self, patient: RecallPatient) -> Optional[CallerRecord]:
+        """Builds the index record for a patient whose group is known"""
+        group = self._groups.get(patient.recall_group_id)
+        if group is None:
+            return None
+        group_name, practice_id = group
+        return CallerRecord(
+            patient_id=patient.id,
+            first_name=patient.first_name,
+            last_name=patient.last_name,
+            dob=patient.dob,
+            email=patient.email,
+            notes=patient.notes,
+            recall_group_id=patient.recall_group_id,
+            recall_group_name=group_name,
+            practice_id=practice_id,
+            practice_name=self._practices.get(practice_id, ""),
+        )
+
+    def apply_changes(self, changed: list, deleted: list):
+        """Applies committed ORM changes collected by the session events"""
+        with self._lock:
+            for obj in changed:
+                if isinstance(obj, Practice):
+                    self._write_locked(
+                        self._set_practice_locked,
+                        obj.id, obj.practice_name, obj.vapi_phone_number_id,
+                    )
+                elif isinstance(obj, RecallGroup):
+                    self._write_locked(
+                        self._set_group_locked, obj.id, obj.name, obj.practice_id
+                    )
+
+        for obj in changed:
+            if isinstance(obj, RecallPatient):
+                record = self.record_for(obj)
+                if record is None:
+                    # Unknown group: let lookups fall back to the database
+                    self.discard([obj.id])
+                else:
+                    self.upsert(obj.number, record)
+
+        for obj in deleted:
+            if isinstance(obj, RecallPatient):
+                self.discard([obj.id])
+            elif isinstance(obj, RecallGroup):
+                self.discard_group(obj.id)
+
+
+def _caller_query(db):
+    """Selects (number, *CallerRecord fields) for every recall patient"""
+    return (
+        db.query_eng(
+            RecallPatient.number,
+            RecallPatient.id,
+            RecallPatient.first_name,
+            RecallPatient.last_name,
+            RecallPatient.dob,
+            RecallPatient.email,
+            RecallPatient.notes,
+            RecallGroup.id,
+            RecallGroup.name,
+            Practice.id,
+            Practice.practice_name,
+        )
+        .join(RecallGroup, RecallPatient.recall_group_id == RecallGroup.id)
+        .join(Practice, RecallGroup.practice_id == Practice.id)
+    )
+
+
+def practice_for_line_in_db(db, phone_number_id: str) -> Optional[str]:
+    """Looks up the practice assigned a Vapi phone number missing from the index"""
+    return (
+        db.query_eng(Practice.id)
+        .filter(Practice.vapi_phone_number_id == phone_number_id)
+        .scalar()
+    )
+
+
+def lookup_in_db(db, number: str, practice_id: str) -> Tuple[CallerRecord, ...]:
+    """
+    Looks a caller up in the database, for numbers missing from the index.
+    Matches are added to the index so the next lookup is served from memory.
+
+    Phone numbers are stored as entered, so the digits of the stored number
+    (ix_recall_patients_number_digits on Postgres) are matched against the
+    digits of the common formats of the number, and the candidates are
+    normalized as the index does, so both give the same answer.
+    """
+    phone = normalize_phone(number)
+    rows = [
+        row
+        for row in (
+            _caller_query(db)
+            .filter(
+                number_digits(db).in_(phone_digit_variants(number)),
+                Practice.id == practice_id,
+            )
+            .all()
+        )
+        if normalize_phone(row[0]) == phone
+    ]
+
+    records = tuple(CallerRecord(*row[1:]) for row in rows)
+    for row, record in zip(rows, records):
+        caller_index.upsert(row[0], record)
+    return records
+
+
+def caller_lookup_result(records: Tuple[CallerRecord, ...]) -> dict:
+    """Formats lookup results for the voice assistant"""
+    return {
+        "found": bool(records),
+        "patients": [
+            {
+                "first_name": record.first_name,
+                "last_name": record.last_name,
+                "dob": record.dob,
+                "email": record.email,
+                "notes": record.notes,
+                "recall_group": record.recall_group_name,
+                "practice": record.practice_name,
+            }
+            for record in records
+        ],
+    }
+
+
+def rebuild_caller_index():
+    """Rebuilds the shared index with a dedicated database session"""
+    db = DBStorage()
+    db.setup_db()
+    try:
+        caller_index.rebuild(db)
+    finally:
+        db.close()
+
+
+async def keep_caller_index_fresh(interval: int):
+    """Builds the index, then rebuilds it every `interval` seconds"""
+    while True:
+        try:
+            await run_in_threadpool(rebuild_caller_index)
+            logger.info("Caller index loaded with %d patients", len(caller_index))
+        except Exception:
+            logger.exception("Failed to rebuild caller index")
+        await asyncio.sleep(interval)
+
+
+caller_index = CallerIndex()
+_PENDING_KEY = "caller_index_pending"
+_TRACKED_TYPES = (RecallPatient, RecallGroup, Practice)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    """Remembers flushed changes until the transaction commits"""
+    changed, deleted = session.info.setdefault(_PENDING_KEY, ([], []))
+    changed.extend(
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, _TRACKED_TYPES)
+    )
+    deleted.extend(obj for obj in session.deleted if isinstance(obj, _TRACKED_TYPES))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        caller_index.apply_changes(*pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
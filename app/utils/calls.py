@@ -0,0 +1,82 @@
+"""Extraction of call history from Vapi call records"""
+import json
+from typing import Optional, Tuple
+
+from app.schema.patient import CallHistory
+
+EMAIL_TOOL = "sendAppointmentEmail"
+
+
+def minutes_used(costs) -> float:
+    """Billed Vapi minutes of a call"""
+    if costs:
+        for cost in costs:
+            if cost["type"] == "vapi":
+                return cost["minutes"]
+    return 0
+
+
+def appointment_outcome(messages) -> Tuple[Optional[dict], str]:
+    """
+    Scans a call transcript for the confirmation email tool call.
+
+    Returns:
+    - (arguments of the last tool call or None, result of the tool call or
+      "Incomplete")
+    """
+    arguments = None
+    status = "Incomplete"
+    for message in messages or ():
+        if message.get("role") == "tool_calls" and "tool_calls" in message:
+            for tool_call in message.get("tool_calls", []):
+                if (
+                    isinstance(tool_call, dict)
+                    and "function" in tool_call
+                    and "name" in tool_call["function"]
+                    and tool_call["function"]["name"] == EMAIL_TOOL
+                    and "arguments" in tool_call["function"]
+                ):
+                    arguments = json.loads(tool_call["function"]["arguments"])
+        elif (
+            message.get("type") == "function"
+            and "function" in message
+            and "name" in message["function"]
+            and message["function"]["name"] == EMAIL_TOOL
+            and "arguments" in message["function"]
+        ):
+            arguments = json.loads(message["function"]["arguments"])
+
+        if (
+            message.get("role") == "tool_call_result"
+            and message.get("name") == EMAIL_TOOL
+            and "result" in message
+        ):
+            status = message["result"]
+    return arguments, status
+
+
+def call_history(call_dict: dict) -> Optional[CallHistory]:
+    """
+    Builds the call history entry of a dumped Vapi call, or None for calls
+    placed without patient variables.
+    """
+    assistant_overrides = call_dict.get("assistant_overrides") or {}
+    variable_values = assistant_overrides.get("variable_values", {})
+    if not variable_values:
+        return None
+
+    arguments, status = appointment_outcome(call_dict.get("messages"))
+    appointment = arguments.get("appointment_data", {}) if arguments else {}
+    return CallHistory(
+        id=call_dict.get("id"),
+        first_name=variable_values.get("first_name"),
+        last_name=variable_values.get("last_name"),
+        phone=call_dict.get("customer", {}).get("number"),
+        summary=call_dict.get("summary"),
+        minutes=minutes_used(call_dict.get("costs")),
+        appointment_date=appointment.get("appointment_date"),
+        appointment_time=appointment.get("appointment_time"),
+        call_date=call_dict.get("created_at"),
+        status=status,
+        stereo_recording_url=call_dict.get("stereoRecordingUrl") or None,
+    )
@@ -0,0 +1,221 @@
+"""
+Resumable dialing of recall groups.
+
+Dialing a group is recorded as a CallCampaign. Each patient's call is
+checkpointed before the next one starts (the patient's last_called_at and
+the campaign counters are committed), so the patients still to call are
+always those in the group not called since the campaign started.
+
+The worker dialing a campaign holds a lease on it, renewed with every
+checkpoint. A drain stops the campaign after the call in progress and
+releases the lease; a killed worker's lease expires. Either way another
+worker resumes the campaign from its checkpoint.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import or_
+from starlette.concurrency import run_in_threadpool
+from vapi.core.api_error import ApiError
+
+from app.config.config import settings
+from app.engine.db_storage import DBStorage
+from app.models import CallCampaign, RecallPatient
+from app.schema.patient import Customer
+from app.utils.drain import is_draining
+from app.utils.vapi_client import get_vapi_client
+
+logger = logging.getLogger(__name__)
+
+# Patient columns a call needs
+DIAL_FIELDS = ("id", "first_name", "last_name", "dob", "email", "number", "notes")
+
+# Campaigns being dialed by this worker; set when there are none
+_active = 0
+_idle = asyncio.Event()
+_idle.set()
+
+
+class CampaignProgress(NamedTuple):
+    calls: List[dict]
+    errors: List[dict]
+    interrupted: bool
+
+
+def _lease_expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=settings.CAMPAIGN_LEASE_SECONDS)
+
+
+def create_campaign(db, group_id: str, call_context: Optional[str]) -> CallCampaign:
+    """Records a new campaign, leased to the calling worker"""
+    now = datetime.now()
+    campaign = CallCampaign(
+        recall_group_id=group_id,
+        call_context=call_context,
+        status="running",
+        started_at=now,
+        lease_expires_at=_lease_expiry(now),
+    )
+    db.add(campaign)
+    return campaign
+
+
+def remaining_patients(db, campaign: CallCampaign) -> list:
+    """Rows of the patients of the campaign's group not called since it started"""
+    return (
+        db.project(RecallPatient, *DIAL_FIELDS)
+        .filter(
+            RecallPatient.recall_group_id == campaign.recall_group_id,
+            or_(
+                RecallPatient.last_called_at.is_(None),
+                RecallPatient.last_called_at < campaign.started_at,
+            ),
+        )
+        .order_by(RecallPatient.id)
+        .all()
+    )
+
+
+def _dial(db, campaign: CallCampaign, patient, progress: CampaignProgress):
+    """Calls one patient and checkpoints the outcome"""
+    now = datetime.now()
+    try:
+        call = get_vapi_client().calls.create(
+            assistant_id=settings.ASSISTANT_ID,
+            customer=Customer(number=patient.number),
+            phone_number_id=settings.PHONE_NUMBER_ID,
+            assistant_overrides={
+                "variable_values": {
+                    "first_name": patient.first_name,
+                    "last_name": patient.last_name,
+                    "dob": patient.dob,
+                    "email": patient.email,
+                    "current_date": now.strftime("%Y-%m-%d"),
+                    "current_day": now.strftime("%A"),
+                    "notes": patient.notes,
+                    "call_context": campaign.call_context,
+                }
+            },
+        )
+    except ApiError as e:
+        error_detail = str(e.body) if hasattr(e, "body") else str(e)
+        campaign.failed += 1
+        campaign.last_error = error_detail[:512]
+        progress.errors.append({
+            "patient": f"{patient.first_name} {patient.last_name}",
+            "error": error_detail,
+        })
+    else:
+        db.query_eng(RecallPatient).filter(RecallPatient.id == patient.id).update(
+            {RecallPatient.last_called_at: now}, synchronize_session=False
+        )
+        campaign.dialed += 1
+        progress.calls.append({
+            "patient": f"{patient.first_name} {patient.last_name}",
+            "call_id": call.id,
+            "status": call.status,
+            "created_at": call.created_at,
+        })
+    campaign.lease_expires_at = _lease_expiry(datetime.now())
+    db.commit()
+
+
+def _finish(db, campaign: CallCampaign, interrupted: bool):
+    now = datetime.now()
+    if interrupted:
+        # Release the lease so another worker resumes at once
+        campaign.lease_expires_at = now
+    else:
+        campaign.status = "completed"
+        campaign.finished_at = now
+    db.commit()
+
+
+async def run_campaign(db, campaign: CallCampaign) -> CampaignProgress:
+    """
+    Dials the campaign's remaining patients, stopping early if the worker
+    starts draining. Patients whose call failed are not retried by this run,
+    but are by a resumed one.
+    """
+    global _active
+    _active += 1
+    _idle.clear()
+    progress = CampaignProgress([], [], interrupted=False)
+    try:
+        patients = await run_in_threadpool(remaining_patients, db, campaign)
+        for patient in patients:
+            if is_draining():
+                progress = progress._replace(interrupted=True)
+                break
+            await run_in_threadpool(_dial, db, campaign, patient, progress)
+        await run_in_threadpool(_finish, db, campaign, progress.interrupted)
+        if progress.interrupted:
+            logger.info(
+                "Campaign %s interrupted by shutdown after %d calls",
+                campaign.id, campaign.dialed + campaign.failed,
+            )
+        return progress
+    finally:
+        _active -= 1
+        if _active == 0:
+            _idle.set()
+
+
+def claim_campaign(db) -> Optional[CallCampaign]:
+    """Leases the oldest unfinished campaign whose lease has expired"""
+    now = datetime.now()
+    campaign = (
+        db.query_eng(CallCampaign)
+        .filter(CallCampaign.status == "running", CallCampaign.lease_expires_at <= now)
+        .order_by(CallCampaign.lease_expires_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if campaign is not None:
+        campaign.lease_expires_at = _lease_expiry(now)
+        campaign.resumed += 1
+        db.commit()
+    return campaign
+
+
+async def resume_campaigns() -> int:
+    """Resumes interrupted campaigns until none are left; returns the number resumed"""
+    db = DBStorage()
+    db.setup_db()
+    resumed = 0
+    try:
+        while not is_draining():
+            campaign = await run_in_threadpool(claim_campaign, db)
+            if campaign is None:
+                return resumed
+            logger.info(
+                "Resuming campaign %s", campaign.id,
+                extra={"group_id": campaign.recall_group_id, "dialed": campaign.dialed},
+            )
+            await run_campaign(db, campaign)
+            resumed += 1
+        return resumed
+    finally:
+        db.close()
+
+
+async def resume_campaigns_periodically(interval: int):
+    """Picks up interrupted campaigns at startup, then every `interval` seconds"""
+    while not is_draining():
+        try:
+            await resume_campaigns()
+        except Exception:
+            logger.exception("Failed to resume campaigns")
+        await asyncio.sleep(interval)
+
+
+async def wait_for_campaigns(timeout: float) -> bool:
+    """Waits for this worker's campaigns to stop; False if they did not in time"""
+    try:
+        await asyncio.wait_for(_idle.wait(), timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
@@ -0,0 +1,51 @@
+"""Parsing and validation of recall patient CSV imports"""
+import csv
+import io
+from typing import List, Tuple
+
+from app.utils.recall_due import parse_date
+
+REQUIRED_FIELDS = ("first_name", "last_name", "email", "number", "dob")
+
+
+def parse_patient_csv(file_content: str) -> Tuple[List[dict], List[str]]:
+    """
+    Validates the rows of a patient CSV file.
+
+    Returns:
+    - (RecallPatient column values of every valid row, an error message for
+      every invalid row)
+    """
+    patients = []
+    errors = []
+    reader = csv.DictReader(io.StringIO(file_content))
+    for row_num, row in enumerate(reader, start=2):  # Start at 2 to account for header row
+        # Check if all required fields are present
+        missing_fields = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing_fields:
+            errors.append(f"Row {row_num}: Missing required fields - {', '.join(missing_fields)}")
+            continue
+
+        # Optional recall schedule columns
+        last_recall_at = parse_date(row.get("last_recall_at"))
+        if row.get("last_recall_at") and last_recall_at is None:
+            errors.append(f"Row {row_num}: Invalid last_recall_at - {row['last_recall_at']}")
+            continue
+        recall_interval_days = row.get("recall_interval_days") or None
+        if recall_interval_days is not None:
+            if not recall_interval_days.isdigit() or int(recall_interval_days) == 0:
+                errors.append(f"Row {row_num}: Invalid recall_interval_days - {recall_interval_days}")
+                continue
+            recall_interval_days = int(recall_interval_days)
+
+        patients.append({
+            "first_name": row["first_name"],
+            "last_name": row["last_name"],
+            "email": row["email"],
+            "number": row["number"],
+            "dob": row["dob"],
+            "notes": row.get("notes"),  # Get notes if available
+            "last_recall_at": last_recall_at,
+            "recall_interval_days": recall_interval_days,
+        })
+    return patients, errors
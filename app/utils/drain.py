@@ -0,0 +1,75 @@
+"""
+Graceful shutdown.
+
+When the worker is told to stop (SIGTERM or SIGINT), it starts draining
+before the server stops accepting connections:
+- readiness turns unhealthy, so the load balancer stops routing requests
+- endpoints that start long running work (dialing campaigns, CSV imports,
+  syncs) answer 503 with Retry-After
+- running campaigns stop after the call in progress and checkpoint the
+  rest, which the next worker resumes (see app.utils.campaigns)
+
+On SIGTERM, the server's own signal handler runs after
+SHUTDOWN_READINESS_DELAY_SECONDS, giving the load balancer time to notice
+that readiness failed. The server then waits for in-flight requests, and
+the app lifespan waits up to SHUTDOWN_DRAIN_TIMEOUT_SECONDS for running
+campaigns before cancelling background work.
+"""
+import asyncio
+import logging
+import signal
+import threading
+
+from fastapi import HTTPException, status
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+_draining = threading.Event()
+
+
+def is_draining() -> bool:
+    return _draining.is_set()
+
+
+def begin_drain():
+    if not _draining.is_set():
+        logger.info("Draining: no new work is accepted")
+        _draining.set()
+
+
+def reject_when_draining():
+    """Dependency for endpoints that start work a shutdown would interrupt"""
+    if _draining.is_set():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is shutting down, retry shortly",
+            headers={"Retry-After": "5"},
+        )
+
+
+def install_signal_handlers(loop: asyncio.AbstractEventLoop):
+    """
+    Starts draining on SIGTERM and SIGINT, then hands the signal on to the
+    handler the server installed. Does nothing outside the main thread,
+    e.g. under a test client.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            if _draining.is_set():
+                # A second signal skips the readiness delay
+                previous(signum, frame)
+                return
+            begin_drain()
+            # Ctrl-C in development stops at once
+            delay = settings.SHUTDOWN_READINESS_DELAY_SECONDS if signum == signal.SIGTERM else 0
+            loop.call_soon_threadsafe(loop.call_later, delay, previous, signum, frame)
+
+        signal.signal(sig, handler)
@@ -0,0 +1,185 @@
+"""
+Streaming CSV exports.
+
+An export is written out while it is read: recall patients come from a
+server-side cursor EXPORT_CHUNK_ROWS rows at a time, and call history from
+Vapi one page at a time, and each chunk is encoded and sent before the next
+is fetched. However large the export, a worker holds one chunk in memory, and
+the download starts as soon as the first chunk is read.
+
+The generators are synchronous; CSVResponse iterates them in the
+threadpool. They open their own database session, since the request's
+session is closed once the endpoint returns, and CSVResponse closes them
+when the response ends, so a client that disconnects mid-download does not
+leave the session and its cursor open.
+"""
+import csv
+import io
+import logging
+import re
+from contextlib import closing
+from datetime import date, datetime
+from typing import Generator, Iterable, Iterator, Optional, Sequence, Set
+
+import anyio
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from vapi.core.api_error import ApiError
+
+from app.config.config import settings
+from app.engine.db_storage import DBStorage
+from app.models import RecallPatient
+from app.schema.patient import CallHistory
+from app.utils.calls import call_history
+from app.utils.csv_import import REQUIRED_FIELDS
+from app.utils.vapi_client import get_vapi_client
+
+logger = logging.getLogger(__name__)
+
+# The import columns first, so an export can be imported into another group
+PATIENT_EXPORT_FIELDS = REQUIRED_FIELDS + (
+    "notes",
+    "last_recall_at",
+    "recall_interval_days",
+    "next_due_at",
+    "last_called_at",
+    "created_at",
+)
+CALL_EXPORT_FIELDS = tuple(CallHistory.model_fields)
+
+# Values a spreadsheet would evaluate as a formula. A leading + or - is
+# allowed when the rest looks like a phone number or a number.
+_FORMULA = re.compile(r"[=@\t\r]|[+-](?![\d\s().]*$)")
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str) and _FORMULA.match(value):
+        return "'" + value
+    return value
+
+
+def csv_chunks(header: Sequence[str], chunks: Iterable[Iterable[Sequence]]) -> Iterator[str]:
+    """Encodes each chunk of rows as CSV text, the header with the first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for rows in chunks:
+        writer.writerows([_cell(value) for value in row] for row in rows)
+        if buffer.tell():
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    # The header alone, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def group_patient_chunks(group_id: str, chunk_rows: int) -> Iterator[list]:
+    """
+    The patients of a group, oldest first, as lists of `chunk_rows` rows.
+    Rows are fetched from a server-side cursor as the chunks are consumed.
+    """
+    db = DBStorage()
+    db.setup_db()
+    try:
+        rows = (
+            db.project(RecallPatient, *PATIENT_EXPORT_FIELDS)
+            .filter(RecallPatient.recall_group_id == group_id)
+            .order_by(RecallPatient.created_at, RecallPatient.id)
+            .yield_per(chunk_rows)
+        )
+        yield from batched(rows, chunk_rows)
+    finally:
+        db.close()
+
+
+def call_history_chunks(limit: int, page_size: int = 100) -> Iterator[list]:
+    """
+    The call history of up to `limit` calls, newest first, one Vapi page at a
+    time.
+
+    Each page is requested up to and including the creation time of the
+    last call of the previous page, since other calls may share it; the
+    calls already exported at that time are requested again and dropped.
+    """
+    remaining = limit
+    boundary: Optional[datetime] = None
+    # Ids of the calls exported so far that were created at `boundary`
+    boundary_ids: Set[str] = set()
+    while remaining > 0:
+        requested = min(page_size, remaining) + len(boundary_ids)
+        try:
+            page = get_vapi_client().calls.list(limit=requested, created_at_le=boundary)
+        except ApiError as e:
+            # The response has started; all that is left is to end it early
+            logger.warning("Call history export stopped: %s", e)
+            return
+        calls = [call for call in page if call.id not in boundary_ids][:remaining]
+        if not calls:
+            return
+        remaining -= len(calls)
+        last_created_at = calls[-1].created_at
+        if last_created_at != boundary:
+            boundary, boundary_ids = last_created_at, set()
+        boundary_ids.update(call.id for call in calls if call.created_at == boundary)
+        entries = (call_history(call.model_dump()) for call in calls)
+        yield [
+            [getattr(entry, name) for name in CALL_EXPORT_FIELDS]
+            for entry in entries
+            if entry is not None
+        ]
+        if len(page) < requested:
+            return
+
+
+def group_export(group_id: str) -> Generator[str, None, None]:
+    chunks = group_patient_chunks(group_id, settings.EXPORT_CHUNK_ROWS)
+    # Closing the export closes the cursor and session
+    with closing(chunks):
+        yield from csv_chunks(PATIENT_EXPORT_FIELDS, chunks)
+
+
+def call_history_export(limit: int) -> Generator[str, None, None]:
+    chunks = call_history_chunks(limit)
+    with closing(chunks):
+        yield from csv_chunks(CALL_EXPORT_FIELDS, chunks)
+
+
+class CSVResponse(StreamingResponse):
+    """
+    Streams an export as a CSV download, and closes the export when the
+    response ends: once it is sent, or when the client disconnects.
+    """
+
+    media_type = "text/csv"
+
+    def __init__(self, export: Generator[str, None, None], filename: str):
+        super().__init__(
+            export, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+        self.export = export
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Shielded, since a disconnect ends the response by cancelling it.
+            # The export is not running here: threadpool calls are waited for
+            # even when cancelled.
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(self.export.close)
@@ -0,0 +1,169 @@
+"""
+Liveness and readiness.
+
+Dependency probes (database pool, auth service, Vapi) run in the background
+every HEALTH_PROBE_INTERVAL_SECONDS, and `/readyz` only reads their latest
+results, so however often the load balancer checks, the database and the
+upstreams see one probe per interval per worker.
+
+Readiness fails while the worker drains, before the first probes finish,
+when the probe results are stale (the refresher stopped), and when a probe
+in HEALTH_CRITICAL_PROBES fails. The other probes are reported without
+failing readiness: an upstream outage affects every worker alike, and
+taking them all out of rotation would turn it into a full outage.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional
+
+import httpx
+from sqlalchemy import text
+
+from app.config.config import settings
+from app.engine.db_storage import get_engine
+from app.utils.drain import is_draining
+from app.utils.query_stats import untracked_queries
+
+logger = logging.getLogger(__name__)
+
+
+class ProbeResult(NamedTuple):
+    ok: bool
+    latency_ms: float
+    checked_at: float
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        result = {"ok": self.ok, "latency_ms": round(self.latency_ms, 1)}
+        if self.error:
+            result["error"] = self.error
+        return result
+
+
+# Set while a database check runs, including one whose probe timed out
+_database_check_running = threading.Event()
+
+
+def _check_database():
+    try:
+        engine = get_engine()
+        with untracked_queries(), engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    finally:
+        _database_check_running.clear()
+
+
+async def probe_database():
+    # A hung check keeps its thread until the connect or pool checkout times
+    # out; report it instead of piling up more checks behind it
+    if _database_check_running.is_set():
+        raise RuntimeError("previous check still running")
+    _database_check_running.set()
+    # Unlike the anyio threadpool, which shields threads from cancellation,
+    # the executor future lets the probe timeout return at once
+    await asyncio.get_running_loop().run_in_executor(None, _check_database)
+
+
+async def _probe_url(url: str):
+    # Any response means the service is reachable; only 5xx counts as down
+    response = await _get_probe_client().get(url)
+    if response.status_code >= 500:
+        raise RuntimeError(f"status {response.status_code}")
+
+
+async def probe_auth():
+    await _probe_url(settings.AUTH_SERVICE_URL)
+
+
+async def probe_vapi():
+    await _probe_url(settings.VAPI_BASE_URL)
+
+
+PROBES: Dict[str, Callable[[], Awaitable[None]]] = {
+    "db": probe_database,
+    "auth": probe_auth,
+    "vapi": probe_vapi,
+}
+
+_probe_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_probe_client() -> httpx.AsyncClient:
+    """Client for probes, kept out of the upstream metrics and traces"""
+    global _probe_client
+    if _probe_client is None or _probe_client.is_closed:
+        _probe_client = httpx.AsyncClient(timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS)
+    return _probe_client
+
+
+async def close_probe_client():
+    if _probe_client is not None:
+        await _probe_client.aclose()
+
+
+class HealthChecker:
+    """Runs the probes and keeps their latest results"""
+
+    def __init__(self, probes: Dict[str, Callable[[], Awaitable[None]]]):
+        self.probes = probes
+        self.results: Dict[str, ProbeResult] = {}
+        self.refreshed_at: Optional[float] = None
+
+    async def _run_probe(self, name: str) -> ProbeResult:
+        start = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(
+                self.probes[name](), timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            error = "timed out"
+        except Exception as e:
+            error = str(e)[:256] or type(e).__name__
+        return ProbeResult(
+            error is None, (time.perf_counter() - start) * 1000, time.time(), error
+        )
+
+    async def refresh(self):
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._run_probe(name) for name in names))
+        for name, result in zip(names, results):
+            previous = self.results.get(name)
+            if previous is not None and previous.ok != result.ok:
+                logger.warning(
+                    "Health probe %s is %s", name, "up" if result.ok else "down",
+                    extra={"error": result.error},
+                )
+        self.results = dict(zip(names, results))
+        self.refreshed_at = time.time()
+
+    async def run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh health probes")
+
+    def readiness(self) -> dict:
+        """The cached readiness report; `ready` decides the status code"""
+        if is_draining():
+            return {"ready": False, "status": "draining", "probes": {}}
+        if self.refreshed_at is None:
+            return {"ready": False, "status": "starting", "probes": {}}
+        probes = {name: result.to_dict() for name, result in self.results.items()}
+        if time.time() - self.refreshed_at > 3 * settings.HEALTH_PROBE_INTERVAL_SECONDS:
+            return {"ready": False, "status": "stale", "probes": probes}
+        failing = [name for name, result in self.results.items() if not result.ok]
+        if any(name in settings.HEALTH_CRITICAL_PROBES for name in failing):
+            status = "unavailable"
+        elif failing:
+            status = "degraded"
+        else:
+            status = "ok"
+        return {"ready": status != "unavailable", "status": status, "probes": probes}
+
+
+health = HealthChecker(PROBES)
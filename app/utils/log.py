@@ -0,0 +1,201 @@
+"""
+Structured logging.
+
+Records are handed to a bounded queue and written to stdout by a listener
+thread, so logging never blocks a request on I/O; if the queue is full,
+records are dropped and counted. Every record carries the id of the request
+it was logged in (from the X-Request-ID header, or generated) and the trace
+id when the request is traced. Patient and credential fields passed in
+`extra` are redacted before the record leaves the calling thread.
+
+Use a module logger with %-style arguments, so disabled levels cost one
+level check and no formatting:
+
+    logger = logging.getLogger(__name__)
+    logger.debug("Fetched %d calls", len(calls), extra={"limit": limit})
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.config.config import settings
+from app.utils.tracing import current_span
+
+# Field names whose values are never logged
+REDACTED_FIELDS = frozenset({
+    "first_name", "last_name", "patient_name", "email", "patient_email",
+    "to_email", "number", "phone", "dob", "notes", "address", "practice_address",
+    "token", "access_token", "password", "password1", "password2", "authorization",
+})
+REDACTED = "[redacted]"
+
+# Attributes every LogRecord has; everything else came from `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id", "trace_id"}
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def redact(value: Any) -> Any:
+    """Replaces the values of REDACTED_FIELDS in nested dicts and lists"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in REDACTED_FIELDS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+class ContextFilter(logging.Filter):
+    """Adds the request and trace ids, and redacts `extra` fields"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        span = current_span()
+        record.trace_id = span.trace_id if span is not None else None
+        if settings.LOG_REDACT:
+            for key, value in list(record.__dict__.items()):
+                if key in _RECORD_ATTRIBUTES:
+                    continue
+                record.__dict__[key] = (
+                    REDACTED if key.lower() in REDACTED_FIELDS else redact(value)
+                )
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Render the message and traceback in the calling thread, so the
+        # record no longer references request objects
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields at the top level"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "trace_id", None):
+            entry["trace_id"] = record.trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human readable lines for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        extras = {k: v for k, v in record.__dict__.items() if k not in _RECORD_ATTRIBUTES}
+        if extras:
+            line += " " + json.dumps(extras, default=str)
+        return line
+
+
+def configure_logging():
+    """Routes the `app` loggers through the queue; safe to call twice"""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.handlers = [handler]
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream)
+    _listener.start()
+
+
+def stop_logging():
+    """Writes out queued records and stops the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    Gives every request a correlation id, taken from the X-Request-ID header
+    or generated, and returns it in the X-Request-ID response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                # Bounded so callers cannot inflate every log line
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
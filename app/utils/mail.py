@@ -0,0 +1,324 @@
+"""
+Email outbox and its background sender.
+
+Endpoints enqueue emails in the `email_outbox` table and return at once;
+the sender drains the outbox in batches. Each batch becomes a single
+SendGrid request with one personalization per recipient. The template is
+rendered with placeholder tokens, and every personalization substitutes its
+own (HTML-escaped) values, so a batch costs one API call whatever its size.
+Token renders only depend on which optional fields are set, so they are
+cached per combination.
+
+Templates are compiled at startup, and their bytecode is kept on disk so
+other workers and later starts skip the compilation.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from jinja2 import (
+    BytecodeCache,
+    Environment,
+    FileSystemBytecodeCache,
+    PackageLoader,
+    select_autoescape,
+)
+from markupsafe import escape
+from python_http_client.exceptions import HTTPError as SendGridHTTPError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, Personalization, Substitution, To
+from starlette.concurrency import run_in_threadpool
+
+from app.config.config import settings
+from app.engine.db_storage import DBStorage
+from app.models import EmailOutbox
+from app.schema.mail import AppointmentData
+from app.utils.metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_TEMPLATE = "confirmation"
+# Fields of the confirmation email substituted per recipient
+CONFIRMATION_FIELDS = ("patient_name", "appointment_date", "appointment_time", "gp_name")
+# How long a claimed message may stay in `sending` before another sender
+# assumes its sender died and claims it again
+SEND_LEASE = timedelta(minutes=5)
+MAX_BACKOFF_SECONDS = 3600
+
+# Set by enqueue so the sender delivers new mail without waiting a full poll
+outbox_wakeup = asyncio.Event()
+
+
+def template_bytecode_cache() -> FileSystemBytecodeCache:
+    """Bytecode cache in TEMPLATE_CACHE_DIR, or in the temp directory"""
+    directory = settings.TEMPLATE_CACHE_DIR or os.path.join(
+        tempfile.gettempdir(), "recall-template-cache"
+    )
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+def create_template_env(bytecode_cache: Optional[BytecodeCache] = None) -> Environment:
+    # Templates ship with the package and never change while running, so
+    # skip the modification check on every lookup
+    return Environment(
+        loader=PackageLoader("app"),
+        autoescape=select_autoescape(["html", "xml"]),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_template_env() -> Environment:
+    """The email template environment, created on first use"""
+    return create_template_env(template_bytecode_cache())
+
+
+@lru_cache(maxsize=None)
+def get_sendgrid_client() -> SendGridAPIClient:
+    """The SendGrid client, created on first use"""
+    return SendGridAPIClient(settings.SENDGRID_API_KEY, host=settings.SENDGRID_HOST)
+
+
+def _token(field: str) -> str:
+    return f"-{field}-"
+
+
+def confirmation_subject(patient_name) -> str:
+    return f"Appointment Confirmation for {patient_name}"
+
+
+def _shape(details: dict) -> Tuple[str, ...]:
+    """The optional fields that are set, which decide the template branches"""
+    return tuple(sorted(key for key, value in details.items() if value))
+
+
+def warm_templates() -> int:
+    """Compiles every email template; returns the number compiled"""
+    env = get_template_env()
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+@lru_cache(maxsize=64)
+def _render_with_tokens(shape: Tuple[str, ...]) -> str:
+    """Renders the confirmation email with placeholder tokens for every value"""
+    template = get_template_env().get_template("mail.html")
+    return template.render(
+        **{field: _token(field) for field in CONFIRMATION_FIELDS},
+        appointment_details={field: _token(field) for field in shape},
+    )
+
+
+def enqueue_confirmation_email(
+    db,
+    appointment: AppointmentData,
+    tool_call_id: Optional[str] = None,
+    practice_id: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """
+    Stores a confirmation email in the outbox for background delivery, and
+    commits it. `practice_id` is the practice whose admin may read its
+    delivery status.
+
+    An email queued for a tool call is keyed on the tool call id: the
+    insert does nothing if the id is already in the outbox, so a retried
+    tool call, on any worker and across restarts, gets the first email.
+
+    Returns:
+    - (email id, created) where `created` is False for a repeated tool call
+    """
+    now = datetime.now()
+    statement = (
+        pg_insert(EmailOutbox)
+        .values(
+            id=str(uuid.uuid4()),
+            template=CONFIRMATION_TEMPLATE,
+            to_email=appointment.patient_email,
+            payload=appointment.model_dump_json(),
+            status="pending",
+            attempts=0,
+            next_attempt_at=now,
+            tool_call_id=tool_call_id,
+            practice_id=practice_id,
+            created_at=now,
+            updated_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=[EmailOutbox.tool_call_id])
+        .returning(EmailOutbox.id)
+    )
+    try:
+        email_id = db.execute(statement).scalar()
+        created = email_id is not None
+        if not created:
+            email_id = (
+                db.query_eng(EmailOutbox.id)
+                .filter(EmailOutbox.tool_call_id == tool_call_id)
+                .scalar()
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return email_id, created
+
+
+def claim_batch(db, limit: int) -> List[EmailOutbox]:
+    """
+    Claims up to `limit` messages that are due for delivery.
+
+    Rows are locked with SKIP LOCKED so concurrent senders on other workers
+    claim disjoint batches. Claimed rows are leased for SEND_LEASE.
+    """
+    now = datetime.now()
+    emails = (
+        db.query_eng(EmailOutbox)
+        .filter(
+            EmailOutbox.status.in_(("pending", "sending")),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for email in emails:
+        email.status = "sending"
+        email.attempts += 1
+        email.next_attempt_at = now + SEND_LEASE
+    db.commit()
+    return emails
+
+
+def build_batch_mail(emails: List[EmailOutbox]) -> List[Tuple[Mail, List[EmailOutbox]]]:
+    """
+    Builds one SendGrid request per template shape, with one personalization
+    per message.
+    """
+    by_shape: Dict[Tuple[str, ...], List[Tuple[EmailOutbox, dict]]] = {}
+    for email in emails:
+        details = json.loads(email.payload)
+        by_shape.setdefault(_shape(details), []).append((email, details))
+
+    mails = []
+    for shape, items in by_shape.items():
+        fields = tuple(dict.fromkeys(CONFIRMATION_FIELDS + shape))
+        mail = Mail(
+            from_email=settings.SENDER_EMAIL,
+            subject=confirmation_subject(_token("patient_name")),
+            html_content=_render_with_tokens(shape),
+        )
+        for email, details in items:
+            personalization = Personalization()
+            personalization.add_to(To(email.to_email))
+            personalization.subject = confirmation_subject(details.get("patient_name"))
+            for field in fields:
+                personalization.add_substitution(
+                    Substitution(_token(field), str(escape(str(details.get(field)))))
+                )
+            mail.add_personalization(personalization)
+        mails.append((mail, [email for email, _ in items]))
+    return mails
+
+
+def _retry_delay(attempts: int, retry_after: float = 0) -> float:
+    backoff = settings.OUTBOX_BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    backoff = min(backoff, MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+    return max(backoff, retry_after)
+
+
+def _mark_failed_attempt(
+    email: EmailOutbox, error: str, status_code=None, retry_after=0, permanent=False
+):
+    email.last_error = error[:512]
+    email.provider_status = status_code
+    if permanent or email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = "failed"
+    else:
+        email.status = "pending"
+        email.next_attempt_at = datetime.now() + timedelta(
+            seconds=_retry_delay(email.attempts, retry_after)
+        )
+
+
+def send_batch(db, emails: List[EmailOutbox]):
+    """Delivers claimed messages and records the outcome of each"""
+    for mail, batch in build_batch_mail(emails):
+        try:
+            with track_upstream("sendgrid", "POST /v3/mail/send") as call:
+                response = get_sendgrid_client().send(mail)
+                call.status = response.status_code
+        except SendGridHTTPError as e:
+            status_code = getattr(e, "status_code", None)
+            rejected = bool(status_code and 400 <= status_code < 500 and status_code != 429)
+            if rejected and len(batch) > 1:
+                # A single bad message fails the whole request: retry the
+                # batch one message at a time to isolate it
+                for email in batch:
+                    send_batch(db, [email])
+                continue
+            headers = getattr(e, "headers", None) or {}
+            try:
+                retry_after = float(headers.get("Retry-After", 0) or 0)
+            except ValueError:
+                retry_after = 0
+            for email in batch:
+                # A rejected message fails the same way on every retry
+                _mark_failed_attempt(
+                    email, str(getattr(e, "body", e)), status_code, retry_after,
+                    permanent=rejected,
+                )
+        except Exception as e:
+            for email in batch:
+                _mark_failed_attempt(email, str(e))
+        else:
+            now = datetime.now()
+            message_id = response.headers.get("X-Message-Id") if response.headers else None
+            for email in batch:
+                email.status = "sent"
+                email.sent_at = now
+                email.provider_status = response.status_code
+                email.provider_message_id = message_id
+                email.last_error = None
+        db.commit()
+
+
+def drain_outbox() -> int:
+    """Sends due messages until the outbox is empty; returns the number handled"""
+    db = DBStorage()
+    db.setup_db()
+    handled = 0
+    try:
+        while True:
+            emails = claim_batch(db, settings.OUTBOX_BATCH_SIZE)
+            if not emails:
+                return handled
+            send_batch(db, emails)
+            handled += len(emails)
+    finally:
+        db.close()
+
+
+async def run_outbox_sender(interval: int):
+    """Drains the outbox whenever mail is enqueued, or every `interval` seconds"""
+    while True:
+        outbox_wakeup.clear()
+        try:
+            await run_in_threadpool(drain_outbox)
+        except Exception:
+            logger.exception("Failed to drain email outbox")
+        try:
+            await asyncio.wait_for(outbox_wakeup.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,208 @@
+"""
+Prometheus metrics: request latency per route, requests in flight, database
+pool usage and upstream call latency.
+
+Metrics are kept per worker process and served from `GET /metrics`.
+"""
+import re
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import httpx
+from prometheus_client import Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+from prometheus_client.registry import Collector
+
+from app.utils.tracing import inject_traceparent, start_span
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests by route template",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to upstream services, by outcome",
+    ["upstream", "operation", "outcome"],
+)
+
+# Requests that match no route share one label so that scans of random
+# paths cannot create unbounded series
+UNMATCHED_ROUTE = "unmatched"
+# Path segments of upstream URLs that are versions rather than ids
+_VERSION_SEGMENT = re.compile(r"v\d+")
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request under its route template
+    (`/recall/groups/{group_id}`), and the number of requests in flight.
+
+    A plain ASGI middleware, so it adds no request/response wrapping; label
+    children are cached to keep the per-request cost to a dict lookup.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str, int], object] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            # FastAPI stores the matched route in the scope while routing
+            route = scope.get("route")
+            key = (
+                scope["method"],
+                getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status_code,
+            )
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = REQUEST_LATENCY.labels(*key)
+            child.observe(elapsed)
+
+
+class UpstreamCall:
+    """Outcome of an upstream call; set `status` to the response status code"""
+
+    __slots__ = ("status",)
+
+    def __init__(self):
+        self.status: Optional[int] = None
+
+
+@contextmanager
+def track_upstream(upstream: str, operation: str):
+    """
+    Times a call to an upstream service, in a trace span when the request is
+    traced. HTTP clients get this through the instrumented transports below.
+
+    The call counts as an error if the block raises, or if the status code
+    set on the yielded UpstreamCall is 5xx or 429:
+
+        with track_upstream("auth", "verify_token") as call:
+            response = await client.post(...)
+            call.status = response.status_code
+    """
+    call = UpstreamCall()
+    start = time.perf_counter()
+    outcome = "error"
+    with start_span(f"{upstream} {operation}", upstream=upstream) as span:
+        try:
+            yield call
+            if call.status is None or (call.status < 500 and call.status != 429):
+                outcome = "ok"
+        finally:
+            UPSTREAM_LATENCY.labels(upstream, operation, outcome).observe(
+                time.perf_counter() - start
+            )
+            if span is not None and call.status is not None:
+                span.attributes["status"] = call.status
+
+
+def _operation(request: httpx.Request) -> str:
+    """`GET /call/{id}` for a request to /call/5f2c..., to bound label values"""
+    segments = [
+        "{id}"
+        if len(segment) >= 20
+        or (any(c.isdigit() for c in segment) and not _VERSION_SEGMENT.fullmatch(segment))
+        else segment
+        for segment in request.url.path.split("/")
+    ]
+    return f"{request.method} {'/'.join(segments)}"
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """
+    httpx transport that records every request of a client as a call to
+    `upstream`. Latency is measured up to the response headers.
+    """
+
+    def __init__(self, upstream: str, transport: Optional[httpx.BaseTransport] = None):
+        self.upstream = upstream
+        self._transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with track_upstream(self.upstream, _operation(request)) as call:
+            inject_traceparent(request.headers)
+            response = self._transport.handle_request(request)
+            call.status = response.status_code
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of InstrumentedTransport"""
+
+    def __init__(self, upstream: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.upstream = upstream
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with track_upstream(self.upstream, _operation(request)) as call:
+            inject_traceparent(request.headers)
+            response = await self._transport.handle_async_request(request)
+            call.status = response.status_code
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+_engines = weakref.WeakSet()
+
+
+def track_engine(engine):
+    """Includes an engine's connection pool in the pool metrics"""
+    _engines.add(engine)
+
+
+class PoolCollector(Collector):
+    """Reports the connection pool usage of every live engine, summed"""
+
+    def collect(self):
+        size = checked_out = overflow = 0
+        engines = list(_engines)
+        for engine in engines:
+            pool = engine.pool
+            # Only QueuePool and its subclasses report sizes
+            if hasattr(pool, "checkedout"):
+                size += pool.size()
+                checked_out += pool.checkedout()
+                overflow += max(pool.overflow(), 0)
+        yield GaugeMetricFamily("db_engines", "Live database engines", value=len(engines))
+        yield GaugeMetricFamily("db_pool_size", "Configured pool size", value=size)
+        yield GaugeMetricFamily(
+            "db_pool_checked_out", "Connections checked out of the pool", value=checked_out
+        )
+        yield GaugeMetricFamily(
+            "db_pool_overflow", "Connections opened beyond the pool size", value=overflow
+        )
+
+
+REGISTRY.register(PoolCollector())
@@ -0,0 +1,49 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(sort_value: Any, row_id: str) -> str:
+    """
+    Encodes the position of the last row of a page as an opaque cursor.
+
+    Parameters:
+    - sort_value: Value of the sort column for the last row
+    - row_id: Primary key of the last row, used as a tie-breaker
+
+    Returns:
+    - str: URL-safe cursor to pass back as the `cursor` query parameter
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = {"dt": sort_value.isoformat()}
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Any, str]]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Returns:
+    - (sort_value, row_id), or None if no cursor was given
+
+    Raises:
+    - 400 Bad Request: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if isinstance(sort_value, dict):
+            sort_value = datetime.fromisoformat(sort_value["dt"])
+        return sort_value, str(row_id)
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
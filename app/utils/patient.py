@@ -1,33 +1,122 @@
-from typing import List
-from fastapi import APIRouter, HTTPException, status
-import requests
+from datetime import date
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+import httpx
 
 from app.config.config import settings
+from app.engine.db_storage import DBStorage
+from app.models import Practice
+from app.schema.recall import DuePatientResponse
+from app.utils.cache import CachedValue, StaleWhileRevalidateCache
+from app.utils.metrics import AsyncInstrumentedTransport
+from app.utils.recall_due import find_due_patients
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the pooled client used for the due patients API"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.POSTMAN_BASE_URL,
+            headers={"x-api-key": settings.POSTMAN_API_KEY},
+            timeout=httpx.Timeout(10.0),
+            transport=AsyncInstrumentedTransport(
+                "due_patients",
+                httpx.AsyncHTTPTransport(
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+                ),
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Closes the pooled client and its connections"""
+    if _http_client is not None:
+        await _http_client.aclose()
+
+
+async def fetch_due_patients():
+    """Fetches the patients due for recall from the upstream API"""
+    response = await get_http_client().get("/recall_patients")
+    response.raise_for_status()
+    return response.json()
+
 
-HEADERS = {"x-api-key": settings.POSTMAN_API_KEY}
-BASE_URL = settings.POSTMAN_BASE_URL
+due_patients_cache = StaleWhileRevalidateCache(
+    fetch_due_patients,
+    ttl=settings.DUE_PATIENTS_CACHE_TTL_SECONDS,
+    max_stale=settings.DUE_PATIENTS_MAX_STALE_SECONDS,
+)
 
 
-async def get_due_patients_util():
+async def get_due_patients_util() -> CachedValue:
     """
     Retrieve patients who are due for recall.
 
+    Results are cached: fresh results are served from memory, stale results
+    are served while they are refreshed in the background, and concurrent
+    callers share one upstream request. When the upstream API is down the
+    last good snapshot is served, with `error` set on the result.
+
     Returns:
-        List[Patient]: List of patients due for recall
+        CachedValue: The list of patients due for recall and its freshness
 
     Raises:
-        HTTPException: If the external API request fails
+        HTTPException: If the external API request fails and nothing is cached
     """
     try:
-        response = requests.get(
-            f"{BASE_URL}/recall_patients",
-            headers=HEADERS,
-            timeout=10,
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        return await due_patients_cache.get()
+    except (httpx.HTTPError, ValueError) as e:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Failed to fetch due patients: {str(e)}",
         )
+
+
+def get_local_due_patients(
+    admin_id: str, start: Optional[date], end: date, limit: int
+) -> List[DuePatientResponse]:
+    """
+    Retrieve the patients of the admin's practice due for recall by `end`
+    (and from `start`, if given), computed from the local recall schedule.
+
+    Raises:
+        HTTPException: If the admin has no practice
+    """
+    db = DBStorage()
+    db.setup_db()
+    try:
+        practice = db.query_eng(Practice).filter(Practice.admin_id == admin_id).first()
+        if not practice:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Practice not found for this admin",
+            )
+
+        return [
+            DuePatientResponse(
+                id=patient.id,
+                first_name=patient.first_name,
+                last_name=patient.last_name,
+                email=patient.email,
+                number=patient.number,
+                dob=patient.dob,
+                notes=patient.notes,
+                created_at=patient.created_at,
+                last_called_at=patient.last_called_at,
+                last_recall_at=patient.last_recall_at,
+                recall_interval_days=patient.recall_interval_days,
+                next_due_at=patient.next_due_at,
+                recall_group_id=patient.recall_group_id,
+                recall_group_name=group_name,
+            )
+            for patient, group_name in find_due_patients(
+                db, practice.id, start, end, limit
+            )
+        ]
+    finally:
+        db.close()
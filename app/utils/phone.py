@@ -0,0 +1,49 @@
+import re
+
+DEFAULT_COUNTRY_CODE = "44"
+
+
+def normalize_phone(number: str, country_code: str = DEFAULT_COUNTRY_CODE) -> str:
+    """
+    Normalizes a phone number to its international digits, without the
+    leading `+`, so that "07700 900123", "+44 7700 900123" and
+    "0044 (0)7700 900123" all map to "447700900123".
+
+    Parameters:
+    - number: Phone number in any common format
+    - country_code: Country code assumed for national numbers (leading 0)
+
+    Returns:
+    - str: Digits only, or an empty string if the number has no digits
+    """
+    number = (number or "").strip().replace("(0)", "")
+    digits = re.sub(r"\D", "", number)
+    if number.startswith("+"):
+        return digits
+    if digits.startswith("00"):
+        return digits[2:]
+    if digits.startswith("0"):
+        return country_code + digits[1:]
+    return digits
+
+
+def phone_digit_variants(number: str, country_code: str = DEFAULT_COUNTRY_CODE) -> set:
+    """
+    Returns the digits left of every common format of a normalized number
+    once its separators are removed, e.g. "447700900123", "07700900123",
+    "00447700900123" and "4407700900123" (from "+44 (0)7700 900123").
+    Stored numbers whose digits are one of these may normalize to the same
+    number.
+    """
+    normalized = normalize_phone(number, country_code)
+    if not normalized:
+        return set()
+    variants = {normalized, "00" + normalized}
+    if normalized.startswith(country_code):
+        national = normalized[len(country_code):]
+        variants.update({
+            "0" + national,
+            country_code + "0" + national,
+            "00" + country_code + "0" + national,
+        })
+    return variants
@@ -0,0 +1,236 @@
+"""
+Per-request SQL statistics: statement count, time spent in the database,
+repeated statement shapes (N+1 patterns) and slow queries.
+
+Statements are counted from Engine cursor events, so everything executed
+while handling a request is included: explicit queries, lazy loads during
+serialization and flushes. Endpoints can declare a query budget with
+`query_budget`, which QUERY_BUDGET_MODE checks; "enforce" is meant for test
+and load test runs, where a request over its budget fails with a 500.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists bind one parameter per value; collapse them so the
+# same query with different list lengths has one shape
+_IN_LIST = re.compile(r"\(\s*(?:%\(\w+\)s|\?|:\w+)(?:\s*,\s*(?:%\(\w+\)s|\?|:\w+))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+# Quoted literals in plans, which show the bound parameter values
+_PLAN_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with whitespace normalized and IN lists collapsed"""
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def describe_db_error(e: SQLAlchemyError) -> str:
+    """
+    The class and SQLSTATE of a database error, for logs and traces. The
+    message is left out: it carries bound parameters and DETAIL lines with
+    row values, such as patient emails and numbers.
+    """
+    orig = getattr(e, "orig", None)
+    pgcode = getattr(orig, "pgcode", None)
+    if pgcode:
+        return f"{type(e).__name__} ({type(orig).__name__}, SQLSTATE {pgcode})"
+    return type(e).__name__
+
+
+class QueryStats:
+    """Statements executed while handling one request"""
+
+    __slots__ = ("count", "seconds", "shapes", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.slow: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes executed at least `threshold` times"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+
+@contextmanager
+def untracked_queries():
+    """Leaves the statements run in the block out of the request statistics"""
+    token = _request_stats.set(None)
+    try:
+        yield
+    finally:
+        _request_stats.reset(token)
+
+
+def query_budget(max_queries: int):
+    """
+    Declares how many statements an endpoint may execute. Apply it below
+    the route decorator:
+
+        @router.get("/groups")
+        @query_budget(2)
+        async def get_recall_groups(...):
+    """
+    def decorator(fn):
+        fn.__query_budget__ = max_queries
+        return fn
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    start = getattr(context, "_query_start", None)
+    if stats is None or start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats.record(statement, elapsed)
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        stats.slow.append((statement, elapsed))
+        _log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+
+def _log_slow_query(conn, statement, parameters, elapsed, executemany):
+    plan = None
+    if (
+        settings.SLOW_QUERY_EXPLAIN
+        and not executemany
+        and conn.dialect.name == "postgresql"
+        and statement.lstrip()[:6].upper() == "SELECT"
+    ):
+        try:
+            with untracked_queries():
+                rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+            plan = _PLAN_LITERAL.sub("'?'", "\n".join(row[0] for row in rows))
+        except Exception as e:
+            # The message would repeat the parameters
+            plan = f"unavailable: {type(e).__name__}"
+    logger.warning(
+        "Slow query (%.1fms): %s", elapsed * 1000, _WHITESPACE.sub(" ", statement),
+        extra={"duration_ms": round(elapsed * 1000, 1), "plan": plan},
+    )
+
+
+def _budget_error(route_path: str, stats: QueryStats, budget: int) -> bytes:
+    return json.dumps({
+        "detail": (
+            f"Query budget exceeded for {route_path}: "
+            f"{stats.count} statements, budget {budget}"
+        ),
+        "repeated_statements": [
+            {"statement": shape, "count": n} for shape, n in stats.repeated(2)
+        ],
+    }).encode()
+
+
+class QueryStatsMiddleware:
+    """
+    Collects the statistics of each request, then:
+    - logs statement shapes repeated QUERY_N_PLUS_ONE_THRESHOLD times or more
+    - adds X-DB-Query-Count, X-DB-Query-Time-Ms and X-DB-Repeated-Queries
+      headers when QUERY_STATS_HEADERS is set
+    - checks the endpoint's query budget per QUERY_BUDGET_MODE
+
+    Statistics cover the statements run before the response starts, which
+    includes response serialization.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        suppress_body = False
+
+        async def send_wrapper(message):
+            nonlocal suppress_body
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                route_path = getattr(route, "path", scope["path"])
+                repeated = stats.repeated(settings.QUERY_N_PLUS_ONE_THRESHOLD)
+                for shape, n in repeated:
+                    logger.warning(
+                        "Possible N+1 in %s %s: %dx %s", scope["method"], route_path, n, shape
+                    )
+
+                budget = getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+                if (
+                    settings.QUERY_BUDGET_MODE != "off"
+                    and budget is not None
+                    and stats.count > budget
+                ):
+                    logger.warning(
+                        "Query budget exceeded for %s %s: %d statements, budget %d",
+                        scope["method"], route_path, stats.count, budget,
+                    )
+                    if settings.QUERY_BUDGET_MODE == "enforce":
+                        suppress_body = True
+                        body = _budget_error(route_path, stats, budget)
+                        await send({
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [
+                                (b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                            ],
+                        })
+                        await send({"type": "http.response.body", "body": body})
+                        return
+
+                if settings.QUERY_STATS_HEADERS:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-query-time-ms", f"{stats.seconds * 1000:.1f}".encode()),
+                        (b"x-db-repeated-queries", str(len(repeated)).encode()),
+                    ]
+            elif suppress_body:
+                return
+            await send(message)
+
+        token = _request_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+
+
+def enable_query_stats(app):
+    """Installs the middleware and the statement listeners"""
+    app.add_middleware(QueryStatsMiddleware)
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
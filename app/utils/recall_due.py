@@ -0,0 +1,164 @@
+"""
+Local computation of recall due dates.
+
+`RecallPatient.next_due_at` is derived from the last recall date and the
+recall interval, and `dob_date` from the free-text `dob`. Both are
+maintained on every ORM insert and update by the mapper events below, so
+"who is due in this window" is a single range query on the partial
+(recall_group_id, next_due_at) index. Writes that bypass the ORM (bulk
+mappings) must call `apply_due_fields` on their rows.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.models import RecallGroup, RecallPatient
+
+# Formats seen in imported dates of birth, tried in order. Day-first formats
+# come before month-first ones, matching UK practice data.
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%Y/%m/%d",
+    "%d/%m/%y",
+)
+# Formats with a two-digit year, which strptime maps to 1969-2068
+TWO_DIGIT_YEAR_FORMATS = ("%d/%m/%y",)
+
+
+def parse_date(value) -> Optional[date]:
+    """Parses a date from free text, returning None if no format matches"""
+    if value is None or isinstance(value, date):
+        return value
+    value = str(value).strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+        # Dates of birth and recalls are in the past: "01/02/45" is 1945
+        if fmt in TWO_DIGIT_YEAR_FORMATS and parsed > date.today():
+            parsed = parsed.replace(year=parsed.year - 100)
+        return parsed
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        return None
+
+
+def compute_next_due(
+    last_recall_at: Optional[date],
+    recall_interval_days: Optional[int],
+    created_at: Optional[datetime] = None,
+) -> Optional[date]:
+    """
+    Returns the date a patient is next due for recall.
+
+    Patients with a recall interval are due one interval after their last
+    recall, or from the date they were added if they were never recalled.
+    Patients without an interval have no local schedule.
+    """
+    if not recall_interval_days:
+        return None
+    if last_recall_at is not None:
+        return last_recall_at + timedelta(days=recall_interval_days)
+    return (created_at or datetime.now()).date()
+
+
+def apply_due_fields(row: dict) -> dict:
+    """Fills dob_date and next_due_at of a row written without the ORM"""
+    row["dob_date"] = parse_date(row.get("dob"))
+    row["next_due_at"] = compute_next_due(
+        row.get("last_recall_at"),
+        row.get("recall_interval_days"),
+        row.get("created_at"),
+    )
+    return row
+
+
+def find_due_patients(
+    db, practice_id: str, start: Optional[date], end: date, limit: int
+):
+    """
+    Returns (patient, recall group name) for the patients of a practice due
+    by `end` inclusive, earliest first. Without `start` this includes
+    overdue patients; with it, only those due from `start`.
+    """
+    query = (
+        db.query_eng(RecallPatient)
+        .join(RecallGroup, RecallPatient.recall_group_id == RecallGroup.id)
+        .add_columns(RecallGroup.name)
+        .filter(
+            RecallGroup.practice_id == practice_id,
+            RecallPatient.next_due_at.is_not(None),
+            RecallPatient.next_due_at <= end,
+        )
+    )
+    if start is not None:
+        query = query.filter(RecallPatient.next_due_at >= start)
+    return (
+        query.order_by(RecallPatient.next_due_at, RecallPatient.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def backfill_recall_dates(db, batch_size: int = 5000) -> int:
+    """
+    Parses `dob` into `dob_date` and computes `next_due_at` for existing
+    patients, one batch of rows per transaction.
+
+    Returns:
+    - The number of patients updated
+    """
+    updated = 0
+    last_id = ""
+    while True:
+        rows = (
+            db.query_eng(
+                RecallPatient.id,
+                RecallPatient.dob,
+                RecallPatient.last_recall_at,
+                RecallPatient.recall_interval_days,
+                RecallPatient.created_at,
+            )
+            .filter(RecallPatient.id > last_id)
+            .order_by(RecallPatient.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return updated
+
+        db.bulk_update(
+            RecallPatient,
+            [
+                {
+                    "id": row.id,
+                    "dob_date": parse_date(row.dob),
+                    "next_due_at": compute_next_due(
+                        row.last_recall_at, row.recall_interval_days, row.created_at
+                    ),
+                }
+                for row in rows
+            ],
+        )
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+@event.listens_for(RecallPatient, "before_insert")
+@event.listens_for(RecallPatient, "before_update")
+def _maintain_due_fields(mapper, connection, target):
+    target.dob_date = parse_date(target.dob)
+    target.next_due_at = compute_next_due(
+        target.last_recall_at, target.recall_interval_days, target.created_at
+    )
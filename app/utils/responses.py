@@ -0,0 +1,47 @@
+"""
+Fast response path for large read endpoints.
+
+For a returned object, FastAPI validates it against the route's
+response_model (reading ORM attributes), converts the result to JSON
+compatible Python objects and encodes those with the json module. For
+thousands of items built from our own rows, the validation re-checks data
+the database already guarantees, and each pass costs more than the query.
+
+Endpoints offer it by returning an ORJSONResponse of plain dicts built from
+SQL rows (selecting the fields of the response schema with
+DBStorage.project), when the client asks for it (e.g. `fast=true`), since
+the body is then not checked against the response_model; or, for pydantic
+models that are already validated, with `models_response`, which serializes
+them in one pass. The response_model stays on the route for the OpenAPI
+schema.
+"""
+from functools import lru_cache
+from typing import Any, List, Sequence
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+
+def rows_as_dicts(rows: Sequence) -> List[dict]:
+    """Result rows as dicts keyed by column name"""
+    if not rows:
+        return []
+    fields = rows[0]._fields
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def object_as_dict(obj: Any, schema: type[BaseModel]) -> dict:
+    """The attributes of `obj` named by the fields of `schema`"""
+    return {name: getattr(obj, name) for name in schema.model_fields}
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def models_response(items: List[BaseModel], schema: type[BaseModel]) -> Response:
+    """A JSON array of validated models, serialized without re-validation"""
+    return Response(
+        content=_list_adapter(schema).dump_json(items), media_type="application/json"
+    )
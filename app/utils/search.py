@@ -0,0 +1,130 @@
+import re
+from typing import List, Tuple
+
+from sqlalchemy import case, func, literal_column, or_
+
+from app.models import RecallGroup, RecallPatient
+
+# Trigram similarity needs a few characters to be meaningful
+MIN_FUZZY_QUERY_LENGTH = 3
+MIN_PHONE_DIGITS = 3
+
+# Must match the expression of ix_recall_patients_full_name_trgm exactly,
+# otherwise Postgres will not use the index
+FULL_NAME = func.lower(
+    RecallPatient.first_name + literal_column("' '") + RecallPatient.last_name
+)
+EMAIL = func.lower(RecallPatient.email)
+# Numbers are stored as entered ("07700 900123", "+44 7700 900123"); match
+# on their digits. Must match ix_recall_patients_number_digits_trgm and
+# ix_recall_patients_number_digits.
+NUMBER_DIGITS = func.regexp_replace(
+    RecallPatient.number, literal_column(r"'\D'"), literal_column("''"), literal_column("'g'")
+)
+
+
+def escape_like(value: str) -> str:
+    """Escapes LIKE wildcards so user input is matched literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _postgres_match(term: str, digits: str):
+    """Substring and fuzzy matching served by the pg_trgm GIN indexes"""
+    pattern = f"%{escape_like(term)}%"
+    conditions = [
+        FULL_NAME.like(pattern, escape="\\"),
+        EMAIL.like(pattern, escape="\\"),
+    ]
+    rank_terms = [func.similarity(FULL_NAME, term), func.similarity(EMAIL, term)]
+
+    if len(term) >= MIN_FUZZY_QUERY_LENGTH:
+        # `%` is the trigram similarity operator, which tolerates typos
+        conditions.append(FULL_NAME.op("%")(term))
+    if len(digits) >= MIN_PHONE_DIGITS:
+        conditions.append(NUMBER_DIGITS.like(f"%{digits}%"))
+        rank_terms.append(func.similarity(NUMBER_DIGITS, digits))
+
+    return or_(*conditions), func.greatest(*rank_terms)
+
+
+def _without_separators(column):
+    """The number without the separators it is commonly written with"""
+    for separator in (" ", "-", "(", ")", "+", "."):
+        column = func.replace(column, separator, "")
+    return column
+
+
+def number_digits(db):
+    """
+    The digits of RecallPatient.number on the database of `db`; elsewhere
+    than Postgres, the number without its common separators.
+    """
+    if db.engine.dialect.name == "postgresql":
+        return NUMBER_DIGITS
+    return _without_separators(RecallPatient.number)
+
+
+def _portable_match(term: str, digits: str):
+    """Prefix matching for databases without pg_trgm, such as SQLite"""
+    prefix = f"{escape_like(term)}%"
+    conditions = [
+        func.lower(RecallPatient.first_name).like(prefix, escape="\\"),
+        func.lower(RecallPatient.last_name).like(prefix, escape="\\"),
+        FULL_NAME.like(prefix, escape="\\"),
+        EMAIL.like(prefix, escape="\\"),
+    ]
+    if len(digits) >= MIN_PHONE_DIGITS:
+        conditions.append(_without_separators(RecallPatient.number).like(f"%{digits}%"))
+
+    rank = case(
+        (FULL_NAME == term, 1.0),
+        (EMAIL == term, 1.0),
+        (FULL_NAME.like(prefix, escape="\\"), 0.75),
+        else_=0.5,
+    )
+    return or_(*conditions), rank
+
+
+def search_patients(
+    db, practice_id: str, query: str, limit: int, offset: int
+) -> List[Tuple[RecallPatient, str, float]]:
+    """
+    Searches the patients of every recall group of a practice by name, email
+    or phone number.
+
+    On Postgres the search matches substrings and near misses using the
+    pg_trgm indexes and ranks by trigram similarity. Other databases fall back
+    to ranked prefix matching.
+
+    Parameters:
+    - db: DBStorage instance
+    - practice_id: Practice whose patients are searched
+    - query: Search text
+    - limit, offset: Page of results to return
+
+    Returns:
+    - List of (patient, recall group name, rank) ordered by descending rank
+    """
+    term = query.strip().lower()
+    digits = re.sub(r"\D", "", term)
+    if digits.startswith("0") and not digits.startswith("00"):
+        # Drop the national trunk prefix so "07700 900123" also finds
+        # numbers stored as "+44 7700 900123"
+        digits = digits[1:]
+
+    if db.engine.dialect.name == "postgresql":
+        condition, rank = _postgres_match(term, digits)
+    else:
+        condition, rank = _portable_match(term, digits)
+
+    rank = rank.label("rank")
+    return (
+        db.query_eng(RecallPatient)
+        .join(RecallGroup, RecallPatient.recall_group_id == RecallGroup.id)
+        .add_columns(RecallGroup.name, rank)
+        .filter(RecallGroup.practice_id == practice_id, condition)
+        .order_by(rank.desc(), RecallPatient.last_name, RecallPatient.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
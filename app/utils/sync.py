@@ -0,0 +1,257 @@
+"""
+Incremental sync of the upstream due patients API into a local recall group.
+
+Each run asks the upstream API only for records changed since the watermark
+of the last successful run, then upserts them into the designated group in
+batches. Runs are recorded in `sync_runs` with their statistics.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.config.config import settings
+from app.engine.db_storage import DBStorage
+from app.models import RecallPatient, SyncRun
+from app.utils.caller_index import caller_index
+from app.utils.patient import get_http_client
+from app.utils.query_stats import describe_db_error
+from app.utils.recall_due import apply_due_fields, parse_date
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "due_patients"
+BATCH_SIZE = 1000
+# Arbitrary key for the Postgres advisory lock that keeps workers from
+# syncing concurrently
+SYNC_LOCK_KEY = 727_001
+REQUIRED_FIELDS = ("first_name", "last_name", "email", "number", "dob")
+
+
+async def fetch_changed_due_patients(since: Optional[str]) -> List[dict]:
+    """Fetches due patients changed after `since`, or all of them"""
+    params = {"updated_since": since} if since else None
+    response = await get_http_client().get("/recall_patients", params=params)
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict):
+        data = data.get("patients") or data.get("data") or []
+    return data
+
+
+def _to_row(record: dict) -> Optional[dict]:
+    """Maps an upstream record to RecallPatient columns, or None if unusable"""
+    row = {
+        "external_id": str(record.get("id") or record.get("patient_id") or ""),
+        "first_name": record.get("first_name"),
+        "last_name": record.get("last_name"),
+        "email": record.get("email"),
+        "number": record.get("number") or record.get("phone"),
+        "dob": record.get("dob"),
+        "notes": record.get("notes"),
+        "last_recall_at": parse_date(
+            record.get("last_recall_at") or record.get("last_recall_date")
+        ),
+        "recall_interval_days": record.get("recall_interval_days"),
+    }
+    if not row["external_id"] or not all(row[field] for field in REQUIRED_FIELDS):
+        return None
+    try:
+        row["recall_interval_days"] = int(row["recall_interval_days"] or 0) or None
+    except (TypeError, ValueError):
+        row["recall_interval_days"] = None
+    return row
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """An ISO timestamp as an aware datetime (naive ones taken as UTC), or None"""
+    try:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def next_watermark(records: List[dict], watermark: Optional[str]) -> Optional[str]:
+    """
+    The latest `updated_at` of the records and the previous watermark,
+    compared as timestamps; the winning value is kept as the upstream API
+    wrote it.
+    """
+    candidates = [r["updated_at"] for r in records if r.get("updated_at")]
+    if watermark:
+        candidates.append(watermark)
+    parsed = [(_parse_timestamp(value), str(value)) for value in candidates]
+    parsed = [(timestamp, value) for timestamp, value in parsed if timestamp is not None]
+    return max(parsed)[1] if parsed else watermark
+
+
+def _try_lock(db) -> bool:
+    """Takes the sync lock for the current transaction (Postgres only)"""
+    if db.engine.dialect.name != "postgresql":
+        return True
+    return db.query_eng(func.pg_try_advisory_xact_lock(SYNC_LOCK_KEY)).scalar()
+
+
+def _last_watermark(db) -> Optional[str]:
+    last_run = (
+        db.query_eng(SyncRun)
+        .filter(SyncRun.source == SOURCE, SyncRun.status == "success")
+        .order_by(SyncRun.started_at.desc())
+        .first()
+    )
+    return last_run.watermark if last_run else None
+
+
+def upsert_due_patients(db, group_id: str, records: List[dict]) -> Tuple[int, int, int]:
+    """
+    Inserts new and updates known records in the recall group, matched on
+    their upstream id. Changes are not committed.
+
+    Returns:
+    - (inserted, updated, skipped) counts
+    """
+    rows = {}
+    skipped = 0
+    for record in records:
+        row = _to_row(record)
+        if row is None:
+            skipped += 1
+        else:
+            # Later versions of the same record win
+            rows[row["external_id"]] = row
+
+    inserted = updated = 0
+    now = datetime.now()
+    pending = list(rows.values())
+    for start in range(0, len(pending), BATCH_SIZE):
+        batch = pending[start:start + BATCH_SIZE]
+        existing = {
+            external_id: (patient_id, created_at)
+            for external_id, patient_id, created_at in (
+                db.query_eng(
+                    RecallPatient.external_id, RecallPatient.id, RecallPatient.created_at
+                )
+                .filter(
+                    RecallPatient.recall_group_id == group_id,
+                    RecallPatient.external_id.in_([row["external_id"] for row in batch]),
+                )
+                .all()
+            )
+        }
+
+        inserts, updates = [], []
+        for row in batch:
+            known = existing.get(row["external_id"])
+            if known is None:
+                inserts.append(apply_due_fields({
+                    **row,
+                    "id": str(uuid.uuid4()),
+                    "recall_group_id": group_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }))
+            else:
+                # Never-recalled patients are due from their stored creation
+                # date, which is read but not rewritten
+                patient_id, created_at = known
+                update = apply_due_fields({**row, "created_at": created_at})
+                del update["created_at"]
+                updates.append({**update, "id": patient_id, "updated_at": now})
+
+        if inserts:
+            db.bulk_insert(RecallPatient, inserts)
+        if updates:
+            db.bulk_update(RecallPatient, updates)
+            # Bulk writes bypass the ORM events that keep the caller index fresh
+            caller_index.discard(row["id"] for row in updates)
+        inserted += len(inserts)
+        updated += len(updates)
+
+    return inserted, updated, skipped
+
+
+async def sync_due_patients(group_id: str) -> Optional[SyncRun]:
+    """
+    Runs one incremental sync into the recall group.
+
+    Returns:
+    - The recorded SyncRun, or None if another worker is syncing or synced
+      while the records were fetched
+    """
+    db = DBStorage()
+    db.setup_db()
+    try:
+        clock = time.perf_counter()
+        watermark = await run_in_threadpool(_last_watermark, db)
+        # End the read transaction: no transaction stays open during the fetch
+        await run_in_threadpool(db.rollback)
+        run = SyncRun(
+            source=SOURCE,
+            status="failed",
+            started_at=datetime.now(),
+            watermark=watermark,
+            fetched=0,
+            inserted=0,
+            updated=0,
+            skipped=0,
+        )
+        try:
+            records = await fetch_changed_due_patients(watermark)
+            run.fetched = len(records)
+            # The lock is held by the transaction that upserts and records
+            # the run, not across the upstream request. A run that finished
+            # since the fetch may have applied newer versions of the records.
+            if not await run_in_threadpool(_try_lock, db) or (
+                await run_in_threadpool(_last_watermark, db) != watermark
+            ):
+                await run_in_threadpool(db.rollback)
+                return None
+            run.inserted, run.updated, run.skipped = await run_in_threadpool(
+                upsert_due_patients, db, group_id, records
+            )
+            run.watermark = next_watermark(records, watermark)
+            run.status = "success"
+        except Exception as e:
+            await run_in_threadpool(db.rollback)
+            # The run is returned to the caller, so only the error class is
+            # kept; database error text carries row values
+            run.error = (
+                describe_db_error(e) if isinstance(e, SQLAlchemyError) else type(e).__name__
+            )[:512]
+            logger.warning(
+                "Due patients sync failed: %s",
+                describe_db_error(e) if isinstance(e, SQLAlchemyError) else e,
+                extra={"group_id": group_id},
+            )
+
+        run.finished_at = datetime.now()
+        run.duration_ms = int((time.perf_counter() - clock) * 1000)
+        # Commits the upserted patients together with the run and its watermark
+        await run_in_threadpool(db.add, run)
+        return run
+    finally:
+        db.close()
+
+
+async def sync_due_patients_periodically(group_id: str, interval: int):
+    """Runs the incremental sync every `interval` seconds"""
+    while True:
+        try:
+            run = await sync_due_patients(group_id)
+            if run is not None:
+                logger.info(
+                    "Due patients sync %s: fetched %d, inserted %d, updated %d, "
+                    "skipped %d in %dms",
+                    run.status, run.fetched, run.inserted, run.updated,
+                    run.skipped, run.duration_ms,
+                )
+        except Exception:
+            logger.exception("Due patients sync failed")
+        await asyncio.sleep(interval)
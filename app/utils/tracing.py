@@ -0,0 +1,322 @@
+"""
+Lightweight request tracing.
+
+Each sampled request gets a root span, with child spans for token
+verification, every SQL statement and every upstream HTTP call. The trace
+context is read from and propagated to upstreams with W3C `traceparent`
+headers. Finished spans are exported in the background, as JSON lines to a
+file or as OTLP/HTTP JSON to a collector.
+
+Tracing is off when TRACE_SAMPLE_RATE is 0: no middleware or SQL listeners
+are installed, and `start_span` returns after one context variable lookup.
+"""
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config.config import settings
+from app.utils.query_stats import describe_db_error
+
+logger = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+# Statements are truncated in span attributes
+MAX_STATEMENT_LENGTH = 2000
+
+
+def describe_error(e: BaseException) -> str:
+    """
+    The error recorded on a span: its class, and the SQLSTATE of database
+    errors. Messages are left out, since spans leave the process and error
+    messages can carry patient data.
+    """
+    if isinstance(e, SQLAlchemyError):
+        return describe_db_error(e)
+    return type(e).__name__
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns",
+                 "attributes", "error")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, **attributes):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes
+        self.error: Optional[str] = None
+
+    def child(self, name: str, **attributes) -> "Span":
+        return Span(self.trace_id, self.span_id, name, **attributes)
+
+    def finish(self):
+        self.end_ns = time.time_ns()
+        exporter.export(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# The innermost span of the current request, if it is sampled
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name: str, **attributes):
+    """Runs the block in a child span of the current span, if there is one"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = parent.child(name, **attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = describe_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+def traced(name: str):
+    """Decorator running an async function in a span"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with start_span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_traceparent(headers):
+    """Adds the current trace context to outgoing request headers"""
+    span = _current_span.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+
+
+class TracingMiddleware:
+    """
+    Starts the root span of sampled requests.
+
+    Requests carrying a `traceparent` continue that trace and follow its
+    sampling decision; other requests are sampled at TRACE_SAMPLE_RATE.
+    """
+
+    def __init__(self, app, sample_rate: float):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = None
+        sampled = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                match = _TRACEPARENT.fullmatch(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_id, flags = match.groups()
+                    sampled = bool(int(flags, 16) & 1)
+                break
+        if sampled is None:
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        span = Span(trace_id or os.urandom(16).hex(), parent_id, "HTTP", method=scope["method"],
+                    path=scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.attributes["status"] = message["status"]
+            await send(message)
+
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            span.error = describe_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            route = scope.get("route")
+            span.name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+            span.finish()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    span = parent.child("db.query", statement=statement[:MAX_STATEMENT_LENGTH])
+    if executemany:
+        span.attributes["executemany"] = True
+    context._trace_span = span
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.attributes["rows"] = cursor.rowcount
+        span.finish()
+
+
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    span = getattr(context, "_trace_span", None) if context is not None else None
+    if span is not None:
+        span.error = describe_error(
+            exception_context.sqlalchemy_exception or exception_context.original_exception
+        )
+        span.finish()
+
+
+def _otlp_attributes(attributes: dict) -> List[dict]:
+    values = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        else:
+            typed = {"stringValue": str(value)}
+        values.append({"key": key, "value": typed})
+    return values
+
+
+def _otlp_span(span: Span) -> dict:
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 2 if span.parent_id is None else 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+class SpanExporter:
+    """
+    Queues finished spans and writes them from a background thread, so
+    exporting never blocks a request. Spans are dropped if the queue is full.
+    """
+
+    def __init__(self, max_queue: int = 10000, interval: float = 1.0):
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> List[Span]:
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                return spans
+
+    def _run(self):
+        while True:
+            time.sleep(self._interval)
+            self.flush()
+
+    def flush(self):
+        spans = self._drain()
+        if not spans:
+            return
+        try:
+            if settings.TRACE_EXPORTER == "collector":
+                self._send(spans)
+            else:
+                self._write(spans)
+        except Exception as e:
+            logger.warning("Failed to export %d spans: %s", len(spans), e)
+
+    def _write(self, spans: List[Span]):
+        with open(settings.TRACE_FILE, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict()) + "\n")
+
+    def _send(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": settings.project_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "app.utils.tracing"},
+                    "spans": [_otlp_span(span) for span in spans],
+                }],
+            }]
+        }
+        response = httpx.post(settings.TRACE_COLLECTOR_URL, json=payload, timeout=5)
+        response.raise_for_status()
+
+
+exporter = SpanExporter()
+
+
+def enable_tracing(app):
+    """Installs the middleware and SQL listeners, and starts the exporter"""
+    app.add_middleware(TracingMiddleware, sample_rate=settings.TRACE_SAMPLE_RATE)
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    exporter.start()
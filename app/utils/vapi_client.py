@@ -4,7 +4,14 @@ from vapi.core.client_wrapper import SyncClientWrapper
 from vapi.core.api_error import ApiError
 from json.decoder import JSONDecodeError
 import httpx
+import threading
+from typing import Optional
 from app.config.config import settings
+from app.utils.metrics import InstrumentedTransport
+
+_vapi_client: Optional[Vapi] = None
+_vapi_http_client: Optional[httpx.Client] = None
+_vapi_client_lock = threading.Lock()
 
 
 class CustomCallsClient(CallsClient):
@@ -36,3 +43,37 @@ class CustomVapi(Vapi):
         self._client_wrapper = SyncClientWrapper(self.httpx_client)
         # Initialize our custom calls client
         self.calls = CustomCallsClient(client_wrapper=self._client_wrapper)
+
+
+def get_vapi_client() -> Vapi:
+    """
+    Returns the Vapi client, created on first use. Threadpool threads may
+    ask for it concurrently; only one of them creates it.
+    """
+    global _vapi_client, _vapi_http_client
+    if _vapi_client is None:
+        with _vapi_client_lock:
+            if _vapi_client is None:
+                # The SDK applies no timeout of its own to a client it is given
+                http_client = httpx.Client(
+                    transport=InstrumentedTransport("vapi"),
+                    timeout=settings.VAPI_TIMEOUT_SECONDS,
+                )
+                client = Vapi(
+                    token=settings.VAPI_API_KEY,
+                    base_url=settings.VAPI_BASE_URL.rstrip("/"),
+                    timeout=settings.VAPI_TIMEOUT_SECONDS,
+                    httpx_client=http_client,
+                )
+                _vapi_http_client = http_client
+                _vapi_client = client
+    return _vapi_client
+
+
+def close_vapi_client():
+    """Closes the Vapi client and its connections"""
+    global _vapi_client, _vapi_http_client
+    with _vapi_client_lock:
+        if _vapi_http_client is not None:
+            _vapi_http_client.close()
+        _vapi_client = _vapi_http_client = None
@@ -0,0 +1,35 @@
+"""Shared timing helpers for the benchmark scripts"""
+import statistics
+import time
+from typing import Callable, List
+
+
+def time_calls(fn: Callable, iterations: int) -> List[float]:
+    """Calls `fn` `iterations` times and returns each duration in seconds"""
+    samples = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        start = clock()
+        fn()
+        samples.append(clock() - start)
+    return samples
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name: str, samples: List[float]):
+    """Prints throughput and latency percentiles for a set of samples"""
+    total = sum(samples)
+    print(
+        f"{name:<40} "
+        f"{len(samples) / total:>12,.0f} ops/s  "
+        f"p50 {percentile(samples, 50) * 1e6:>9.1f}us  "
+        f"p99 {percentile(samples, 99) * 1e6:>9.1f}us  "
+        f"max {max(samples) * 1e6:>9.1f}us  "
+        f"mean {statistics.fmean(samples) * 1e6:>9.1f}us"
+    )
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmarks caller lookups against the in-memory caller index.
+
+Usage:
+    python -m benchmarks.bench_caller_lookup [--patients 1000000]
+
+Builds an index of synthetic patients, then times lookups of numbers in the
+formats callers present them in (hits) and of unknown numbers (misses),
+including building the tool-call result. The target is a p99 under 10ms.
+"""
+import argparse
+import json
+import random
+
+from app.utils.caller_index import CallerIndex, CallerRecord, caller_lookup_result
+from benchmarks._timing import percentile, report, time_calls
+
+TARGET_P99_SECONDS = 0.010
+
+
+def synthetic_rows(count: int, groups: int = 200):
+    for i in range(count):
+        group = i % groups
+        yield (
+            f"07700 {i:06d}",
+            CallerRecord(
+                patient_id=f"patient-{i}",
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+                dob="1970-01-01",
+                email=f"patient{i}@example.com",
+                notes=None,
+                recall_group_id=f"group-{group}",
+                recall_group_name=f"Group {group}",
+                practice_id=f"practice-{group % 20}",
+                practice_name=f"Practice {group % 20}",
+            ),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patients", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    index = CallerIndex()
+    index.load(synthetic_rows(args.patients))
+    print(f"Indexed {len(index):,} patients")
+
+    rng = random.Random(42)
+    # Patient i belongs to practice-{i % 20}, see synthetic_rows
+    hits = [
+        (f"+44 7700 {i:06d}", f"practice-{i % 20}")
+        for i in (rng.randrange(args.patients) for _ in range(args.lookups))
+    ]
+    misses = [
+        (f"+44 7911 {rng.randrange(10**6):06d}", "practice-0") for _ in range(args.lookups)
+    ]
+
+    def lookup(numbers):
+        iterator = iter(numbers)
+        return lambda: json.dumps(caller_lookup_result(index.lookup(*next(iterator))))
+
+    hit_samples = time_calls(lookup(hits), args.lookups)
+    miss_samples = time_calls(lookup(misses), args.lookups)
+    report("lookup hit (+ result serialization)", hit_samples)
+    report("lookup miss (before DB fallback)", miss_samples)
+
+    p99 = percentile(hit_samples, 99)
+    verdict = "OK" if p99 < TARGET_P99_SECONDS else "ABOVE TARGET"
+    print(f"p99 hit latency {p99 * 1e3:.3f}ms (target {TARGET_P99_SECONDS * 1e3:.0f}ms): {verdict}")
+
+
+if __name__ == "__main__":
+    main()
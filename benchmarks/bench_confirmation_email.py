@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmarks rendering of the appointment confirmation email.
+
+Usage:
+    python -m benchmarks.bench_confirmation_email [--renders 20000]
+
+Measures:
+- cold start: the first render in a fresh template environment, compiling
+  the templates from source and loading them from a primed bytecode cache
+- steady state: full token renders, cached token renders, and building the
+  SendGrid requests for a batch of queued emails
+"""
+import argparse
+import tempfile
+from datetime import datetime
+
+from jinja2 import FileSystemBytecodeCache
+
+from app.models import EmailOutbox
+from app.schema.mail import AppointmentData
+from app.utils.mail import (
+    CONFIRMATION_FIELDS,
+    _render_with_tokens,
+    _shape,
+    _token,
+    build_batch_mail,
+    create_template_env,
+)
+from benchmarks._timing import report, time_calls
+
+APPOINTMENT = AppointmentData(
+    notes="Hypertension check-up",
+    gp_name="Ross Road Medical Centre",
+    patient_email="patient@example.com",
+    appointment_date="2025-03-14",
+    appointment_time="10:30",
+    patient_name="Jane Doe",
+)
+
+
+def first_render(bytecode_cache=None):
+    """Renders once in a fresh environment, like a newly started worker"""
+    def render():
+        env = create_template_env(bytecode_cache)
+        env.get_template("mail.html").render(
+            **{field: _token(field) for field in CONFIRMATION_FIELDS},
+            appointment_details={},
+        )
+    return render
+
+
+def queued_emails(count: int):
+    payload = APPOINTMENT.model_dump_json()
+    return [
+        EmailOutbox(
+            id=f"email-{i}",
+            template="confirmation",
+            to_email=f"patient{i}@example.com",
+            payload=payload,
+            status="sending",
+            attempts=1,
+            next_attempt_at=datetime.now(),
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=20_000)
+    parser.add_argument("--cold-starts", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bytecode_cache = FileSystemBytecodeCache(directory)
+        first_render(bytecode_cache)()  # prime the cache
+        report("cold render, compiled from source", time_calls(first_render(), args.cold_starts))
+        report(
+            "cold render, from bytecode cache",
+            time_calls(first_render(bytecode_cache), args.cold_starts),
+        )
+
+    shape = _shape(APPOINTMENT.model_dump())
+    report(
+        "token render (uncached)",
+        time_calls(lambda: _render_with_tokens.__wrapped__(shape), args.renders),
+    )
+    report("token render (cached)", time_calls(lambda: _render_with_tokens(shape), args.renders))
+
+    emails = queued_emails(args.batch_size)
+    samples = time_calls(lambda: build_batch_mail(emails), max(args.renders // 100, 10))
+    report(f"build batch of {args.batch_size}", samples)
+    print(f"{args.batch_size * len(samples) / sum(samples):,.0f} emails/s built into requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Benchmarks the GET /recall/groups/{group_id} response of a large group.
+
+Usage:
+    python -m benchmarks.bench_group_response [--patients 20000] [--iterations 10]
+
+Loads a group into an in-memory SQLite database and times, from query to
+encoded body:
+- orm_fastapi: the default path; the group's patients loaded as ORM objects,
+  validated against the response_model and encoded as FastAPI does
+- rows_orjson: the fast path the endpoint takes with `fast=true`; the
+  response columns selected as rows and encoded with orjson
+
+Both bodies are checked to decode to the same JSON before timing.
+"""
+import argparse
+import json
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Union
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base, Practice, RecallGroup, RecallPatient
+from app.models.admin import Admin
+from app.schema.recall import (
+    RecallGroupResponse,
+    RecallGroupSummaryResponse,
+    RecallGroupWithPatientsResponse,
+    RecallPatientResponse,
+)
+from app.utils.responses import object_as_dict, rows_as_dicts
+from benchmarks._timing import percentile, report, time_calls
+
+GROUP_ID = "group-1"
+RESPONSE_MODEL = TypeAdapter(Union[RecallGroupWithPatientsResponse, RecallGroupSummaryResponse])
+PATIENT_COLUMNS = [getattr(RecallPatient, name) for name in RecallPatientResponse.model_fields]
+
+
+def seeded_session(patients: int) -> Session:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 1, 1, 9, 30)
+    with engine.begin() as conn:
+        conn.execute(insert(Admin), [{
+            "id": "admin-1", "first_name": "Bench", "last_name": "Admin",
+            "created_at": now, "updated_at": now,
+        }])
+        conn.execute(insert(Practice), [{
+            "id": "practice-1", "practice_name": "Bench Practice",
+            "practice_email": "bench@example.com", "practice_phone_number": "01234 567890",
+            "practice_address": "1 Bench Road", "admin_id": "admin-1",
+            "created_at": now, "updated_at": now,
+        }])
+        conn.execute(insert(RecallGroup), [{
+            "id": GROUP_ID, "name": "Hypertension", "description": "Annual reviews",
+            "practice_id": "practice-1", "created_at": now, "updated_at": now,
+        }])
+        conn.execute(insert(RecallPatient), [
+            {
+                "id": str(uuid.uuid4()),
+                "first_name": f"First{i}",
+                "last_name": f"Last{i}",
+                "email": f"patient{i}@example.com",
+                "number": f"07700 {i:06d}",
+                "dob": "1970-01-01",
+                "notes": "Annual review" if i % 3 == 0 else None,
+                "last_recall_at": date(2025, 1, 1) if i % 2 else None,
+                "recall_interval_days": 365 if i % 2 else None,
+                "next_due_at": date(2026, 1, 1) if i % 2 else None,
+                "last_called_at": now - timedelta(days=i % 30) if i % 4 == 0 else None,
+                "recall_group_id": GROUP_ID,
+                "created_at": now + timedelta(seconds=i, microseconds=i),
+                "updated_at": now,
+            }
+            for i in range(patients)
+        ])
+    return Session(engine)
+
+
+def orm_fastapi(session: Session) -> bytes:
+    session.expunge_all()
+    group = session.get(RecallGroup, GROUP_ID)
+    value = RESPONSE_MODEL.validate_python(group, from_attributes=True)
+    # FastAPI serializes the validated value to Python, then JSONResponse
+    # encodes it with the json module
+    content = RESPONSE_MODEL.dump_python(value, mode="json")
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def rows_orjson(session: Session) -> bytes:
+    session.expunge_all()
+    group = session.get(RecallGroup, GROUP_ID)
+    patients = session.query(*PATIENT_COLUMNS).filter(
+        RecallPatient.recall_group_id == GROUP_ID
+    ).all()
+    return ORJSONResponse({
+        **object_as_dict(group, RecallGroupResponse),
+        "patients": rows_as_dicts(patients),
+    }).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patients", type=int, default=20_000)
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    session = seeded_session(args.patients)
+    paths = {"orm_fastapi": orm_fastapi, "rows_orjson": rows_orjson}
+
+    bodies = {name: fn(session) for name, fn in paths.items()}
+    decoded = [json.loads(body) for body in bodies.values()]
+    for content in decoded:
+        # Neither path orders the patients
+        content["patients"].sort(key=lambda patient: patient["id"])
+    if any(content != decoded[0] for content in decoded[1:]):
+        raise SystemExit("The response paths produce different JSON")
+    print(f"{args.patients:,} patients, {len(bodies['rows_orjson']):,} byte body")
+
+    medians = {}
+    for name, fn in paths.items():
+        samples = time_calls(lambda: fn(session), args.iterations)
+        report(name, samples)
+        medians[name] = percentile(samples, 50)
+    print(f"rows_orjson is {medians['orm_fastapi'] / medians['rows_orjson']:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
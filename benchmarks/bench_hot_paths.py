@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for CPU-heavy request handling paths.
+
+Usage:
+    python -m benchmarks.bench_hot_paths [--only calls,csv] [--save results.json]
+                                         [--baseline results.json --threshold 10]
+
+Runs offline against the recorded fixtures in benchmarks/fixtures:
+- calls: call history extraction from Vapi calls (GET /patients/calls)
+- csv: patient CSV validation (POST /recall/groups/{id}/import-csv)
+- model_init: BaseModel.__init__ of recall patients
+- group_response: serialization of RecallGroupWithPatientsResponse
+
+With --baseline, exits with status 1 if any benchmark's median got slower
+than the baseline by more than the threshold percentage.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+
+from app.models import RecallGroup, RecallPatient
+from app.schema.recall import RecallGroupWithPatientsResponse
+from app.utils.calls import call_history
+from app.utils.csv_import import parse_patient_csv
+from benchmarks._timing import percentile, report, time_calls
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_calls(count: int):
+    """The recorded calls repeated to `count`, with unique ids"""
+    with open(os.path.join(FIXTURES, "vapi_calls.json")) as f:
+        recorded = json.load(f)
+    return [
+        {**recorded[i % len(recorded)], "id": f"call-{i}"} for i in range(count)
+    ]
+
+
+def load_csv(rows: int) -> str:
+    """The recorded CSV with its rows repeated to `rows`"""
+    with open(os.path.join(FIXTURES, "patients.csv")) as f:
+        header, *recorded = f.read().splitlines()
+    return "\n".join([header] + [recorded[i % len(recorded)] for i in range(rows)])
+
+
+def patient_kwargs(i: int) -> dict:
+    return {
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "email": f"patient{i}@example.com",
+        "number": f"07700 {i:06d}",
+        "dob": "1970-01-01",
+        "notes": "Annual review" if i % 3 == 0 else None,
+        "recall_group_id": "group-1",
+    }
+
+
+def group_with_patients(count: int) -> RecallGroup:
+    group = RecallGroup(id="group-1", name="Hypertension", practice_id="practice-1")
+    group.description = "Annual hypertension reviews"
+    # BaseModel.__init__ parses timestamps given as keyword arguments
+    now = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%f")
+    group.patients = [
+        RecallPatient(**patient_kwargs(i), id=str(uuid.uuid4()), created_at=now)
+        for i in range(count)
+    ]
+    return group
+
+
+def benchmarks(args):
+    """Name -> (zero-argument callable, iterations)"""
+    calls = load_calls(args.calls)
+    csv_content = load_csv(args.csv_rows)
+    kwargs = [patient_kwargs(i) for i in range(1000)]
+    group = group_with_patients(args.group_patients)
+
+    def build_patients():
+        for item in kwargs:
+            RecallPatient(**item)
+
+    return {
+        "calls": (lambda: [call_history(call) for call in calls], args.iterations),
+        "csv": (lambda: parse_patient_csv(csv_content), args.iterations),
+        "model_init": (build_patients, args.iterations),
+        "group_response": (
+            lambda: RecallGroupWithPatientsResponse.model_validate(group).model_dump_json(),
+            max(args.iterations // 10, 5),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", type=lambda value: value.split(","), default=None)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--csv-rows", type=int, default=5000)
+    parser.add_argument("--group-patients", type=int, default=10_000)
+    parser.add_argument("--save", help="write median timings to this JSON file")
+    parser.add_argument("--baseline", help="JSON file written by an earlier --save")
+    parser.add_argument("--threshold", type=float, default=10, help="percent")
+    args = parser.parse_args()
+
+    selected = benchmarks(args)
+    if args.only:
+        selected = {name: selected[name] for name in args.only}
+
+    medians = {}
+    for name, (fn, iterations) in selected.items():
+        fn()  # warm up
+        samples = time_calls(fn, iterations)
+        report(name, samples)
+        medians[name] = percentile(samples, 50)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(medians, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressed = []
+        for name, median in medians.items():
+            if name in baseline:
+                change = (median - baseline[name]) / baseline[name] * 100
+                print(f"{name:<40} {change:>+7.1f}% vs baseline")
+                if change > args.threshold:
+                    regressed.append(name)
+        if regressed:
+            print(f"Regressed: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmarks reading a large recall group as ORM instances versus projected rows.
+
+Usage:
+    python -m benchmarks.bench_row_reads [--patients 100000] [--iterations 5]
+
+Reads every patient of a group from an in-memory SQLite database:
+- orm: full RecallPatient instances, as query_eng returns them
+- rows: the RecallPatientResponse columns as immutable rows, as
+  DBStorage.project returns them
+
+Reports rows per second and the memory held per row while the result is
+alive (measured with tracemalloc, in a separate pass from the timing).
+"""
+import argparse
+import gc
+import tracemalloc
+
+from sqlalchemy.orm import Session
+
+from app.models import RecallPatient
+from app.schema.recall import RecallPatientResponse
+from benchmarks._timing import percentile, report, time_calls
+from benchmarks.bench_group_response import GROUP_ID, seeded_session
+
+FIELDS = tuple(RecallPatientResponse.model_fields)
+
+
+def read_orm(session: Session) -> list:
+    session.expunge_all()
+    return session.query(RecallPatient).filter(RecallPatient.recall_group_id == GROUP_ID).all()
+
+
+def read_rows(session: Session) -> list:
+    session.expunge_all()
+    return (
+        session.query(*(getattr(RecallPatient, name) for name in FIELDS))
+        .filter(RecallPatient.recall_group_id == GROUP_ID)
+        .all()
+    )
+
+
+def bytes_per_row(session: Session, read) -> float:
+    """Memory allocated by a read and still held by its result, per row"""
+    gc.collect()
+    tracemalloc.start()
+    result = read(session)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held / len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--patients", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    session = seeded_session(args.patients)
+    reads = {"orm": read_orm, "rows": read_rows}
+
+    for name, read in reads.items():
+        read(session)  # warm up
+        samples = time_calls(lambda: read(session), args.iterations)
+        report(name, samples)
+        print(
+            f"{'':<40} {args.patients / percentile(samples, 50):>12,.0f} rows/s  "
+            f"{bytes_per_row(session, read):>7,.0f} bytes/row"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Cold start benchmark: import time of the app, and time to first request.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--top 15] [--port 8765] [--skip-server]
+
+- import: runs `python -X importtime -c "import app.main"` in a fresh
+  interpreter and lists the slowest top-level imports
+- first request: starts uvicorn and times from process start until `GET /`
+  answers, which includes the lifespan startup (settings check, schema
+  creation, template warm-up)
+
+Both run in subprocesses with the current environment, so the time to first
+request needs the database settings of a reachable database.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import List, Tuple
+
+from benchmarks._timing import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times() -> Tuple[float, List[Tuple[int, int, str]]]:
+    """Wall time of importing app.main, and (self us, cumulative us, module) per import"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        imports.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return elapsed, imports
+
+
+def time_to_first_request(port: int, timeout: float = 60) -> float:
+    """Seconds from starting uvicorn until `GET /` answers"""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                sys.exit(f"uvicorn exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        sys.exit(f"No response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports listed")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--skip-server", action="store_true",
+                        help="only measure import time")
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        elapsed, imports = import_times()
+        samples.append(elapsed)
+    print(f"{'import app.main':<40} p50 {percentile(samples, 50) * 1000:>8.1f}ms  "
+          f"max {max(samples) * 1000:>8.1f}ms")
+
+    # Indentation of the module name marks nesting; top-level imports have none
+    top_level = [entry for entry in imports if not entry[2].startswith("  ")]
+    print("\nSlowest top-level imports (cumulative, last run):")
+    for self_us, cumulative_us, name in sorted(top_level, key=lambda e: -e[1])[:args.top]:
+        print(f"  {name.strip():<50} {cumulative_us / 1000:>8.1f}ms")
+    print("\nSlowest modules (self, last run):")
+    for self_us, cumulative_us, name in sorted(imports, key=lambda e: -e[0])[:args.top]:
+        print(f"  {name.strip():<50} {self_us / 1000:>8.1f}ms")
+
+    if args.skip_server:
+        return
+    samples = [time_to_first_request(args.port) for _ in range(args.runs)]
+    print(f"\n{'time to first request':<40} p50 {percentile(samples, 50) * 1000:>8.1f}ms  "
+          f"max {max(samples) * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
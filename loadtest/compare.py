@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Compares two load test results and flags regressions.
+
+Usage:
+    python -m loadtest.compare BASELINE.json CANDIDATE.json [--threshold 10]
+    python -m loadtest.compare  # the two most recent results
+
+An endpoint regresses when its p95 or p99 latency grows, or its throughput
+drops, by more than the threshold percentage, or when its error rate grows
+by more than a percentage point. Exits with status 1 on any regression.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+from loadtest.run import RESULTS_DIR
+
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms")
+GATED_LATENCY_METRICS = ("p95_ms", "p99_ms")
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> bool:
+    """Prints the per-endpoint changes; returns True if anything regressed"""
+    regressed = False
+    print(f"baseline {baseline['commit']} -> candidate {candidate['commit']}")
+    if baseline["config"] != candidate["config"]:
+        print("warning: the runs used different configurations")
+    print(
+        f"{'endpoint':<40} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>8}"
+    )
+    for name, after in candidate["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<40} (new endpoint)")
+            continue
+        flags = []
+        throughput = _change(before["throughput_rps"], after["throughput_rps"])
+        if throughput < -threshold:
+            flags.append("throughput")
+        latencies = {metric: _change(before[metric], after[metric]) for metric in LATENCY_METRICS}
+        flags += [m for m in GATED_LATENCY_METRICS if latencies[m] > threshold]
+        errors = (after["error_rate"] - before["error_rate"]) * 100
+        if errors > 1:
+            flags.append("errors")
+        regressed = regressed or bool(flags)
+        print(
+            f"{name:<40} {throughput:>+7.1f}% "
+            + " ".join(f"{latencies[m]:>+7.1f}%" for m in LATENCY_METRICS)
+            + f" {errors:>+7.1f}pp"
+            + (f"  REGRESSED: {', '.join(flags)}" if flags else "")
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares two load test results")
+    parser.add_argument("results", nargs="*", help="baseline and candidate result files")
+    parser.add_argument("--threshold", type=float, default=10, help="percent")
+    args = parser.parse_args()
+
+    paths = args.results
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))[-2:]
+    if len(paths) != 2:
+        parser.error("need a baseline and a candidate result")
+
+    with open(paths[0]) as f:
+        baseline = json.load(f)
+    with open(paths[1]) as f:
+        candidate = json.load(f)
+    sys.exit(1 if compare(baseline, candidate, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Runs a load test against a running instance of the API.
+
+Usage:
+    python -m loadtest.run [--base-url http://127.0.0.1:8000] [--users 20]
+                           [--duration 60] [--scenarios dashboard,email_webhook]
+
+The app must use the same database as this script, with its upstreams
+pointed at the stand-in server (see docs/load-testing.md). The database is
+seeded with a fresh admin and practice, then virtual users run the selected
+scenarios in their weighted mix for the duration. Throughput, latency
+percentiles and error rates are printed per endpoint and saved to
+loadtest/results/ under the current commit, for loadtest.compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks._timing import percentile
+from loadtest.scenarios import SCENARIOS, Recorder
+from loadtest.seed import Fixture, seed
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    fixture: Fixture,
+    names: list,
+    deadline: float,
+    rng: random.Random,
+):
+    scenarios = [SCENARIOS[name][0] for name in names]
+    weights = [SCENARIOS[name][1] for name in names]
+    while time.monotonic() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        await scenario(client, recorder, fixture, rng)
+
+
+async def run(args, fixture: Fixture) -> Recorder:
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        # The app reads the bearer token from the access_token cookie
+        cookies={"access_token": f"Bearer {fixture.admin_id}"},
+        timeout=httpx.Timeout(args.timeout),
+        limits=httpx.Limits(max_connections=args.users),
+    ) as client:
+        await asyncio.gather(*(
+            virtual_user(
+                client, recorder, fixture, args.scenarios, deadline,
+                random.Random(args.seed + i),
+            )
+            for i in range(args.users)
+        ))
+    return recorder
+
+
+def summarize(recorder: Recorder, duration: float) -> dict:
+    endpoints = {}
+    for name, samples in sorted(recorder.latencies.items()):
+        endpoints[name] = {
+            "requests": len(samples),
+            "throughput_rps": len(samples) / duration,
+            "p50_ms": percentile(samples, 50) * 1e3,
+            "p95_ms": percentile(samples, 95) * 1e3,
+            "p99_ms": percentile(samples, 99) * 1e3,
+            "error_rate": recorder.errors[name] / len(samples),
+            "statuses": {str(code): count for code, count in recorder.statuses[name].items()},
+        }
+    return endpoints
+
+
+def print_table(endpoints: dict):
+    print(
+        f"{'endpoint':<40} {'reqs':>7} {'req/s':>8} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    )
+    for name, row in endpoints.items():
+        print(
+            f"{name:<40} {row['requests']:>7} {row['throughput_rps']:>8.1f} "
+            f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+            f"{row['error_rate']:>7.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs a load test against the API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds per request")
+    parser.add_argument(
+        "--scenarios",
+        type=lambda value: value.split(","),
+        default=list(SCENARIOS),
+        help=f"comma-separated subset of: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--patients-per-group", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="", help="appended to the results file name")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fixture = seed(args.groups, args.patients_per_group)
+    started_at = datetime.now(timezone.utc)
+    recorder = asyncio.run(run(args, fixture))
+    endpoints = summarize(recorder, args.duration)
+    print_table(endpoints)
+
+    commit = current_commit()
+    result = {
+        "commit": commit,
+        "started_at": started_at.isoformat(),
+        "config": {
+            "users": args.users,
+            "duration": args.duration,
+            "scenarios": args.scenarios,
+            "groups": args.groups,
+            "patients_per_group": args.patients_per_group,
+            "seed": args.seed,
+        },
+        "endpoints": endpoints,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    suffix = f"-{args.label}" if args.label else ""
+    path = os.path.join(
+        RESULTS_DIR, f"{started_at:%Y%m%dT%H%M%S}-{commit}{suffix}.json"
+    )
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Load test scenarios. Each one is a user journey that a virtual user runs
+repeatedly; requests are recorded under a stable endpoint name.
+"""
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import httpx
+
+from loadtest.seed import Fixture
+
+
+class Recorder:
+    """Collects latencies and outcomes per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.latencies[name].append(time.perf_counter() - start)
+            self.errors[name] += 1
+            self.statuses[name][0] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+async def dashboard(client, recorder: Recorder, fixture: Fixture, rng: random.Random):
+    """An admin opening the dashboard"""
+    await recorder.request(client, "GET /admin/me", "GET", "/admin/me")
+    await recorder.request(client, "GET /recall/groups", "GET", "/recall/groups")
+    await recorder.request(
+        client, "GET /patients/calls", "GET", "/patients/calls", params={"limit": 10}
+    )
+    group_id = rng.choice(fixture.dashboard_group_ids)
+    await recorder.request(
+        client,
+        "GET /recall/groups/{id}/patients",
+        "GET",
+        f"/recall/groups/{group_id}/patients",
+        params={"limit": 50},
+    )
+
+
+def _csv(rows: int, rng: random.Random) -> str:
+    lines = ["first_name,last_name,email,number,dob,notes"]
+    for _ in range(rows):
+        i = rng.randrange(10**6)
+        lines.append(f"Import{i},Patient{i},import{i}@example.com,07911 {i:06d},1980-05-17,")
+    return "\n".join(lines)
+
+
+async def csv_import(client, recorder: Recorder, fixture: Fixture, rng: random.Random):
+    """A bulk patient import of 500 rows"""
+    await recorder.request(
+        client,
+        "POST /recall/groups/{id}/import-csv",
+        "POST",
+        f"/recall/groups/{fixture.import_group_id}/import-csv",
+        json={"file_content": _csv(500, rng)},
+    )
+
+
+async def group_dialing(client, recorder: Recorder, fixture: Fixture, rng: random.Random):
+    """Dialing every patient of a recall group"""
+    await recorder.request(
+        client,
+        "POST /patients/groups/{id}/call",
+        "POST",
+        f"/patients/groups/{fixture.dial_group_id}/call",
+    )
+
+
+def tool_call_payload(tool_call_id: str, i: int) -> dict:
+    """A Vapi sendAppointmentEmail tool call"""
+    return {
+        "message": {
+            "type": "tool-calls",
+            "toolCalls": [{
+                "id": tool_call_id,
+                "type": "function",
+                "function": {
+                    "name": "sendAppointmentEmail",
+                    "arguments": {
+                        "appointment_data": {
+                            "patient_email": f"patient{i}@example.com",
+                            "appointment_date": "2025-03-14",
+                            "appointment_time": "10:30",
+                            "patient_name": f"First{i} Last{i}",
+                            "gp_name": "Ross Road Medical Centre",
+                        }
+                    },
+                },
+            }],
+        }
+    }
+
+
+async def email_webhook(client, recorder: Recorder, fixture: Fixture, rng: random.Random):
+    """A confirmation email tool call, retried by Vapi one time in ten"""
+    payload = json.dumps(tool_call_payload(str(uuid.uuid4()), rng.randrange(10**6)))
+    headers = {"Content-Type": "application/json"}
+    attempts = 2 if rng.random() < 0.1 else 1
+    for _ in range(attempts):
+        await recorder.request(
+            client,
+            "POST /mail/confirmation_email",
+            "POST",
+            "/mail/confirmation_email",
+            content=payload,
+            headers=headers,
+        )
+
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, Fixture, random.Random], object]
+
+# Name -> (scenario, weight in the default mix)
+SCENARIOS: Dict[str, tuple] = {
+    "dashboard": (dashboard, 70),
+    "email_webhook": (email_webhook, 20),
+    "csv_import": (csv_import, 5),
+    "group_dialing": (group_dialing, 5),
+}
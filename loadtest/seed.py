@@ -0,0 +1,76 @@
+"""Seeds the database with an admin, practice and recall groups to load test"""
+import uuid
+from datetime import datetime
+from typing import NamedTuple
+
+from app.engine.db_storage import DBStorage, create_schema
+from app.models import Admin, Practice, RecallGroup, RecallPatient
+
+
+class Fixture(NamedTuple):
+    """What the scenarios need to know about the seeded data"""
+
+    admin_id: str
+    dashboard_group_ids: tuple
+    dial_group_id: str
+    import_group_id: str
+
+
+def _patients(group_id: str, count: int, now: datetime):
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "recall_group_id": group_id,
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "email": f"patient{i}@example.com",
+            "number": f"07700 {i:06d}",
+            "dob": "1970-01-01",
+            "notes": "Annual review" if i % 3 == 0 else None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+
+def seed(groups: int = 10, patients_per_group: int = 1000, dial_patients: int = 20) -> Fixture:
+    """
+    Creates a fresh admin with its practice and:
+    - `groups` recall groups of `patients_per_group` patients for the dashboard
+    - a group of `dial_patients` patients for group dialing
+    - an empty group that CSV imports are written to
+
+    The stand-in auth service treats the admin id as its bearer token.
+    """
+    create_schema()
+    db = DBStorage()
+    db.setup_db()
+    try:
+        admin = Admin(first_name="Load", last_name="Test")
+        db.add(admin)
+        practice = Practice(
+            practice_name="Load Test Practice",
+            practice_email=f"loadtest-{admin.id[:8]}@example.com",
+            practice_phone_number="01234 567890",
+            practice_address="1 Load Test Road",
+            admin_id=admin.id,
+        )
+        db.add(practice)
+
+        now = datetime.now()
+        dashboard_groups = []
+        for i in range(groups):
+            group = RecallGroup(name=f"Load test group {i}", practice_id=practice.id)
+            db.add(group)
+            db.bulk_insert(RecallPatient, list(_patients(group.id, patients_per_group, now)))
+            dashboard_groups.append(group.id)
+
+        dial_group = RecallGroup(name="Load test dialing", practice_id=practice.id)
+        db.add(dial_group)
+        db.bulk_insert(RecallPatient, list(_patients(dial_group.id, dial_patients, now)))
+        import_group = RecallGroup(name="Load test imports", practice_id=practice.id)
+        db.add(import_group)
+        db.commit()
+
+        return Fixture(admin.id, tuple(dashboard_groups), dial_group.id, import_group.id)
+    finally:
+        db.close()
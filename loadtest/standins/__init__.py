@@ -0,0 +1,9 @@
+"""
+Local stand-ins for the services the API depends on: Vapi, SendGrid, the
+auth service and the due patients API.
+
+One server hosts all four on the same port, so the app can be pointed at it
+through its settings and load tested without placing calls or sending mail.
+Latency, errors and rate limits of each service come from a profile; see
+docs/load-testing.md.
+"""
@@ -0,0 +1,28 @@
+"""
+Runs the stand-in server.
+
+Usage:
+    python -m loadtest.standins [--profile loadtest/standins/profiles/default.json]
+                                [--host 127.0.0.1] [--port 9100]
+"""
+import argparse
+
+import uvicorn
+
+from loadtest.standins.app import create_app
+from loadtest.standins.behavior import Profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the load test stand-in server")
+    parser.add_argument("--profile", help="JSON profile; defaults are used when omitted")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    profile = Profile.from_file(args.profile) if args.profile else Profile()
+    uvicorn.run(create_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""The stand-in server: Vapi, SendGrid, auth and due patients endpoints"""
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Response, status
+
+from loadtest.standins.behavior import SERVICES, Profile, ServiceBehavior
+
+# Synthetic records are dated from here so every run serves the same data
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat().replace("+00:00", "Z")
+
+
+def synthetic_call(rng: random.Random, i: int) -> dict:
+    """A finished call shaped like the Vapi API returns it"""
+    created = _iso(EPOCH + timedelta(minutes=i))
+    arguments = {
+        "appointment_data": {
+            "patient_email": f"patient{i}@example.com",
+            "appointment_date": "2025-03-14",
+            "appointment_time": "10:30",
+            "patient_name": f"First{i} Last{i}",
+        }
+    }
+    messages = [
+        {"role": "bot", "message": "Hello, this is your GP practice calling."},
+        {"role": "user", "message": "Hi, yes I can book an appointment."},
+    ]
+    if rng.random() < 0.6:
+        messages += [
+            {
+                "role": "tool_calls",
+                "toolCalls": [{
+                    "id": f"tool-call-{i}",
+                    "type": "function",
+                    "function": {
+                        "name": "sendAppointmentEmail",
+                        "arguments": json.dumps(arguments),
+                    },
+                }],
+            },
+            {"role": "tool_call_result", "name": "sendAppointmentEmail", "result": "Success"},
+        ]
+    return {
+        "id": f"call-{i}",
+        "orgId": "standin-org",
+        "type": "outboundPhoneCall",
+        "status": "ended",
+        "createdAt": created,
+        "updatedAt": created,
+        "customer": {"number": f"+447700{i:06d}"},
+        "assistantOverrides": {
+            "variableValues": {"first_name": f"First{i}", "last_name": f"Last{i}"}
+        },
+        "costs": [{"type": "vapi", "minutes": round(rng.uniform(0.5, 6), 2), "cost": 0.05}],
+        "messages": messages,
+        "summary": "Patient booked a recall appointment.",
+        "stereoRecordingUrl": f"https://recordings.example.com/call-{i}.wav",
+    }
+
+
+def synthetic_due_patient(i: int) -> dict:
+    return {
+        "id": f"due-{i}",
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "email": f"patient{i}@example.com",
+        "number": f"07700 {i:06d}",
+        "dob": "1970-01-01",
+        "notes": None,
+        "last_recall_at": "2024-01-15",
+        "recall_interval_days": 365,
+        "updated_at": _iso(EPOCH + timedelta(seconds=i)),
+    }
+
+
+def create_app(profile: Optional[Profile] = None) -> FastAPI:
+    profile = profile or Profile()
+    behaviors: Dict[str, ServiceBehavior] = {
+        name: ServiceBehavior(getattr(profile, name), profile.seed + i)
+        for i, name in enumerate(SERVICES)
+    }
+    rng = random.Random(profile.seed)
+    state = {
+        "calls": [synthetic_call(rng, i) for i in range(profile.call_count)],
+        "due_patients": [synthetic_due_patient(i) for i in range(profile.due_patient_count)],
+        "emails_sent": 0,
+        "mail_requests": 0,
+    }
+    app = FastAPI(title="Load test stand-ins")
+
+    # Vapi
+    vapi = Depends(behaviors["vapi"])
+
+    @app.post("/call", status_code=status.HTTP_201_CREATED, dependencies=[vapi])
+    async def create_call(body: dict = Body(...)):
+        now = _iso(datetime.now(timezone.utc))
+        call = {
+            **body,
+            "id": str(uuid.uuid4()),
+            "orgId": "standin-org",
+            "type": "outboundPhoneCall",
+            "status": "queued",
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        state["calls"].append(call)
+        return call
+
+    @app.get("/call", dependencies=[vapi])
+    async def list_calls(limit: int = Query(100, ge=1, le=1000)):
+        return state["calls"][-limit:][::-1]
+
+    @app.get("/call/{call_id}", dependencies=[vapi])
+    async def get_call(call_id: str):
+        for call in state["calls"]:
+            if call["id"] == call_id:
+                return call
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Call not found")
+
+    @app.delete("/call/{call_id}", dependencies=[vapi])
+    async def delete_call(call_id: str):
+        calls = state["calls"]
+        for i, call in enumerate(calls):
+            if call["id"] == call_id:
+                return calls.pop(i)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Call not found")
+
+    # SendGrid
+    @app.post("/v3/mail/send", dependencies=[Depends(behaviors["sendgrid"])])
+    async def send_mail(body: dict = Body(...)):
+        personalizations: List[dict] = body.get("personalizations") or []
+        if not 1 <= len(personalizations) <= 1000:
+            return Response(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content=json.dumps({"errors": [{
+                    "message": "Between 1 and 1000 personalizations are required",
+                    "field": "personalizations",
+                }]}),
+                media_type="application/json",
+            )
+        state["mail_requests"] += 1
+        state["emails_sent"] += len(personalizations)
+        return Response(
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"X-Message-Id": uuid.uuid4().hex},
+        )
+
+    # Auth service: the bearer token is the user id
+    auth = Depends(behaviors["auth"])
+
+    @app.post("/auth/register", status_code=status.HTTP_201_CREATED, dependencies=[auth])
+    async def register(body: dict = Body(...)):
+        user_id = str(uuid.uuid4())
+        return {"id": user_id, "email": body.get("email"), "access_token": user_id}
+
+    @app.post("/auth/verify_token", dependencies=[auth])
+    async def verify_token(body: dict = Body(...)):
+        token = body.get("token")
+        if not token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+            )
+        return {"user_id": token, "role": "admin", "is_verified": True}
+
+    # Due patients API
+    @app.get("/recall_patients", dependencies=[Depends(behaviors["due_patients"])])
+    async def recall_patients(updated_since: Optional[str] = None):
+        patients = state["due_patients"]
+        if updated_since:
+            patients = [p for p in patients if p["updated_at"] > updated_since]
+        return patients
+
+    # Inspection for load test drivers
+    @app.get("/_standin/stats")
+    async def stats():
+        return {
+            "services": {name: behavior.counts for name, behavior in behaviors.items()},
+            "calls": len(state["calls"]),
+            "emails_sent": state["emails_sent"],
+            "mail_requests": state["mail_requests"],
+        }
+
+    return app
@@ -0,0 +1,104 @@
+"""Simulated latency, failures and rate limits of a stand-in service"""
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Dict, Literal, Optional
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, Field
+
+SERVICES = ("vapi", "sendgrid", "auth", "due_patients")
+
+
+class ServiceProfile(BaseModel):
+    """How one stand-in service behaves"""
+
+    # "fixed" always waits latency_ms; "uniform" waits between latency_ms and
+    # latency_ms + spread_ms; "lognormal" has a median of latency_ms and a
+    # tail set by sigma
+    latency: Literal["fixed", "uniform", "lognormal"] = "lognormal"
+    latency_ms: float = Field(default=20, ge=0)
+    spread_ms: float = Field(default=0, ge=0)
+    sigma: float = Field(default=0.5, ge=0)
+    # Share of requests failed with error_status
+    error_rate: float = Field(default=0, ge=0, le=1)
+    error_status: int = 500
+    # Token bucket; requests over the limit get a 429 with Retry-After
+    rate_limit_per_second: Optional[float] = Field(default=None, gt=0)
+    rate_limit_burst: int = Field(default=10, ge=1)
+    retry_after_seconds: float = Field(default=1, ge=0)
+
+
+class Profile(BaseModel):
+    """Behavior of every stand-in service"""
+
+    seed: int = 42
+    vapi: ServiceProfile = ServiceProfile(latency_ms=150)
+    sendgrid: ServiceProfile = ServiceProfile(latency_ms=80)
+    auth: ServiceProfile = ServiceProfile(latency_ms=10)
+    due_patients: ServiceProfile = ServiceProfile(latency_ms=100)
+    # Synthetic data served by the stand-ins
+    due_patient_count: int = Field(default=500, ge=0)
+    call_count: int = Field(default=200, ge=0)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Profile":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class ServiceBehavior:
+    """Applies a ServiceProfile to requests and counts their outcomes"""
+
+    def __init__(self, profile: ServiceProfile, seed: int):
+        self.profile = profile
+        self._random = random.Random(seed)
+        self._tokens = float(profile.rate_limit_burst)
+        self._refilled_at = time.monotonic()
+        self.counts: Dict[str, int] = {"ok": 0, "error": 0, "rate_limited": 0}
+
+    def delay(self) -> float:
+        """Draws the latency of one request, in seconds"""
+        profile = self.profile
+        if profile.latency == "fixed":
+            ms = profile.latency_ms
+        elif profile.latency == "uniform":
+            ms = profile.latency_ms + self._random.uniform(0, profile.spread_ms)
+        else:
+            ms = profile.latency_ms * math.exp(self._random.gauss(0, profile.sigma))
+        return ms / 1000
+
+    def _take_token(self) -> bool:
+        rate = self.profile.rate_limit_per_second
+        if rate is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.profile.rate_limit_burst),
+            self._tokens + (now - self._refilled_at) * rate,
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def __call__(self):
+        """Request dependency: rate limits, waits, then maybe fails"""
+        if not self._take_token():
+            self.counts["rate_limited"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": f"{self.profile.retry_after_seconds:g}"},
+            )
+        await asyncio.sleep(self.delay())
+        if self._random.random() < self.profile.error_rate:
+            self.counts["error"] += 1
+            raise HTTPException(
+                status_code=self.profile.error_status,
+                detail="Simulated upstream failure",
+            )
+        self.counts["ok"] += 1
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+"""
+Fills in dob_date and next_due_at for existing recall patients.
+
+Usage:
+    python -m scripts.backfill_recall_dates [--batch-size 5000]
+
+Run once after applying the migration that adds the recall schedule
+columns. Rows are updated in batches, one transaction per batch, so the
+backfill can run against a live database and be restarted safely.
+"""
+import argparse
+import sys
+import time
+
+from app.engine.db_storage import DBStorage
+from app.models import RecallPatient
+from app.utils.recall_due import backfill_recall_dates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    db = DBStorage()
+    db.setup_db()
+    try:
+        start = time.perf_counter()
+        updated = backfill_recall_dates(db, batch_size=args.batch_size)
+        unparsed = (
+            db.query_eng(RecallPatient)
+            .filter(RecallPatient.dob_date.is_(None))
+            .count()
+        )
+    finally:
+        db.close()
+
+    print(f"Backfilled {updated} patients in {time.perf_counter() - start:.1f}s")
+    if unparsed:
+        print(f"{unparsed} patients have a dob that could not be parsed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Runs EXPLAIN against the hot lookup queries and fails if any of them
+would be answered with a sequential scan.
+
+Usage:
+    python -m scripts.check_query_plans
+
+The script connects with the same settings as the application. Small
+tables are always cheaper to scan sequentially, so sequential scans are
+disabled for the session: the check asserts that an index *can* serve
+each query, not what the planner picks on an empty database.
+"""
+import json
+import sys
+
+from sqlalchemy import text
+
+from app.engine.db_storage import DBStorage
+
+# (description, table the index must cover, query, parameters)
+HOT_QUERIES = [
+    (
+        "practice by admin",
+        "practices",
+        "SELECT * FROM practices WHERE admin_id = :id",
+        {"id": "00000000-0000-0000-0000-000000000000"},
+    ),
+    (
+        "practice by email",
+        "practices",
+        "SELECT * FROM practices WHERE practice_email = :email",
+        {"email": "practice@example.com"},
+    ),
+    (
+        "groups for practice",
+        "recall_groups",
+        "SELECT * FROM recall_groups WHERE practice_id = :id",
+        {"id": "00000000-0000-0000-0000-000000000000"},
+    ),
+    (
+        "patients in group",
+        "recall_patients",
+        "SELECT * FROM recall_patients WHERE recall_group_id = :id",
+        {"id": "00000000-0000-0000-0000-000000000000"},
+    ),
+    (
+        "patients in group ordered by created_at",
+        "recall_patients",
+        "SELECT * FROM recall_patients WHERE recall_group_id = :id "
+        "ORDER BY created_at LIMIT 50",
+        {"id": "00000000-0000-0000-0000-000000000000"},
+    ),
+    (
+        "patients due by a date",
+        "recall_patients",
+        "SELECT * FROM recall_patients WHERE recall_group_id = :id "
+        "AND next_due_at IS NOT NULL "
+        "AND next_due_at <= DATE '2026-01-08'",
+        {"id": "00000000-0000-0000-0000-000000000000"},
+    ),
+    (
+        "patient search by name",
+        "recall_patients",
+        "SELECT * FROM recall_patients "
+        "WHERE lower(first_name || ' ' || last_name) LIKE :pattern",
+        {"pattern": "%smith%"},
+    ),
+    (
+        "patient search by phone number",
+        "recall_patients",
+        "SELECT * FROM recall_patients "
+        "WHERE regexp_replace(number, '\\D', '', 'g') LIKE :pattern",
+        {"pattern": "%7700900%"},
+    ),
+    (
+        "caller lookup by phone number",
+        "recall_patients",
+        "SELECT * FROM recall_patients "
+        "WHERE regexp_replace(number, '\\D', '', 'g') IN (:international, :national)",
+        {"international": "447700900123", "national": "07700900123"},
+    ),
+]
+
+
+def _scan_nodes(plan):
+    """Yields (node type, relation) for every node of a JSON plan"""
+    yield plan.get("Node Type"), plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from _scan_nodes(child)
+
+
+def main():
+    db = DBStorage()
+    failures = []
+
+    with db.engine.connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        for description, table, query, params in HOT_QUERIES:
+            result = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params)
+            raw = result.scalar()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            seq_scans = [
+                relation
+                for node, relation in _scan_nodes(plan)
+                if node == "Seq Scan" and relation == table
+            ]
+            if seq_scans:
+                failures.append(description)
+                print(f"FAIL  {description}: sequential scan on {table}")
+            else:
+                print(f"ok    {description}")
+
+    if failures:
+        print(f"{len(failures)} hot queries are not served by an index")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())